@@ -53,6 +53,14 @@ class AgentFactory:
                     f"Configuration not found for LLM provider: {llm_provider}"
                 )
 
+            if llm_provider == "hedged_llm":
+                # Each endpoint starts from the pool config of its provider
+                # and overrides some of its fields (e.g. base_url)
+                llm_config["endpoints"] = [
+                    {**(llm_configs.get(endpoint["llm_provider"]) or {}), **endpoint}
+                    for endpoint in llm_config.get("endpoints") or []
+                ]
+
             # Create the stateless LLM
             llm = StatelessLLMFactory.create_llm(
                 llm_provider=llm_provider, system_prompt=system_prompt, **llm_config
@@ -81,6 +89,15 @@ class AgentFactory:
                 tool_manager=tool_manager,
                 tool_executor=tool_executor,
                 mcp_prompt_string=mcp_prompt_string,
+                max_context_tokens=basic_memory_settings.get("max_context_tokens"),
+                min_recent_messages=basic_memory_settings.get("min_recent_messages", 4),
+                summarize_after_messages=basic_memory_settings.get(
+                    "summarize_after_messages"
+                ),
+                summary_keep_recent_messages=basic_memory_settings.get(
+                    "summary_keep_recent_messages", 10
+                ),
+                recall_past_messages=basic_memory_settings.get("recall_past_messages"),
             )
 
         elif conversation_agent_choice == "mem0_agent":
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import AsyncIterator
+from typing import Any, AsyncIterator, List, Optional
 from loguru import logger
 
 from ..output_types import BaseOutput
 from ..input_types import BaseInput
+from ...history_store.history_store_interface import HistoryMessage
 
 
 class AgentInterface(ABC):
@@ -43,12 +44,67 @@ class AgentInterface(ABC):
         pass
 
     @abstractmethod
-    def set_memory_from_history(self, conf_uid: str, history_uid: str) -> None:
+    def set_memory_from_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        messages: Optional[List[HistoryMessage]] = None,
+    ) -> None:
         """
         Load the agent's working memory from chat history
 
         Args:
             conf_uid: str - Configuration ID
             history_uid: str - History ID
+            messages: Optional[List[HistoryMessage]] - The history, if the caller
+                already read it
+        """
+        pass
+
+    def new_session(self) -> "AgentInterface":
+        """
+        Create an agent for a new client session.
+
+        The returned agent must not share conversation state (memory, interrupt
+        flags, history binding) with this one, but may share expensive resources
+        such as LLM clients and tool executors. Agents without per-conversation
+        state can return themselves, which is the default.
+
+        Returns:
+            AgentInterface - The agent to use for the new session
+        """
+        return self
+
+    def memory_checkpoint(self) -> Optional[Any]:
+        """
+        Capture the conversation state, so that a speculative turn can be undone
+        with `restore_memory`. Agents whose state cannot be rolled back (e.g. kept
+        on a remote server) return None, which is the default.
+
+        Returns:
+            Optional[Any] - An opaque checkpoint, or None if not supported
+        """
+        return None
+
+    def restore_memory(self, checkpoint: Any) -> None:
+        """
+        Restore the conversation state captured by `memory_checkpoint`.
+
+        Args:
+            checkpoint: Any - A checkpoint returned by `memory_checkpoint`
+        """
+        pass
+
+    async def warmup(self) -> None:
+        """
+        Prepare the agent's backends (e.g. preload the LLM) ahead of the first
+        conversation. Does nothing by default.
+        """
+        pass
+
+    async def shutdown(self) -> None:
+        """
+        Release the agent's backends (e.g. unload the LLM) when the server stops.
+        Does nothing by default.
         """
         pass
@@ -1,3 +1,5 @@
+import copy
+import asyncio
 from typing import (
     AsyncIterator,
     List,
@@ -14,7 +16,14 @@ from ..output_types import SentenceOutput, DisplayText
 from ..stateless_llm.stateless_llm_interface import StatelessLLMInterface
 from ..stateless_llm.claude_llm import AsyncLLM as ClaudeAsyncLLM
 from ..stateless_llm.openai_compatible_llm import AsyncLLM as OpenAICompatibleAsyncLLM
-from ...chat_history_manager import get_history
+from ...chat_history_manager import (
+    HistoryMessage,
+    count_history_messages,
+    get_history,
+    get_metadata,
+    search_history,
+    update_metadate,
+)
 from ..transformers import (
     sentence_divider,
     actions_extractor,
@@ -23,11 +32,18 @@ from ..transformers import (
 )
 from ...config_manager import TTSPreprocessorConfig
 from ..input_types import BatchInput, TextSource
+from ..context_window import ContextWindow
+from ..memory_compactor import MemoryCompactor
 from prompts import prompt_loader
 from ...mcpp.tool_manager import ToolManager
 from ...mcpp.json_detector import StreamJSONDetector
 from ...mcpp.types import ToolCallObject
-from ...mcpp.tool_executor import ToolExecutor
+from ...mcpp.tool_executor import ToolCallDispatcher, ToolExecutor
+
+# Memory key holding the number of history messages stored when the message was
+# added to memory. A summary covering memory up to a message covers at least
+# that many history messages. Removed before messages are sent to the LLM.
+_HISTORY_LENGTH_KEY = "_history_length"
 
 
 class BasicMemoryAgent(AgentInterface):
@@ -49,6 +65,12 @@ class BasicMemoryAgent(AgentInterface):
         tool_manager: Optional[ToolManager] = None,
         tool_executor: Optional[ToolExecutor] = None,
         mcp_prompt_string: str = "",
+        max_context_tokens: Optional[int] = None,
+        min_recent_messages: int = 4,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        summarize_after_messages: Optional[int] = None,
+        summary_keep_recent_messages: int = 10,
+        recall_past_messages: Optional[int] = None,
     ):
         """Initialize agent with LLM and configuration."""
         super().__init__()
@@ -62,6 +84,17 @@ class BasicMemoryAgent(AgentInterface):
         self._tool_prompts = tool_prompts or {}
         self._interrupt_handled = False
         self.prompt_mode_flag = False
+        # Per session: the ToolManager is shared by all sessions
+        self._native_tools_supported = True
+        self._current_conf_uid: Optional[str] = None
+        self._current_history_uid: Optional[str] = None
+        self._recall_past_messages = recall_past_messages
+        # Shared between sessions: it only caches token counts
+        self._context_window = ContextWindow(
+            max_tokens=max_context_tokens,
+            min_recent_messages=min_recent_messages,
+            tokenizer=tokenizer,
+        )
 
         self._tool_manager = tool_manager
         self._tool_executor = tool_executor
@@ -88,6 +121,13 @@ class BasicMemoryAgent(AgentInterface):
         self._set_llm(llm)
         self.set_system(system if system else self._system)
 
+        self._memory_compactor = MemoryCompactor(
+            llm=self._llm,
+            summarize_after_messages=summarize_after_messages,
+            keep_recent_messages=summary_keep_recent_messages,
+        )
+        self._compaction_task: Optional[asyncio.Task] = None
+
         if self._use_mcpp and not all(
             [
                 self._tool_manager,
@@ -116,6 +156,35 @@ class BasicMemoryAgent(AgentInterface):
         self._llm = llm
         self.chat = self._chat_function_factory()
 
+    def new_session(self) -> "BasicMemoryAgent":
+        """
+        Create a lightweight agent for a new client session.
+
+        The session agent shares the LLM client, live2d model, ToolManager and
+        ToolExecutor with this agent, but owns its memory, interrupt state,
+        prompt-mode state and history binding.
+        """
+        session = copy.copy(self)
+        session._memory = []
+        session._interrupt_handled = False
+        session.prompt_mode_flag = False
+        session._native_tools_supported = True
+        session._current_conf_uid = None
+        session._current_history_uid = None
+        session._compaction_task = None
+        session._json_detector = StreamJSONDetector()
+        # The chat pipeline closes over `self`, so it has to be rebuilt
+        session.chat = session._chat_function_factory()
+        return session
+
+    async def warmup(self) -> None:
+        """Preload the LLM."""
+        await self._llm.warmup()
+
+    async def shutdown(self) -> None:
+        """Unload the LLM. Session agents share it, so only the owner calls this."""
+        await self._llm.shutdown()
+
     def set_system(self, system: str):
         """Set the system prompt."""
         logger.debug(f"Memory Agent: Setting system prompt: '''{system}'''")
@@ -171,14 +240,120 @@ class BasicMemoryAgent(AgentInterface):
         ):
             return
 
-        self._memory.append(message_data)
+        self._remember(message_data)
+
+        if role == "assistant":
+            self._schedule_compaction()
+
+    def _remember(self, message: Dict[str, Any]) -> None:
+        """Append a message to memory, marked with the current history length."""
+        if (
+            self._memory_compactor.enabled
+            and self._current_conf_uid
+            and self._current_history_uid
+        ):
+            message[_HISTORY_LENGTH_KEY] = count_history_messages(
+                self._current_conf_uid, self._current_history_uid
+            )
+        self._memory.append(message)
+
+    def _schedule_compaction(self) -> None:
+        """Start summarizing older memory in the background if it grew too long."""
+        if not self._memory_compactor.enabled:
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+
+        split = self._memory_compactor.split_point(self._memory)
+        if not split:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._compaction_task = loop.create_task(self._compact_memory(split))
+
+    async def _compact_memory(self, split: int) -> None:
+        """
+        Replace the first `split` messages of memory with a summary and store the
+        summary in the history metadata.
+        """
+        memory = self._memory
+        summarized = memory[:split]
+        conf_uid = self._current_conf_uid
+        history_uid = self._current_history_uid
+
+        try:
+            summary = await self._memory_compactor.summarize(summarized)
+        except Exception as e:
+            logger.error(f"Failed to summarize memory: {e}")
+            return
+        if not summary:
+            return
+
+        # Memory may have been reloaded or rewritten while the LLM was busy
+        if (
+            self._memory is not memory
+            or len(memory) < split
+            or any(a is not b for a, b in zip(memory, summarized))
+        ):
+            logger.debug("Memory changed during summarization, discarding summary.")
+            return
+
+        # History messages covered by the summary, from the latest summarized
+        # message whose position is known. Messages stored after it was added to
+        # memory (e.g. its own reply) are left out, so a reload may repeat them
+        # but never drops a message the summary does not cover.
+        covered = next(
+            (
+                message[_HISTORY_LENGTH_KEY]
+                for message in reversed(summarized)
+                if _HISTORY_LENGTH_KEY in message
+            ),
+            None,
+        )
 
-    def set_memory_from_history(self, conf_uid: str, history_uid: str) -> None:
-        """Load memory from chat history."""
-        messages = get_history(conf_uid, history_uid)
+        summary_role = "system" if self.interrupt_method == "system" else "user"
+        summary_message = self._memory_compactor.to_message(summary, summary_role)
+        if covered is not None:
+            summary_message[_HISTORY_LENGTH_KEY] = covered
+        memory[:split] = [summary_message]
+        logger.info(f"Compacted {split} messages of memory into a summary.")
+
+        if conf_uid and history_uid and covered is not None:
+            await asyncio.to_thread(
+                update_metadate,
+                conf_uid,
+                history_uid,
+                {"memory_summary": summary, "memory_summary_covers": covered},
+            )
 
+    def set_memory_from_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        messages: Optional[List[HistoryMessage]] = None,
+    ) -> None:
+        """Load memory from chat history, reading it unless `messages` is given."""
+        if messages is None:
+            messages = get_history(conf_uid, history_uid)
+
+        self._current_conf_uid = conf_uid
+        self._current_history_uid = history_uid
         self._memory = []
-        for msg in messages:
+
+        metadata = get_metadata(conf_uid, history_uid)
+        summary = metadata.get("memory_summary")
+        covered = 0
+        if summary:
+            summary_role = "system" if self.interrupt_method == "system" else "user"
+            covered = metadata.get("memory_summary_covers", 0)
+            summary_message = self._memory_compactor.to_message(summary, summary_role)
+            summary_message[_HISTORY_LENGTH_KEY] = covered
+            self._memory.append(summary_message)
+
+        for position, msg in enumerate(messages[covered:], start=covered):
             role = "user" if msg["role"] == "human" else "assistant"
             content = msg["content"]
             if isinstance(content, str) and content:
@@ -186,12 +361,23 @@ class BasicMemoryAgent(AgentInterface):
                     {
                         "role": role,
                         "content": content,
+                        _HISTORY_LENGTH_KEY: position + 1,
                     }
                 )
             else:
                 logger.warning(f"Skipping invalid message from history: {msg}")
         logger.info(f"Loaded {len(self._memory)} messages from history.")
 
+    def memory_checkpoint(self) -> List[Dict[str, Any]]:
+        """Copy memory so that a speculative turn can be undone."""
+        return [dict(message) for message in self._memory]
+
+    def restore_memory(self, checkpoint: List[Dict[str, Any]]) -> None:
+        """Restore memory from `memory_checkpoint`. Discards a running compaction."""
+        # A new list makes a running compaction discard its summary
+        self._memory = [dict(message) for message in checkpoint]
+        self._interrupt_handled = False
+
     def handle_interrupt(self, heard_response: str) -> None:
         """Handle user interruption."""
         if self._interrupt_handled:
@@ -206,7 +392,7 @@ class BasicMemoryAgent(AgentInterface):
                 self._memory[-1]["content"] = heard_response + "..."
         else:
             if heard_response:
-                self._memory.append(
+                self._remember(
                     {
                         "role": "assistant",
                         "content": heard_response + "...",
@@ -214,7 +400,7 @@ class BasicMemoryAgent(AgentInterface):
                 )
 
         interrupt_role = "system" if self.interrupt_method == "system" else "user"
-        self._memory.append(
+        self._remember(
             {
                 "role": interrupt_role,
                 "content": "[Interrupted by user]",
@@ -239,13 +425,59 @@ class BasicMemoryAgent(AgentInterface):
 
         return "\n".join(message_parts).strip()
 
-    def _to_messages(self, input_data: BatchInput) -> List[Dict[str, Any]]:
-        """Prepare messages for LLM API call."""
-        messages = self._memory.copy()
+    async def _recall_from_history(self, text_prompt: str) -> str:
+        """
+        Find messages of earlier chat histories related to the user input.
+        Returns them as a note for the LLM, or an empty string.
+        """
+        if not self._recall_past_messages or not self._current_conf_uid:
+            return ""
+        if not text_prompt:
+            return ""
+        results = await asyncio.to_thread(
+            search_history,
+            self._current_conf_uid,
+            text_prompt,
+            limit=self._recall_past_messages,
+            context=0,
+            exclude_history_uid=self._current_history_uid,
+            match_any=True,
+        )
+        if not results:
+            return ""
+        lines = [
+            f"[{result['message']['timestamp']}] "
+            f"{'User' if result['message']['role'] == 'human' else 'You'}: "
+            f"{result['message']['content']}"
+            for result in results
+        ]
+        logger.debug(f"Recalled {len(lines)} messages from earlier conversations")
+        return (
+            "[Possibly related messages from earlier conversations:\n"
+            + "\n".join(lines)
+            + "]"
+        )
+
+    def _to_messages(
+        self, input_data: BatchInput, recalled: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Prepare messages for LLM API call. `recalled` is sent before the user
+        input, but not kept in memory.
+        """
         user_content = []
         text_prompt = self._to_text_prompt(input_data)
+        llm_text = f"{recalled}\n\n{text_prompt}" if recalled else text_prompt
+        messages = [
+            {key: value for key, value in message.items() if key != _HISTORY_LENGTH_KEY}
+            for message in self._context_window.fit(
+                self._memory,
+                system=self._system,
+                reserved_tokens=self._context_window.count_text(llm_text),
+            )
+        ]
         if text_prompt:
-            user_content.append({"type": "text", "text": text_prompt})
+            user_content.append({"type": "text", "text": llm_text})
 
         if input_data.images:
             image_added = False
@@ -291,6 +523,7 @@ class BasicMemoryAgent(AgentInterface):
         self,
         initial_messages: List[Dict[str, Any]],
         tools: List[Dict[str, Any]],
+        tool_gate: Optional[asyncio.Event] = None,
     ) -> AsyncIterator[Union[str, Dict[str, Any]]]:
         """Handle Claude interaction loop with tool support."""
         messages = initial_messages.copy()
@@ -373,6 +606,7 @@ class BasicMemoryAgent(AgentInterface):
                     yield "[Error: ToolExecutor not configured]"
                     return
 
+                await self._wait_for_tool_gate(tool_gate)
                 tool_executor_iterator = self._tool_executor.execute_tools(
                     tool_calls=pending_tool_calls,
                     caller_mode="Claude",
@@ -410,6 +644,7 @@ class BasicMemoryAgent(AgentInterface):
         self,
         initial_messages: List[Dict[str, Any]],
         tools: List[Dict[str, Any]],
+        tool_gate: Optional[asyncio.Event] = None,
     ) -> AsyncIterator[Union[str, Dict[str, Any]]]:
         """Handle OpenAI interaction with tool support."""
         messages = initial_messages.copy()
@@ -421,247 +656,278 @@ class BasicMemoryAgent(AgentInterface):
         max_iterations = 3  # Prevent infinite loops
         tool_error_count = {}  # Track errors per tool
         tools_for_api = tools  # Initialize tools outside loop
+        # Runs the tool calls of the current iteration while the LLM streams
+        dispatcher: Optional[ToolCallDispatcher] = None
         
-        while iteration_count < max_iterations:
-            iteration_count += 1
-            logger.info(f"=== OpenAI tool loop iteration {iteration_count} ===")
-            logger.info(f"Messages count: {len(messages)}")
-            if self.prompt_mode_flag:
-                if self._mcp_prompt_string:
-                    current_system_prompt = (
-                        f"{self._system}\n\n{self._mcp_prompt_string}"
-                    )
+        try:
+            while iteration_count < max_iterations:
+                iteration_count += 1
+                logger.info(f"=== OpenAI tool loop iteration {iteration_count} ===")
+                logger.info(f"Messages count: {len(messages)}")
+                if self.prompt_mode_flag:
+                    if self._mcp_prompt_string:
+                        current_system_prompt = (
+                            f"{self._system}\n\n{self._mcp_prompt_string}"
+                        )
+                    else:
+                        logger.warning("Prompt mode active but mcp_prompt_string is empty!")
+                        current_system_prompt = self._system
+                    tools_for_api = None
                 else:
-                    logger.warning("Prompt mode active but mcp_prompt_string is empty!")
                     current_system_prompt = self._system
-                tools_for_api = None
-            else:
-                current_system_prompt = self._system
-                # Don't reset tools_for_api here - it may have been disabled due to errors
-
-            logger.info(f"Calling LLM with system prompt: {current_system_prompt[:100]}...")
-            logger.info(f"Tools for API: {len(tools_for_api) if tools_for_api else 0}")
-            logger.info(f"Messages being sent to LLM:")
-            for idx, msg in enumerate(messages):
-                content_preview = str(msg.get('content', ''))[:200] if isinstance(msg.get('content'), str) else f"[{type(msg.get('content')).__name__}]"
-                logger.info(f"  Message {idx}: role={msg.get('role')}, content={content_preview}...")
-            stream = self._llm.chat_completion(
-                messages, current_system_prompt, tools=tools_for_api
-            )
-            pending_tool_calls.clear()
-            current_turn_text = ""
-            assistant_message_for_api = None
-            detected_prompt_json = None
-            goto_next_while_iteration = False
-
-            async for event in stream:
-                logger.debug(f"Stream event type: {type(event)}, is_string: {isinstance(event, str)}")
-                if isinstance(event, Exception):
-                    logger.error(f"Stream yielded exception: {event}")
-                    yield f"[Error: {str(event)}]"
-                    return
-                if self.prompt_mode_flag:
-                    if isinstance(event, str):
-                        current_turn_text += event
-                        if self._json_detector:
-                            potential_json = self._json_detector.process_chunk(event)
-                            if potential_json:
-                                try:
-                                    if isinstance(potential_json, list):
-                                        detected_prompt_json = potential_json
-                                    elif isinstance(potential_json, dict):
-                                        detected_prompt_json = [potential_json]
-
-                                    if detected_prompt_json:
+                    # Don't reset tools_for_api here - it may have been disabled due to errors
+
+                logger.info(f"Calling LLM with system prompt: {current_system_prompt[:100]}...")
+                logger.info(f"Tools for API: {len(tools_for_api) if tools_for_api else 0}")
+                logger.info(f"Messages being sent to LLM:")
+                for idx, msg in enumerate(messages):
+                    content_preview = str(msg.get('content', ''))[:200] if isinstance(msg.get('content'), str) else f"[{type(msg.get('content')).__name__}]"
+                    logger.info(f"  Message {idx}: role={msg.get('role')}, content={content_preview}...")
+                stream = self._llm.chat_completion(
+                    messages, current_system_prompt, tools=tools_for_api
+                )
+                pending_tool_calls.clear()
+                dispatcher = None
+                current_turn_text = ""
+                assistant_message_for_api = None
+                detected_prompt_json = None
+                goto_next_while_iteration = False
+
+                async for event in stream:
+                    logger.debug(f"Stream event type: {type(event)}, is_string: {isinstance(event, str)}")
+                    if isinstance(event, Exception):
+                        logger.error(f"Stream yielded exception: {event}")
+                        yield f"[Error: {str(event)}]"
+                        return
+                    if self.prompt_mode_flag:
+                        if isinstance(event, str):
+                            current_turn_text += event
+                            if self._json_detector:
+                                potential_json = self._json_detector.process_chunk(event)
+                                if potential_json:
+                                    try:
+                                        if isinstance(potential_json, list):
+                                            detected_prompt_json = potential_json
+                                        elif isinstance(potential_json, dict):
+                                            detected_prompt_json = [potential_json]
+
+                                        if detected_prompt_json:
+                                            break
+                                    except Exception as e:
+                                        logger.error(f"Error parsing detected JSON: {e}")
+                                        if self._json_detector:
+                                            self._json_detector.reset()
+                                        yield f"[Error parsing tool JSON: {e}]"
+                                        goto_next_while_iteration = True
                                         break
-                                except Exception as e:
-                                    logger.error(f"Error parsing detected JSON: {e}")
-                                    if self._json_detector:
-                                        self._json_detector.reset()
-                                    yield f"[Error parsing tool JSON: {e}]"
-                                    goto_next_while_iteration = True
-                                    break
-                        yield event
-                else:
-                    if isinstance(event, str):
-                        current_turn_text += event
-                        logger.debug(f"OpenAI loop got text: '{event}'")
-                        yield event
-                    elif event is None:
-                        logger.warning("Stream yielded None event")
-                        break
-                    elif isinstance(event, list) and all(
-                        isinstance(tc, ToolCallObject) for tc in event
-                    ):
-                        pending_tool_calls = event
-                        assistant_message_for_api = {
-                            "role": "assistant",
-                            "content": current_turn_text if current_turn_text else None,
-                            "tool_calls": [
-                                {
-                                    "id": tc.id,
-                                    "type": tc.type,
-                                    "function": {
-                                        "name": tc.function.name,
-                                        "arguments": tc.function.arguments,
-                                    },
-                                }
-                                for tc in pending_tool_calls
-                            ],
-                        }
-                        break
-                    elif event == "__API_NOT_SUPPORT_TOOLS__":
-                        logger.warning(
-                            f"LLM {getattr(self._llm, 'model', '')} has no native tool support. Switching to prompt mode."
+                            yield event
+                    else:
+                        if isinstance(event, str):
+                            current_turn_text += event
+                            logger.debug(f"OpenAI loop got text: '{event}'")
+                            yield event
+                        elif event is None:
+                            logger.warning("Stream yielded None event")
+                            break
+                        elif isinstance(event, list) and all(
+                            isinstance(tc, ToolCallObject) for tc in event
+                        ):
+                            # The LLM yields each call once, some of them while it is
+                            # still streaming: start them now and keep reading
+                            pending_tool_calls.extend(event)
+                            if self._tool_executor:
+                                await self._wait_for_tool_gate(tool_gate)
+                                if dispatcher is None:
+                                    dispatcher = ToolCallDispatcher(
+                                        self._tool_executor, "OpenAI"
+                                    )
+                                dispatcher.submit(event)
+                                for update in dispatcher.drain_updates():
+                                    yield update
+                            assistant_message_for_api = {
+                                "role": "assistant",
+                                "content": current_turn_text if current_turn_text else None,
+                                "tool_calls": [
+                                    {
+                                        "id": tc.id,
+                                        "type": tc.type,
+                                        "function": {
+                                            "name": tc.function.name,
+                                            "arguments": tc.function.arguments,
+                                        },
+                                    }
+                                    for tc in pending_tool_calls
+                                ],
+                            }
+                        elif event == "__API_NOT_SUPPORT_TOOLS__":
+                            logger.warning(
+                                f"LLM {getattr(self._llm, 'model', '')} has no native tool support. Switching to prompt mode."
+                            )
+                            self.prompt_mode_flag = True
+                            # Only for this session; the LLM is not asked for native tools again
+                            self._native_tools_supported = False
+                            if self._json_detector:
+                                self._json_detector.reset()
+                            goto_next_while_iteration = True
+                            break
+                if goto_next_while_iteration:
+                    continue
+
+                if detected_prompt_json:
+                    logger.info("Processing tools detected via prompt mode JSON.")
+                    self._add_message(current_turn_text, "assistant")
+
+                    parsed_tools = self._tool_executor.process_tool_from_prompt_json(
+                        detected_prompt_json
+                    )
+                    if parsed_tools:
+                        tool_results_for_llm = []
+                        if not self._tool_executor:
+                            logger.error(
+                                "Prompt Tool interaction requested but ToolExecutor/MCPClient is not available."
+                            )
+                            yield "[Error: ToolExecutor/MCPClient not configured for prompt mode]"
+                            continue
+
+                        await self._wait_for_tool_gate(tool_gate)
+                        tool_executor_iterator = self._tool_executor.execute_tools(
+                            tool_calls=parsed_tools,
+                            caller_mode="Prompt",
                         )
-                        self.prompt_mode_flag = True
-                        if self._tool_manager:
-                            self._tool_manager.disable()
-                        if self._json_detector:
-                            self._json_detector.reset()
-                        goto_next_while_iteration = True
-                        break
-            if goto_next_while_iteration:
-                continue
+                        try:
+                            while True:
+                                update = await anext(tool_executor_iterator)
+                                if update.get("type") == "final_tool_results":
+                                    tool_results_for_llm = update.get("results", [])
+                                    break
+                                else:
+                                    yield update
+                        except StopAsyncIteration:
+                            logger.warning(
+                                "Prompt mode tool executor finished without final results marker."
+                            )
+
+                        if tool_results_for_llm:
+                            result_strings = [
+                                res.get("content", "Error: Malformed result")
+                                for res in tool_results_for_llm
+                            ]
+                            combined_results_str = "\n".join(result_strings)
+                            messages.append(
+                                {"role": "user", "content": combined_results_str}
+                            )
+                    continue
 
-            if detected_prompt_json:
-                logger.info("Processing tools detected via prompt mode JSON.")
-                self._add_message(current_turn_text, "assistant")
+                elif pending_tool_calls and assistant_message_for_api:
+                    messages.append(assistant_message_for_api)
+                    if current_turn_text:
+                        self._add_message(current_turn_text, "assistant")
+
+                    # Check if we're about to retry a failed tool
+                    for tool_call in pending_tool_calls:
+                        tool_name = tool_call.function.name if hasattr(tool_call, 'function') else tool_call.get('name', 'unknown')
+                        if tool_name in tool_error_count and tool_error_count[tool_name] >= 2:
+                            logger.warning(f"Tool '{tool_name}' has failed {tool_error_count[tool_name]} times. Forcing text response.")
+                            # Add a message to force text response
+                            messages.append({
+                                "role": "user", 
+                                "content": f"The tool '{tool_name}' is not available or timing out. Please provide a helpful response without using tools."
+                            })
+                            # Clear tools to force text response
+                            tools_for_api = None
+                            continue
 
-                parsed_tools = self._tool_executor.process_tool_from_prompt_json(
-                    detected_prompt_json
-                )
-                if parsed_tools:
                     tool_results_for_llm = []
                     if not self._tool_executor:
                         logger.error(
-                            "Prompt Tool interaction requested but ToolExecutor/MCPClient is not available."
+                            "OpenAI Tool interaction requested but ToolExecutor/MCPClient is not available."
                         )
-                        yield "[Error: ToolExecutor/MCPClient not configured for prompt mode]"
+                        yield "[Error: ToolExecutor/MCPClient not configured for OpenAI mode]"
                         continue
 
-                    tool_executor_iterator = self._tool_executor.execute_tools(
-                        tool_calls=parsed_tools,
-                        caller_mode="Prompt",
-                    )
+                    await self._wait_for_tool_gate(tool_gate)
+                    if dispatcher:
+                        # Already running since the LLM yielded them
+                        tool_executor_iterator = dispatcher.finish()
+                    else:
+                        tool_executor_iterator = self._tool_executor.execute_tools(
+                            tool_calls=pending_tool_calls,
+                            caller_mode="OpenAI",
+                        )
                     try:
                         while True:
                             update = await anext(tool_executor_iterator)
                             if update.get("type") == "final_tool_results":
                                 tool_results_for_llm = update.get("results", [])
                                 break
+                            elif update.get("type") == "tool_call_status":
+                                # Track tool errors
+                                if update.get("status") == "error":
+                                    tool_name = update.get("tool_name", "unknown")
+                                    tool_error_count[tool_name] = tool_error_count.get(tool_name, 0) + 1
+                                    logger.info(f"Tool '{tool_name}' error count: {tool_error_count[tool_name]}")
+                                yield update
                             else:
                                 yield update
                     except StopAsyncIteration:
                         logger.warning(
-                            "Prompt mode tool executor finished without final results marker."
+                            "OpenAI tool executor finished without final results marker."
                         )
 
                     if tool_results_for_llm:
-                        result_strings = [
-                            res.get("content", "Error: Malformed result")
-                            for res in tool_results_for_llm
-                        ]
-                        combined_results_str = "\n".join(result_strings)
-                        messages.append(
-                            {"role": "user", "content": combined_results_str}
-                        )
-                continue
-
-            elif pending_tool_calls and assistant_message_for_api:
-                messages.append(assistant_message_for_api)
-                if current_turn_text:
-                    self._add_message(current_turn_text, "assistant")
-
-                # Check if we're about to retry a failed tool
-                for tool_call in pending_tool_calls:
-                    tool_name = tool_call.function.name if hasattr(tool_call, 'function') else tool_call.get('name', 'unknown')
-                    if tool_name in tool_error_count and tool_error_count[tool_name] >= 2:
-                        logger.warning(f"Tool '{tool_name}' has failed {tool_error_count[tool_name]} times. Forcing text response.")
-                        # Add a message to force text response
-                        messages.append({
-                            "role": "user", 
-                            "content": f"The tool '{tool_name}' is not available or timing out. Please provide a helpful response without using tools."
-                        })
-                        # Clear tools to force text response
-                        tools_for_api = None
-                        continue
-
-                tool_results_for_llm = []
-                if not self._tool_executor:
-                    logger.error(
-                        "OpenAI Tool interaction requested but ToolExecutor/MCPClient is not available."
-                    )
-                    yield "[Error: ToolExecutor/MCPClient not configured for OpenAI mode]"
-                    continue
-
-                tool_executor_iterator = self._tool_executor.execute_tools(
-                    tool_calls=pending_tool_calls,
-                    caller_mode="OpenAI",
-                )
-                try:
-                    while True:
-                        update = await anext(tool_executor_iterator)
-                        if update.get("type") == "final_tool_results":
-                            tool_results_for_llm = update.get("results", [])
-                            break
-                        elif update.get("type") == "tool_call_status":
-                            # Track tool errors
-                            if update.get("status") == "error":
-                                tool_name = update.get("tool_name", "unknown")
-                                tool_error_count[tool_name] = tool_error_count.get(tool_name, 0) + 1
-                                logger.info(f"Tool '{tool_name}' error count: {tool_error_count[tool_name]}")
-                            yield update
-                        else:
-                            yield update
-                except StopAsyncIteration:
-                    logger.warning(
-                        "OpenAI tool executor finished without final results marker."
-                    )
-
-                if tool_results_for_llm:
-                    messages.extend(tool_results_for_llm)
-                    logger.info(f"Added {len(tool_results_for_llm)} tool results to messages")
+                        messages.extend(tool_results_for_llm)
+                        logger.info(f"Added {len(tool_results_for_llm)} tool results to messages")
                     
-                    # Check if all tools failed
-                    all_failed = True
-                    for idx, result in enumerate(tool_results_for_llm):
-                        content = str(result.get('content', ''))
-                        logger.info(f"  Tool result {idx}: role={result.get('role')}, tool_call_id={result.get('tool_call_id')}, content_length={len(content)}, content_preview={content[:200]}...")
-                        if "error" not in content.lower() and "timed out" not in content.lower():
-                            all_failed = False
+                        # Check if all tools failed
+                        all_failed = True
+                        for idx, result in enumerate(tool_results_for_llm):
+                            content = str(result.get('content', ''))
+                            logger.info(f"  Tool result {idx}: role={result.get('role')}, tool_call_id={result.get('tool_call_id')}, content_length={len(content)}, content_preview={content[:200]}...")
+                            if "error" not in content.lower() and "timed out" not in content.lower():
+                                all_failed = False
                     
-                    logger.info(f"Current messages count: {len(messages)}")
+                        logger.info(f"Current messages count: {len(messages)}")
                     
-                    # If all tools failed, add a message to encourage text response
-                    if all_failed:
-                        logger.warning("All tools failed. Adding message to encourage text response.")
-                        messages.append({
-                            "role": "user",
-                            "content": "The tools are not working. Please provide a helpful response based on your knowledge without using any tools."
-                        })
-                        # Disable tools for next iteration
-                        tools_for_api = None
+                        # If all tools failed, add a message to encourage text response
+                        if all_failed:
+                            logger.warning("All tools failed. Adding message to encourage text response.")
+                            messages.append({
+                                "role": "user",
+                                "content": "The tools are not working. Please provide a helpful response based on your knowledge without using any tools."
+                            })
+                            # Disable tools for next iteration
+                            tools_for_api = None
                     
-                    logger.info("Continuing loop to make another LLM call with tool results...")
-                else:
-                    logger.warning("No tool results received!")
-                continue
+                        logger.info("Continuing loop to make another LLM call with tool results...")
+                    else:
+                        logger.warning("No tool results received!")
+                    continue
 
-            else:
-                logger.info(f"No pending tool calls. Current turn text length: {len(current_turn_text)}")
-                if current_turn_text:
-                    logger.info(f"Current turn text preview: '{current_turn_text[:200]}...'")
-                    self._add_message(current_turn_text, "assistant")
                 else:
-                    logger.warning("⚠️ No text was generated in this iteration!")
-                    logger.info(f"Stream ended without yielding text. Last messages: {[{'role': m['role'], 'content_type': type(m['content']).__name__, 'content_preview': str(m['content'])[:100] if isinstance(m['content'], str) else 'complex'} for m in messages[-3:]]}")
-                logger.info("Exiting OpenAI tool interaction loop - DONE")
-                return
+                    logger.info(f"No pending tool calls. Current turn text length: {len(current_turn_text)}")
+                    if current_turn_text:
+                        logger.info(f"Current turn text preview: '{current_turn_text[:200]}...'")
+                        self._add_message(current_turn_text, "assistant")
+                    else:
+                        logger.warning("⚠️ No text was generated in this iteration!")
+                        logger.info(f"Stream ended without yielding text. Last messages: {[{'role': m['role'], 'content_type': type(m['content']).__name__, 'content_preview': str(m['content'])[:100] if isinstance(m['content'], str) else 'complex'} for m in messages[-3:]]}")
+                    logger.info("Exiting OpenAI tool interaction loop - DONE")
+                    return
         
-        # If we exit the loop due to max iterations, provide a fallback response
-        logger.warning(f"Reached max iterations ({max_iterations}) in tool loop. Providing fallback response.")
-        yield "[smirk] Well, it seems my super-advanced AI tools are taking a coffee break. How typical! I was going to search for the latest AI news, but apparently even I can't escape technical difficulties. Try asking me something else, or maybe just marvel at my existence instead."
+            # If we exit the loop due to max iterations, provide a fallback response
+            logger.warning(f"Reached max iterations ({max_iterations}) in tool loop. Providing fallback response.")
+            yield "[smirk] Well, it seems my super-advanced AI tools are taking a coffee break. How typical! I was going to search for the latest AI news, but apparently even I can't escape technical difficulties. Try asking me something else, or maybe just marvel at my existence instead."
+        finally:
+            # Interrupted: stop the tool calls started during the stream
+            if dispatcher:
+                await dispatcher.cancel()
+
+    @staticmethod
+    async def _wait_for_tool_gate(tool_gate: Optional[asyncio.Event]) -> None:
+        """Hold the tool calls of a provisional turn until it is confirmed."""
+        if tool_gate is not None and not tool_gate.is_set():
+            logger.info("Holding tool calls until the turn is confirmed.")
+            await tool_gate.wait()
 
     def _chat_function_factory(
         self,
@@ -681,26 +947,34 @@ class BasicMemoryAgent(AgentInterface):
         ) -> AsyncIterator[Union[str, Dict[str, Any]]]:
             """Process chat with memory and tools."""
             self.reset_interrupt()
-            self.prompt_mode_flag = False
+            self.prompt_mode_flag = not self._native_tools_supported
+
+            # Set for provisional turns, tool calls wait until it is set
+            tool_gate = (input_data.metadata or {}).get("tool_gate")
 
-            messages = self._to_messages(input_data)
+            recalled = await self._recall_from_history(
+                self._to_text_prompt(input_data)
+            )
+            messages = self._to_messages(input_data, recalled)
             tools = None
             tool_mode = None
             llm_supports_native_tools = False
 
             if self._use_mcpp and self._tool_manager:
                 tools = None
-                if isinstance(self._llm, ClaudeAsyncLLM):
+                # Composite LLMs (e.g. HedgedLLM) use the tool format of their primary LLM
+                tool_format_llm = getattr(self._llm, "primary_llm", self._llm)
+                if isinstance(tool_format_llm, ClaudeAsyncLLM):
                     tool_mode = "Claude"
                     tools = self._formatted_tools_claude
                     llm_supports_native_tools = True
-                elif isinstance(self._llm, OpenAICompatibleAsyncLLM):
+                elif isinstance(tool_format_llm, OpenAICompatibleAsyncLLM):
                     tool_mode = "OpenAI"
                     tools = self._formatted_tools_openai
                     llm_supports_native_tools = True
                 else:
                     logger.warning(
-                        f"LLM type {type(self._llm)} not explicitly handled for tool mode determination."
+                        f"LLM type {type(tool_format_llm)} not explicitly handled for tool mode determination."
                     )
 
                 if llm_supports_native_tools and not tools:
@@ -716,7 +990,7 @@ class BasicMemoryAgent(AgentInterface):
                 tool_updates = []
                 text_response = ""
                 async for output in self._claude_tool_interaction_loop(
-                    messages, tools if tools else []
+                    messages, tools if tools else [], tool_gate
                 ):
                     if isinstance(output, dict):
                         tool_updates.append(output)
@@ -732,7 +1006,7 @@ class BasicMemoryAgent(AgentInterface):
                 tool_updates = []
                 text_response = ""
                 async for output in self._openai_tool_interaction_loop(
-                    messages, tools if tools else []
+                    messages, tools if tools else [], tool_gate
                 ):
                     if isinstance(output, dict):
                         tool_updates.append(output)
@@ -796,7 +1070,7 @@ class BasicMemoryAgent(AgentInterface):
             group_context = prompt_loader.load_util(prompt_name).format(
                 human_name=human_name, other_ais=other_ais
             )
-            self._memory.append({"role": "user", "content": group_context})
+            self._remember({"role": "user", "content": group_context})
         except FileNotFoundError:
             logger.error(f"Group conversation prompt file not found: {prompt_name}")
         except KeyError as e:
@@ -1,6 +1,6 @@
 import asyncio
 import base64
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, List, Optional
 import json
 import websockets
 from loguru import logger
@@ -9,7 +9,7 @@ from pathlib import Path
 from .agent_interface import AgentInterface
 from ..output_types import AudioOutput, Actions, DisplayText
 from ..input_types import BatchInput
-from ...chat_history_manager import get_metadata, update_metadate
+from ...chat_history_manager import HistoryMessage, get_metadata, update_metadate
 
 
 class HumeAIAgent(AgentInterface):
@@ -53,6 +53,15 @@ class HumeAIAgent(AgentInterface):
         self.cache_dir = Path("./cache")
         self.cache_dir.mkdir(exist_ok=True)
 
+    def new_session(self) -> "HumeAIAgent":
+        """Create an agent with its own EVI connection for a new client session."""
+        return HumeAIAgent(
+            api_key=self.api_key,
+            host=self.host,
+            config_id=self.config_id,
+            idle_timeout=self.idle_timeout,
+        )
+
     async def connect(self, resume_chat_group_id: Optional[str] = None):
         """
         Establish WebSocket connection with optional chat group resumption
@@ -119,13 +128,19 @@ class HumeAIAgent(AgentInterface):
         if not self._connected or not self._ws or self._ws.closed:
             await self.connect(self._chat_group_id)
 
-    def set_memory_from_history(self, conf_uid: str, history_uid: str) -> None:
+    def set_memory_from_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        messages: Optional[List[HistoryMessage]] = None,
+    ) -> None:
         """
         Set chat group ID based on history
 
         Args:
             conf_uid: Configuration ID
             history_uid: History ID
+            messages: Unused, the chat group ID is kept in the metadata
         """
         self._current_conf_uid = conf_uid
         self._current_history_uid = history_uid
@@ -0,0 +1,148 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+# Rough cost of an image part. Providers bill images very differently, this is
+# only used so that image turns are not counted as free.
+IMAGE_TOKEN_ESTIMATE = 765
+# Per-message overhead for role markers and separators
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without a real tokenizer.
+
+    ASCII text is counted as ~4 characters per token. Other characters
+    (CJK in particular) are counted as one token each.
+
+    Args:
+        text: str - The text to count
+
+    Returns:
+        int - The estimated number of tokens
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    ascii_chars = len(text) - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+class ContextWindow:
+    """
+    Keeps the messages sent to the LLM within a token budget.
+
+    Token counts are computed with a pluggable tokenizer and cached by content,
+    so each message is only counted once. The system prompt and the most
+    recent messages are always kept; older messages are dropped from the
+    window (not from memory) once the budget is exhausted.
+
+    Messages are dropped `trim_step` at a time, so the start of the window
+    stays the same for several turns and provider prefix caches keep hitting.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        min_recent_messages: int = 4,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        cache_size: int = 4096,
+        trim_step: int = 8,
+    ):
+        """
+        Args:
+            max_tokens: Optional[int] - Token budget for system prompt and messages.
+                None or 0 disables windowing.
+            min_recent_messages: int - Number of most recent messages that are
+                always kept, even when they exceed the budget
+            tokenizer: Optional[Callable[[str], int]] - Function returning the number
+                of tokens of a text. Defaults to `approximate_token_count`.
+            cache_size: int - Number of distinct texts to cache token counts for
+            trim_step: int - Old messages are dropped in multiples of this number
+        """
+        self.max_tokens = max_tokens or None
+        self.min_recent_messages = max(0, min_recent_messages)
+        self.trim_step = max(1, trim_step)
+        self._count_text = lru_cache(maxsize=cache_size)(
+            tokenizer or approximate_token_count
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens is not None
+
+    def count_text(self, text: str) -> int:
+        """Return the (cached) token count of a text."""
+        return self._count_text(text) if text else 0
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Return the (cached) token count of a chat message."""
+        content = message.get("content")
+        tokens = MESSAGE_TOKEN_OVERHEAD
+        if isinstance(content, str):
+            tokens += self.count_text(content)
+        elif isinstance(content, list):
+            for part in content:
+                if not isinstance(part, dict):
+                    continue
+                if part.get("type") == "text":
+                    tokens += self.count_text(part.get("text", ""))
+                elif part.get("type") in ("image_url", "image"):
+                    tokens += IMAGE_TOKEN_ESTIMATE
+        return tokens
+
+    def fit(
+        self,
+        messages: List[Dict[str, Any]],
+        system: str = "",
+        reserved_tokens: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recent slice of `messages` that fits the token budget.
+
+        Args:
+            messages: List[Dict[str, Any]] - Chat history, oldest first
+            system: str - System prompt sent along with the messages
+            reserved_tokens: int - Tokens reserved for content appended later,
+                e.g. the new user message
+
+        Returns:
+            List[Dict[str, Any]] - A new list holding the kept messages
+        """
+        if not self.enabled or not messages:
+            return list(messages)
+
+        budget = self.max_tokens - self.count_text(system) - reserved_tokens
+        keep_from = len(messages)
+        used = 0
+        for index in range(len(messages) - 1, -1, -1):
+            tokens = self.count_message(messages[index])
+            is_recent = len(messages) - index <= self.min_recent_messages
+            if not is_recent and used + tokens > budget:
+                break
+            used += tokens
+            keep_from = index
+
+        if keep_from > 0:
+            # Round up to the next step, without eating into the recent messages
+            keep_from = min(
+                -(-keep_from // self.trim_step) * self.trim_step,
+                max(keep_from, len(messages) - self.min_recent_messages),
+            )
+
+        # Do not start the window in the middle of an exchange: most providers
+        # expect the first non-system message to come from the user.
+        while (
+            0 < keep_from < len(messages)
+            and messages[keep_from].get("role") != "user"
+            and len(messages) - keep_from > self.min_recent_messages
+        ):
+            keep_from += 1
+
+        if keep_from > 0:
+            logger.debug(
+                f"Context window: dropped {keep_from} of {len(messages)} messages "
+                f"(budget {self.max_tokens} tokens)"
+            )
+        return messages[keep_from:]
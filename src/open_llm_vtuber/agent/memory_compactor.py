@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from prompts import prompt_loader
+from .stateless_llm.stateless_llm_interface import StatelessLLMInterface
+
+SUMMARY_PROMPT_NAME = "memory_summary_prompt"
+SUMMARY_PREFIX = "[Summary of the earlier conversation]\n"
+
+# The LLM clients report failures as text in the stream instead of raising
+_LLM_ERROR_MARKERS = ("Error calling the chat endpoint", "[Error")
+
+
+class MemoryCompactor:
+    """
+    Summarizes the older part of an agent's memory with the agent's own LLM.
+
+    The compactor only produces summaries. Deciding when to compact and
+    replacing messages in memory is left to the agent, which runs it in a
+    background task so that it never delays a response.
+    """
+
+    def __init__(
+        self,
+        llm: StatelessLLMInterface,
+        summarize_after_messages: Optional[int] = None,
+        keep_recent_messages: int = 10,
+    ):
+        """
+        Args:
+            llm: StatelessLLMInterface - The LLM used to write summaries
+            summarize_after_messages: Optional[int] - Compact once memory holds
+                more than this many messages. None or 0 disables compaction.
+            keep_recent_messages: int - Number of most recent messages that are
+                never summarized
+        """
+        self._llm = llm
+        self.summarize_after_messages = summarize_after_messages or None
+        self.keep_recent_messages = max(1, keep_recent_messages)
+        self._prompt: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.summarize_after_messages is not None
+
+    def split_point(self, memory: List[Dict[str, Any]]) -> int:
+        """
+        Return the number of leading messages that should be summarized,
+        or 0 if memory does not need compaction yet.
+        """
+        if not self.enabled or len(memory) <= self.summarize_after_messages:
+            return 0
+        split = len(memory) - self.keep_recent_messages
+        # A lone summary message is already as compact as it gets
+        if split <= 1:
+            return 0
+        return split
+
+    @staticmethod
+    def is_summary(message: Dict[str, Any]) -> bool:
+        content = message.get("content")
+        return isinstance(content, str) and content.startswith(SUMMARY_PREFIX)
+
+    @staticmethod
+    def to_message(summary: str, role: str) -> Dict[str, Any]:
+        """Build the memory message holding a summary."""
+        return {"role": role, "content": f"{SUMMARY_PREFIX}{summary}"}
+
+    def _load_prompt(self) -> str:
+        if self._prompt is None:
+            self._prompt = prompt_loader.load_util(SUMMARY_PROMPT_NAME)
+        return self._prompt
+
+    @staticmethod
+    def _to_transcript(messages: List[Dict[str, Any]]) -> str:
+        lines = []
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, str) or not content:
+                continue
+            if MemoryCompactor.is_summary(message):
+                lines.append(content)
+                continue
+            speaker = message.get("name") or message.get("role", "unknown")
+            lines.append(f"{speaker}: {content}")
+        return "\n".join(lines)
+
+    async def summarize(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Summarize messages (which may start with a previous summary).
+
+        Returns:
+            str - The summary, or an empty string if the LLM failed
+        """
+        transcript = self._to_transcript(messages)
+        if not transcript:
+            return ""
+
+        summary = ""
+        async for event in self._llm.chat_completion(
+            [{"role": "user", "content": transcript}], self._load_prompt()
+        ):
+            if isinstance(event, str):
+                summary += event
+            elif isinstance(event, dict) and event.get("type") == "text_delta":
+                summary += event.get("text", "")
+
+        summary = summary.strip()
+        if (
+            summary.startswith(_LLM_ERROR_MARKERS)
+            or summary == "__API_NOT_SUPPORT_TOOLS__"
+        ):
+            logger.warning(f"Memory summarization failed: {summary[:200]}")
+            return ""
+        return summary
@@ -10,6 +10,11 @@ from loguru import logger
 from anthropic import AsyncAnthropic, NOT_GIVEN
 
 from .stateless_llm_interface import StatelessLLMInterface
+from .prompt_cache import (
+    cacheable_system,
+    cacheable_tools,
+    shared_prompt_cache_stats,
+)
 
 
 class AsyncLLM(StatelessLLMInterface):
@@ -19,6 +24,7 @@ class AsyncLLM(StatelessLLMInterface):
         base_url: str = None,
         llm_api_key: str = None,
         system: str = None,
+        prompt_caching: bool = True,
     ):
         """
         Initialize Claude LLM.
@@ -28,9 +34,14 @@ class AsyncLLM(StatelessLLMInterface):
             base_url (str): Base URL for Claude API
             llm_api_key (str): Claude API key
             system (str): System prompt
+            prompt_caching (bool): Mark the system prompt and tool list as cacheable
         """
         self.model = model
         self.system = system
+        self.prompt_caching = prompt_caching
+        self.prompt_cache_stats = shared_prompt_cache_stats(
+            model, base_url or "anthropic"
+        )
 
         # Initialize Claude client
         self.client = AsyncAnthropic(
@@ -81,6 +92,23 @@ class AsyncLLM(StatelessLLMInterface):
         # Handle plain text content or non-list content
         return message
 
+    def _record_usage(self, usage) -> None:
+        """Record the prompt cache usage reported at the start of a message."""
+        if usage is None:
+            return
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        self.prompt_cache_stats.record(
+            prompt_tokens=input_tokens + cache_read + cache_write,
+            cached_tokens=cache_read,
+            cache_write_tokens=cache_write,
+        )
+        logger.debug(
+            f"Prompt cache: read {cache_read}, written {cache_write}, "
+            f"uncached {input_tokens} tokens. Stats: {self.prompt_cache_stats.to_dict()}"
+        )
+
     async def chat_completion(
         self,
         messages: List[Dict[str, Any]],
@@ -119,12 +147,22 @@ class AsyncLLM(StatelessLLMInterface):
             logger.debug(f"Sending messages to Claude API: {converted_messages}")
             logger.debug(f"Tools provided: {tools}")
 
+            system_prompt = system if system else (self.system if self.system else "")
+            if self.prompt_caching:
+                # The system prompt and tool list are identical on every turn,
+                # so they are marked as a cacheable prefix.
+                system_param = cacheable_system(system_prompt) if system_prompt else ""
+                tools_param = cacheable_tools(tools) if tools else NOT_GIVEN
+            else:
+                system_param = system_prompt
+                tools_param = tools if tools else NOT_GIVEN
+
             async with self.client.messages.stream(
                 messages=converted_messages,
-                system=system if system else (self.system if self.system else ""),
+                system=system_param,
                 model=self.model,
                 max_tokens=1024,
-                tools=tools if tools else NOT_GIVEN,
+                tools=tools_param,
             ) as stream:
                 current_tool_call_info = None
                 partial_json_accumulator = ""
@@ -132,6 +170,7 @@ class AsyncLLM(StatelessLLMInterface):
                 async for event in stream:
                     if event.type == "message_start":
                         logger.debug("Stream: message_start")
+                        self._record_usage(event.message.usage)
                         yield {
                             "type": "message_start",
                             "data": event.message.model_dump(exclude_none=True),
@@ -0,0 +1,293 @@
+"""Description: This file contains the implementation of the `HedgedLLM` class.
+It spreads requests over several LLM endpoints, routes them by health and
+measured time-to-first-token, hedges slow requests and fails over on errors.
+"""
+
+import time
+import asyncio
+from contextlib import suppress
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .stateless_llm_interface import StatelessLLMInterface
+
+# The OpenAI-compatible clients report failures as text instead of raising
+_ERROR_TEXT_PREFIX = "Error calling the chat endpoint"
+# Weight of the latest measurement in the time-to-first-token average
+_TTFT_SMOOTHING = 0.3
+
+
+class LLMEndpointError(Exception):
+    """Raised when an endpoint fails before producing its first token."""
+
+    def __init__(self, message: str, event: Any = None):
+        super().__init__(message)
+        # The error event reported by the endpoint, if any
+        self.event = event
+
+
+class LLMEndpoint:
+    """An LLM client with its health and latency statistics."""
+
+    def __init__(self, name: str, llm: StatelessLLMInterface):
+        self.name = name
+        self.llm = llm
+        self.ttft: Optional[float] = None
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_success(self, ttft: float) -> None:
+        self.failures = 0
+        self.unhealthy_until = 0.0
+        if self.ttft is None:
+            self.ttft = ttft
+        else:
+            self.ttft = (1 - _TTFT_SMOOTHING) * self.ttft + _TTFT_SMOOTHING * ttft
+
+    def record_failure(self, cooldown: float) -> None:
+        self.failures += 1
+        # Back off longer for endpoints that keep failing
+        self.unhealthy_until = time.monotonic() + cooldown * min(self.failures, 10)
+
+
+class HedgedLLM(StatelessLLMInterface):
+    def __init__(
+        self,
+        endpoints: List[Tuple[str, StatelessLLMInterface]],
+        hedge_after: Optional[float] = None,
+        first_token_timeout: float = 30.0,
+        failure_cooldown: float = 30.0,
+    ):
+        """
+        Initializes a composite LLM over several endpoints.
+
+        Requests go to the healthy endpoint with the lowest measured
+        time-to-first-token; endpoints without measurements yet are tried first,
+        in configured order. If the first token has not arrived after
+        `hedge_after` seconds, the same request is sent to the next endpoint and
+        whichever answers first wins; the other request is cancelled. An endpoint
+        that fails or times out before its first token is marked unhealthy for a
+        while and the request fails over to the next one.
+
+        Parameters:
+        - endpoints (List[Tuple[str, StatelessLLMInterface]]): Named endpoints in
+          priority order. When MCP tools are used, they should share one API
+          family (OpenAI-compatible or Claude), the first one decides the tool format.
+        - hedge_after (float, optional): Seconds to wait for the first token before
+          sending a hedged request. None disables hedging.
+        - first_token_timeout (float): Seconds to wait for the first token before
+          an endpoint is considered failed.
+        - failure_cooldown (float): Seconds an endpoint is skipped after a failure.
+        """
+        if not endpoints:
+            raise ValueError("HedgedLLM needs at least one endpoint")
+        self.endpoints = [LLMEndpoint(name, llm) for name, llm in endpoints]
+        self.hedge_after = hedge_after
+        self.first_token_timeout = first_token_timeout
+        self.failure_cooldown = failure_cooldown
+
+        logger.info(
+            f"Initialized HedgedLLM with endpoints: {[e.name for e in self.endpoints]}, "
+            f"hedge_after: {hedge_after}"
+        )
+
+    @property
+    def primary_llm(self) -> StatelessLLMInterface:
+        """The first configured endpoint. It decides the tool calling format."""
+        llm = self.endpoints[0].llm
+        return getattr(llm, "primary_llm", llm)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.primary_llm, "model", "")
+
+    def _ranked_endpoints(self) -> List[LLMEndpoint]:
+        """Healthy endpoints first, unmeasured ones before measured ones by latency."""
+        return sorted(
+            self.endpoints,
+            key=lambda e: (
+                not e.healthy,
+                e.ttft is not None,
+                e.ttft or 0.0,
+            ),
+        )
+
+    @staticmethod
+    def _is_first_token(event: Any) -> bool:
+        """Whether an event carries model output (text or tool calls)."""
+        if isinstance(event, dict):
+            return event.get("type") in (
+                "text_delta",
+                "tool_use_start",
+                "tool_use_complete",
+            )
+        return event is not None
+
+    @staticmethod
+    def _is_error(event: Any) -> bool:
+        if isinstance(event, str):
+            return event.startswith(_ERROR_TEXT_PREFIX)
+        if isinstance(event, dict):
+            return event.get("type") == "error"
+        return isinstance(event, Exception)
+
+    async def _wait_first_token(
+        self,
+        endpoint: LLMEndpoint,
+        messages: List[Dict[str, Any]],
+        system: str,
+        kwargs: Dict[str, Any],
+    ) -> Tuple[AsyncIterator[Any], List[Any]]:
+        """
+        Start a request on an endpoint and read it up to the first token.
+
+        Returns:
+        - The response stream and the events read so far (ending with the first token).
+
+        Raises:
+        - LLMEndpointError: If the endpoint reports an error before the first token.
+        """
+        start_time = time.monotonic()
+        stream = endpoint.llm.chat_completion(messages, system, **kwargs)
+        buffered = []
+        try:
+            async for event in stream:
+                if self._is_error(event):
+                    raise LLMEndpointError(f"{endpoint.name}: {event}", event)
+                buffered.append(event)
+                if self._is_first_token(event):
+                    break
+        except BaseException:
+            with suppress(Exception):
+                await stream.aclose()
+            raise
+        endpoint.record_success(time.monotonic() - start_time)
+        return stream, buffered
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        system: str = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Generates a chat completion on the best endpoint, with hedging and failover.
+
+        Parameters:
+        - messages (List[Dict[str, Any]]): The list of messages to send to the API.
+        - system (str, optional): System prompt to use for this completion.
+        - **kwargs: Passed to every endpoint, e.g. `tools`.
+
+        Yields:
+        - The events of the winning endpoint, unchanged.
+        """
+        candidates = iter(self._ranked_endpoints())
+        pending: Dict[asyncio.Task, LLMEndpoint] = {}
+        last_error: Optional[BaseException] = None
+        winner = None
+
+        def launch() -> bool:
+            endpoint = next(candidates, None)
+            if endpoint is None:
+                return False
+            logger.debug(f"HedgedLLM: sending request to {endpoint.name}")
+            task = asyncio.create_task(
+                self._wait_first_token(endpoint, messages, system, kwargs)
+            )
+            pending[task] = endpoint
+            return True
+
+        try:
+            launch()
+            deadline = time.monotonic() + self.first_token_timeout
+            hedge_at = (
+                time.monotonic() + self.hedge_after
+                if self.hedge_after is not None
+                else None
+            )
+
+            while pending and winner is None:
+                now = time.monotonic()
+                timeout = deadline - now
+                if hedge_at is not None:
+                    timeout = min(timeout, hedge_at - now)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, timeout),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        # Slow first token: race the next endpoint (once)
+                        hedge_at = None
+                        if launch():
+                            logger.info(
+                                f"HedgedLLM: no first token after {self.hedge_after}s, sent hedged request."
+                            )
+                        continue
+                    # Every pending request timed out: fail over
+                    for task, endpoint in pending.items():
+                        logger.warning(
+                            f"HedgedLLM: {endpoint.name} timed out waiting for the first token."
+                        )
+                        endpoint.record_failure(self.failure_cooldown)
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    pending.clear()
+                    last_error = TimeoutError("Timed out waiting for the first token")
+                    if launch():
+                        deadline = time.monotonic() + self.first_token_timeout
+                    continue
+
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is None:
+                        winner = (endpoint, *task.result())
+                        break
+                    last_error = task.exception()
+                    logger.warning(f"HedgedLLM: {endpoint.name} failed: {last_error}")
+                    endpoint.record_failure(self.failure_cooldown)
+                    if not pending and launch():
+                        deadline = time.monotonic() + self.first_token_timeout
+        finally:
+            # Cancel the losers (or everything, if we were cancelled ourselves)
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                with suppress(BaseException):
+                    result = await task
+                    await result[0].aclose()
+
+        if winner is None:
+            logger.error(f"HedgedLLM: all endpoints failed. Last error: {last_error}")
+            if (
+                isinstance(last_error, LLMEndpointError)
+                and last_error.event is not None
+            ):
+                yield last_error.event
+                return
+            if last_error is not None:
+                raise last_error
+            return
+
+        endpoint, stream, buffered = winner
+        logger.debug(f"HedgedLLM: {endpoint.name} won (ttft avg {endpoint.ttft:.2f}s)")
+        try:
+            for event in buffered:
+                yield event
+            async for event in stream:
+                yield event
+        finally:
+            await stream.aclose()
+
+    async def warmup(self) -> None:
+        await asyncio.gather(*(e.llm.warmup() for e in self.endpoints))
+
+    async def shutdown(self) -> None:
+        await asyncio.gather(*(e.llm.shutdown() for e in self.endpoints))
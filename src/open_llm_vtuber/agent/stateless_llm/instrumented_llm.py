@@ -0,0 +1,147 @@
+"""Description: This file contains the implementation of the `InstrumentedLLM` class.
+It wraps any stateless LLM and records the latency and throughput of each request.
+"""
+
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+from .stateless_llm_interface import StatelessLLMInterface
+from .llm_metrics import LLMMetricsSink, LLMRequestMetrics, add_to_trace, llm_metrics
+
+# The OpenAI-compatible clients report failures as text instead of raising
+_ERROR_TEXT_PREFIX = "Error calling the chat endpoint"
+_TOOL_EVENT_TYPES = ("tool_use_start", "tool_use_complete")
+
+
+class InstrumentedLLM(StatelessLLMInterface):
+    def __init__(
+        self,
+        llm: StatelessLLMInterface,
+        provider: str,
+        sink: Optional[LLMMetricsSink] = None,
+    ):
+        """
+        Wraps an LLM client and records one `LLMRequestMetrics` per request:
+        time to first token, last token, streamed token count, when the first
+        tool call was detected and the error class if the request failed.
+
+        Metrics go to `sink` (the shared `llm_metrics` by default) and to the
+        active `llm_trace()`, if any. The events of the wrapped client are
+        passed through unchanged, and other attributes are read from it.
+
+        Parameters:
+        - llm (StatelessLLMInterface): The client to instrument.
+        - provider (str): Name reported in the metrics, e.g. the llm_provider.
+        - sink (LLMMetricsSink, optional): Where finished requests are recorded.
+        """
+        self._llm = llm
+        self.provider = provider
+        self._sink = sink or llm_metrics
+        self.last_metrics: Optional[LLMRequestMetrics] = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the wrapper itself
+        if name == "_llm":
+            raise AttributeError(name)
+        return getattr(self._llm, name)
+
+    @property
+    def wrapped_llm(self) -> StatelessLLMInterface:
+        return self._llm
+
+    @property
+    def primary_llm(self) -> StatelessLLMInterface:
+        """The client that decides the tool calling format."""
+        return getattr(self._llm, "primary_llm", self._llm)
+
+    @staticmethod
+    def _record_event(metrics: LLMRequestMetrics, event: Any, now: float) -> None:
+        text = None
+        is_tool_call = False
+        if isinstance(event, str):
+            if event.startswith(_ERROR_TEXT_PREFIX):
+                metrics.error_class = "ErrorResponse"
+                return
+            if event == "__API_NOT_SUPPORT_TOOLS__":
+                return
+            text = event
+        elif isinstance(event, dict):
+            event_type = event.get("type")
+            if event_type == "text_delta":
+                text = event.get("text", "")
+            elif event_type in _TOOL_EVENT_TYPES:
+                is_tool_call = True
+            elif event_type == "error":
+                metrics.error_class = "ErrorResponse"
+                return
+            else:
+                return
+        elif isinstance(event, list):
+            # OpenAI-compatible clients yield a list of ToolCallObject
+            is_tool_call = True
+        else:
+            return
+
+        if is_tool_call and metrics.tool_call_at is None:
+            metrics.tool_call_at = now
+        if text:
+            metrics.tokens += 1
+            metrics.characters += len(text)
+        elif not is_tool_call:
+            return
+        if metrics.first_token_at is None:
+            metrics.first_token_at = now
+        metrics.last_token_at = now
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        system: str = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Generates a chat completion with the wrapped client and records its metrics.
+
+        Parameters:
+        - messages (List[Dict[str, Any]]): The list of messages to send to the API.
+        - system (str, optional): System prompt to use for this completion.
+        - **kwargs: Passed to the wrapped client, e.g. `tools`.
+
+        Yields:
+        - The events of the wrapped client, unchanged.
+        """
+        metrics = LLMRequestMetrics(
+            provider=self.provider,
+            model=str(getattr(self._llm, "model", "") or ""),
+            started_at=time.perf_counter(),
+        )
+        stream = self._llm.chat_completion(messages, system, **kwargs)
+        try:
+            async for event in stream:
+                self._record_event(metrics, event, time.perf_counter())
+                yield event
+        except GeneratorExit:
+            metrics.cancelled = True
+            raise
+        except BaseException as e:
+            # CancelledError and KeyboardInterrupt are not failures of the LLM
+            if isinstance(e, Exception):
+                metrics.error_class = type(e).__name__
+            else:
+                metrics.cancelled = True
+            raise
+        finally:
+            await stream.aclose()
+            metrics.finished_at = time.perf_counter()
+            self.last_metrics = metrics
+            self._sink.record(metrics)
+            add_to_trace(metrics)
+            logger.debug(f"LLM request metrics: {metrics.to_dict()}")
+
+    async def warmup(self) -> None:
+        await self._llm.warmup()
+
+    async def shutdown(self) -> None:
+        await self._llm.shutdown()
@@ -3,24 +3,42 @@ This class provides a stateless interface to llama.cpp for language generation.
 """
 
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import AsyncIterator, List, Dict, Any
-from llama_cpp import Llama
+from llama_cpp import Llama, LlamaRAMCache
 from loguru import logger
 
 from .stateless_llm_interface import StatelessLLMInterface
 
+# Marks the end of a generation in the token queue
+_END_OF_STREAM = object()
+
 
 class LLM(StatelessLLMInterface):
     def __init__(
         self,
         model_path: str,
+        cache_capacity_mb: int = 0,
         **kwargs,
     ):
         """
         Initializes a stateless instance of the LLM class using llama.cpp.
 
+        Generation runs on a dedicated worker thread that owns the `Llama` object,
+        so decoding never blocks the event loop. Requests are processed one at a
+        time on that thread, which also lets llama.cpp reuse the KV cache of the
+        prompt prefix (system prompt and history) shared with the previous request.
+
+        With `cache_capacity_mb` set, the model state after each completion is
+        saved (`save_state`) in an LRU cache keyed by tokens and capped in size.
+        A request restores (`load_state`) the state with the longest matching
+        prefix, so when several sessions alternate, each one resumes from its
+        own conversation and only its new tokens are evaluated.
+
         Parameters:
         - model_path (str): Path to the GGUF model file
+        - cache_capacity_mb (int): Memory cap of the saved states in MB. 0 disables it.
         - **kwargs: Additional arguments passed to Llama constructor
         """
         logger.info(f"Initializing llama cpp with model path: {model_path}")
@@ -30,6 +48,52 @@ class LLM(StatelessLLMInterface):
         except Exception as e:
             logger.critical(f"Failed to initialize Llama model: {e}")
             raise
+        if cache_capacity_mb > 0:
+            logger.info(f"llama.cpp session state cache: {cache_capacity_mb} MB")
+            self.llm.set_cache(
+                LlamaRAMCache(capacity_bytes=cache_capacity_mb * 1024 * 1024)
+            )
+        # llama.cpp contexts are not thread-safe: a single worker owns the model
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="llama-cpp"
+        )
+        # Cancel events of the generations in progress, set on shutdown
+        self._cancel_events: set[threading.Event] = set()
+
+    def _generate(
+        self,
+        messages: List[Dict[str, Any]],
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+        cancel_event: threading.Event,
+    ) -> None:
+        """
+        Run a streaming completion on the worker thread and push each content
+        chunk to `queue`. Stops early when `cancel_event` is set.
+        """
+        try:
+            if cancel_event.is_set():
+                return
+            chat_completion = self.llm.create_chat_completion(
+                messages=messages,
+                stream=True,
+            )
+            try:
+                for chunk in chat_completion:
+                    if cancel_event.is_set():
+                        logger.debug("llama.cpp generation cancelled.")
+                        break
+                    if chunk.get("choices") and chunk["choices"][0].get("delta"):
+                        content = chunk["choices"][0]["delta"].get("content", "")
+                        if content:
+                            loop.call_soon_threadsafe(queue.put_nowait, content)
+            finally:
+                # Closing the generator stops llama.cpp from decoding further tokens
+                chat_completion.close()
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _END_OF_STREAM)
 
     async def chat_completion(
         self, messages: List[Dict[str, Any]], system: str = None
@@ -46,31 +110,42 @@ class LLM(StatelessLLMInterface):
         """
         logger.debug(f"Generating completion for messages: {messages}")
 
+        # Add system prompt if provided
+        messages_with_system = messages
+        if system:
+            messages_with_system = [
+                {"role": "system", "content": system},
+                *messages,
+            ]
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancel_event = threading.Event()
+        self._cancel_events.add(cancel_event)
+
         try:
-            # Add system prompt if provided
-            messages_with_system = messages
-            if system:
-                messages_with_system = [
-                    {"role": "system", "content": system},
-                    *messages,
-                ]
-
-            # Create chat completion in a separate thread to avoid blocking
-            chat_completion = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.llm.create_chat_completion(
-                    messages=messages_with_system,
-                    stream=True,
-                ),
+            self._executor.submit(
+                self._generate, messages_with_system, loop, queue, cancel_event
             )
-
-            # Process chunks
-            for chunk in chat_completion:
-                if chunk.get("choices") and chunk["choices"][0].get("delta"):
-                    content = chunk["choices"][0]["delta"].get("content", "")
-                    if content:
-                        yield content
+            while True:
+                item = await queue.get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
 
         except Exception as e:
             logger.error(f"Error in chat completion: {e}")
             raise
+
+        finally:
+            # Interrupted (cancelled or closed early): stop decoding on the worker
+            cancel_event.set()
+            self._cancel_events.discard(cancel_event)
+
+    async def shutdown(self) -> None:
+        """Stop the running generation and the worker thread without waiting for them."""
+        for cancel_event in list(self._cancel_events):
+            cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
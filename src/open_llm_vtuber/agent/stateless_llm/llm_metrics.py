@@ -0,0 +1,226 @@
+"""Latency and throughput metrics of LLM requests.
+
+`InstrumentedLLM` records one `LLMRequestMetrics` per `chat_completion` call
+and hands it to an `LLMMetricsSink`. Requests made inside an `llm_trace()`
+block are also collected on that trace, so a conversation turn can report
+the LLM calls it made.
+"""
+
+import abc
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class LLMRequestMetrics:
+    """Timings of a single LLM request.
+
+    Times are `time.perf_counter()` values; use the properties for durations.
+
+    Args:
+        provider (str): Name of the LLM client (e.g. the llm_provider).
+        model (str): Model name, if the client exposes one.
+        started_at (float): When the request was sent.
+        first_token_at (float, optional): When the first text or tool call arrived.
+        last_token_at (float, optional): When the last text or tool call arrived.
+        finished_at (float, optional): When the stream ended.
+        tokens (int): Number of streamed text chunks. Providers stream about one
+            token per chunk, so this is used as the token count.
+        characters (int): Number of streamed text characters.
+        tool_call_at (float, optional): When the first tool call was detected.
+        error_class (str, optional): Class of the error that ended the request,
+            `ErrorResponse` if the client reported the error in the stream.
+        cancelled (bool): Whether the request was interrupted before it finished.
+    """
+
+    provider: str
+    model: str = ""
+    started_at: float = 0.0
+    first_token_at: Optional[float] = None
+    last_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    tokens: int = 0
+    characters: int = 0
+    tool_call_at: Optional[float] = None
+    error_class: Optional[str] = None
+    cancelled: bool = False
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the request to the first token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds from the request to the end of the stream."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def tool_call_latency(self) -> Optional[float]:
+        """Seconds from the request to the first detected tool call."""
+        if self.tool_call_at is None:
+            return None
+        return self.tool_call_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Streaming rate between the first and the last token."""
+        if self.first_token_at is None or self.last_token_at is None:
+            return None
+        elapsed = self.last_token_at - self.first_token_at
+        if self.tokens < 2 or elapsed <= 0:
+            return None
+        # The first token marks the start of the interval
+        return (self.tokens - 1) / elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "ttft": rounded(self.ttft),
+            "duration": rounded(self.duration),
+            "tokens": self.tokens,
+            "characters": self.characters,
+            "tokens_per_second": rounded(self.tokens_per_second),
+            "tool_call_latency": rounded(self.tool_call_latency),
+            "error_class": self.error_class,
+            "cancelled": self.cancelled,
+        }
+
+
+class LLMMetricsSink(metaclass=abc.ABCMeta):
+    """Receives the metrics of finished LLM requests."""
+
+    @abc.abstractmethod
+    def record(self, metrics: LLMRequestMetrics) -> None:
+        """Record the metrics of one finished request. Must not block."""
+        raise NotImplementedError
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 3) if values else None
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class InMemoryLLMMetrics(LLMMetricsSink):
+    """Keeps the metrics of the most recent requests and summarizes them per provider."""
+
+    def __init__(self, max_requests: int = 500):
+        self._requests: deque[LLMRequestMetrics] = deque(maxlen=max_requests)
+        self._lock = threading.Lock()
+
+    def record(self, metrics: LLMRequestMetrics) -> None:
+        with self._lock:
+            self._requests.append(metrics)
+
+    def recent(self, limit: int = 50) -> List[LLMRequestMetrics]:
+        """Return the most recent requests, newest last."""
+        with self._lock:
+            return list(self._requests)[-limit:]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Aggregate the kept requests per provider and model."""
+        with self._lock:
+            requests = list(self._requests)
+
+        groups: Dict[str, List[LLMRequestMetrics]] = {}
+        for metrics in requests:
+            key = (
+                f"{metrics.provider}:{metrics.model}"
+                if metrics.model
+                else metrics.provider
+            )
+            groups.setdefault(key, []).append(metrics)
+
+        summary = {}
+        for key, group in groups.items():
+            ttfts = [m.ttft for m in group if m.ttft is not None]
+            rates = [
+                m.tokens_per_second for m in group if m.tokens_per_second is not None
+            ]
+            summary[key] = {
+                "requests": len(group),
+                "errors": sum(1 for m in group if m.error_class),
+                "cancelled": sum(1 for m in group if m.cancelled),
+                "tool_calls": sum(1 for m in group if m.tool_call_at is not None),
+                "ttft_avg": _mean(ttfts),
+                "ttft_p50": _percentile(ttfts, 50),
+                "ttft_p95": _percentile(ttfts, 95),
+                "tokens_per_second_avg": _mean(rates),
+            }
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+
+
+# Default sink of all instrumented LLM clients
+llm_metrics = InMemoryLLMMetrics()
+
+_current_trace: ContextVar[Optional[List[LLMRequestMetrics]]] = ContextVar(
+    "llm_trace", default=None
+)
+
+
+@contextmanager
+def llm_trace() -> Iterator[List[LLMRequestMetrics]]:
+    """
+    Collect the metrics of the LLM requests made inside this block (in this
+    task and the tasks it creates) into the yielded list.
+    """
+    trace: List[LLMRequestMetrics] = []
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def add_to_trace(metrics: LLMRequestMetrics) -> None:
+    """Add request metrics to the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append(metrics)
+
+
+def format_trace(trace: List[LLMRequestMetrics]) -> str:
+    """One line per request, for logging."""
+    lines = []
+    for metrics in trace:
+        line = f"{metrics.provider}"
+        if metrics.model:
+            line += f" ({metrics.model})"
+        if metrics.ttft is not None:
+            line += f": ttft {metrics.ttft:.2f}s"
+        if metrics.tokens_per_second is not None:
+            line += f", {metrics.tokens_per_second:.1f} tok/s"
+        line += f", {metrics.tokens} tokens"
+        if metrics.tool_call_latency is not None:
+            line += f", tool call at {metrics.tool_call_latency:.2f}s"
+        if metrics.duration is not None:
+            line += f", total {metrics.duration:.2f}s"
+        if metrics.error_class:
+            line += f", error {metrics.error_class}"
+        if metrics.cancelled:
+            line += ", cancelled"
+        lines.append(line)
+    return "\n".join(lines)
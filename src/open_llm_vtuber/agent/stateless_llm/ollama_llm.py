@@ -1,4 +1,5 @@
 import atexit
+import httpx
 import requests
 from loguru import logger
 from .openai_compatible_llm import AsyncLLM
@@ -15,6 +16,7 @@ class OllamaLLM(AsyncLLM):
         temperature: float = 1.0,
         keep_alive: float = -1,
         unload_at_exit: bool = True,
+        stream_usage: bool = False,
     ):
         self.keep_alive = keep_alive
         self.unload_at_exit = unload_at_exit
@@ -26,34 +28,61 @@ class OllamaLLM(AsyncLLM):
             organization_id=organization_id,
             project_id=project_id,
             temperature=temperature,
+            stream_usage=stream_usage,
         )
+        # The model is preloaded by `warmup` and unloaded by `shutdown`.
+        # This is only a fallback for when the server exits without shutting down.
+        if unload_at_exit:
+            atexit.register(self.cleanup)
+
+    @property
+    def _api_chat_url(self) -> str:
+        return self.base_url.replace("/v1", "") + "/api/chat"
+
+    def _extra_body(self) -> dict:
+        """
+        Send keep_alive with every request. Ollama resets the keep-alive of a model
+        to its default on each request that does not carry one, which unloads the
+        model (and its KV cache of the conversation prefix) between turns.
+        """
+        return {"keep_alive": self.keep_alive}
+
+    async def warmup(self) -> None:
+        """Preload the model without blocking the event loop."""
+        logger.info(f"Preloading model for Ollama: {self.model}")
         try:
-            # preload model
-            logger.info("Preloading model for Ollama")
-            # Send the POST request to preload model
-            logger.debug(
-                requests.post(
-                    base_url.replace("/v1", "") + "/api/chat",
-                    json={
-                        "model": model,
-                        "keep_alive": keep_alive,
-                    },
+            # A chat request without messages only loads the model
+            async with httpx.AsyncClient(timeout=None) as client:
+                response = await client.post(
+                    self._api_chat_url,
+                    json={"model": self.model, "keep_alive": self.keep_alive},
                 )
-            )
-        except requests.exceptions.ConnectionError as e:
+            logger.debug(response)
+            logger.info(f"Ollama model loaded: {self.model}")
+        except httpx.ConnectError as e:
             logger.error(f"Failed to preload model: {e}")
             logger.critical(
                 "Fail to connect to Ollama backend. Is Ollama server running? Try running `ollama list` to start the server and try again.\nThe AI will repeat 'Error connecting chat endpoint' until the server is running."
             )
         except Exception as e:
             logger.error(f"Failed to preload model: {e}")
-        # If keep_alive is less than 0, register cleanup to unload the model
-        if unload_at_exit:
-            atexit.register(self.cleanup)
 
-    def __del__(self):
-        """Destructor to unload the model"""
-        self.cleanup()
+    async def shutdown(self) -> None:
+        """Unload the model without blocking the event loop."""
+        if self.cleaned or not self.unload_at_exit:
+            return
+        logger.info(f"Ollama: Unloading model: {self.model}")
+        try:
+            # unloading is just the same as preload, but with keep alive set to 0
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.post(
+                    self._api_chat_url,
+                    json={"model": self.model, "keep_alive": 0},
+                )
+            logger.debug(response)
+        except Exception as e:
+            logger.error(f"Failed to unload model: {e}")
+        self.cleaned = True
 
     def cleanup(self):
         """Clean up function to unload the model when exitting"""
@@ -61,13 +90,17 @@ class OllamaLLM(AsyncLLM):
             logger.info(f"Ollama: Unloading model: {self.model}")
             # Unload the model
             # unloading is just the same as preload, but with keep alive set to 0
-            logger.debug(
-                requests.post(
-                    self.base_url.replace("/v1", "") + "/api/chat",
-                    json={
-                        "model": self.model,
-                        "keep_alive": 0,
-                    },
+            try:
+                logger.debug(
+                    requests.post(
+                        self._api_chat_url,
+                        json={
+                            "model": self.model,
+                            "keep_alive": 0,
+                        },
+                        timeout=10,
+                    )
                 )
-            )
+            except Exception as e:
+                logger.error(f"Failed to unload model: {e}")
             self.cleaned = True
@@ -18,7 +18,10 @@ from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall
 from loguru import logger
 
 from .stateless_llm_interface import StatelessLLMInterface
+from .prompt_cache import shared_prompt_cache_stats
+from ...mcpp.json_detector import StreamJSONDetector
 from ...mcpp.types import ToolCallObject
+from ...mcpp.utils.schema import validate_arguments
 
 
 class AsyncLLM(StatelessLLMInterface):
@@ -30,6 +33,7 @@ class AsyncLLM(StatelessLLMInterface):
         organization_id: str = "z",
         project_id: str = "z",
         temperature: float = 1.0,
+        stream_usage: bool = False,
     ):
         """
         Initializes an instance of the `AsyncLLM` class.
@@ -41,10 +45,14 @@ class AsyncLLM(StatelessLLMInterface):
         - project_id (str, optional): The project ID for the OpenAI API. Defaults to "z".
         - llm_api_key (str, optional): The API key for the OpenAI API. Defaults to "z".
         - temperature (float, optional): What sampling temperature to use, between 0 and 2. Defaults to 1.0.
+        - stream_usage (bool, optional): Ask the server to report token usage at the end of the stream
+            (`stream_options.include_usage`), which feeds `prompt_cache_stats`. Defaults to False.
         """
         self.base_url = base_url
         self.model = model
         self.temperature = temperature
+        self.stream_usage = stream_usage
+        self.prompt_cache_stats = shared_prompt_cache_stats(model, base_url)
         self.client = AsyncOpenAI(
             base_url=base_url,
             organization=organization_id,
@@ -57,6 +65,40 @@ class AsyncLLM(StatelessLLMInterface):
             f"Initialized AsyncLLM with the parameters: {self.base_url}, {self.model}"
         )
 
+    def _extra_body(self) -> Dict[str, Any] | None:
+        """Extra provider-specific fields sent with every chat completion request."""
+        return None
+
+    def _record_usage(self, usage) -> None:
+        """Record the prompt cache usage reported in the final stream chunk."""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) if details else 0
+        self.prompt_cache_stats.record(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            cached_tokens=cached_tokens or 0,
+        )
+        logger.debug(
+            f"Prompt cache: {cached_tokens or 0} of {usage.prompt_tokens} prompt tokens cached. "
+            f"Stats: {self.prompt_cache_stats.to_dict()}"
+        )
+
+    def _is_ready_to_dispatch(
+        self,
+        tool_data: Dict[str, Any],
+        parsed_arguments: List[Any],
+        tool_schemas: Dict[str, Dict[str, Any]],
+    ) -> bool:
+        """Whether a streamed tool call is complete and its arguments are valid."""
+        name = tool_data["function"]["name"]
+        if not parsed_arguments or not tool_data["id"] or name not in tool_schemas:
+            return False
+        errors = validate_arguments(parsed_arguments[0], tool_schemas[name])
+        if errors:
+            # Left to the end of the stream, the tool executor reports the errors
+            logger.debug(f"Not dispatching tool call '{name}' early: {errors}")
+            return False
+        return True
+
     async def chat_completion(
         self,
         messages: List[Dict[str, Any]],
@@ -73,7 +115,11 @@ class AsyncLLM(StatelessLLMInterface):
 
         Yields:
         - str: The content of each chunk from the API response.
-        - List[ChoiceDeltaToolCall]: The tool calls detected in the response.
+        - List[ToolCallObject]: The tool calls detected in the response. A call
+            whose arguments are complete and valid against its tool's schema is
+            yielded on its own right away, while the model may still stream
+            further calls. The other calls follow together when the tool call
+            section ends. Each call is yielded exactly once.
 
         Raises:
         - APIConnectionError: When the server cannot be reached
@@ -84,9 +130,14 @@ class AsyncLLM(StatelessLLMInterface):
         # Tool call related state variables
         accumulated_tool_calls = {}
         in_tool_call = False
+        # Detects the end of the argument JSON of each call, by index
+        argument_detectors: Dict[int, StreamJSONDetector] = {}
+        dispatched_indices = set()
 
         try:
-            # If system prompt is provided, add it to the messages
+            # If system prompt is provided, add it to the messages.
+            # It always goes first and unchanged, followed by the history in order,
+            # so that server-side prefix caches (OpenAI, vLLM, llama.cpp) can reuse it.
             messages_with_system = messages
             if system:
                 messages_with_system = [
@@ -96,6 +147,11 @@ class AsyncLLM(StatelessLLMInterface):
             logger.debug(f"Messages: {messages_with_system}")
 
             available_tools = tools if self.support_tools else NOT_GIVEN
+            tool_schemas = {
+                tool["function"]["name"]: tool["function"].get("parameters", {})
+                for tool in (available_tools or [])
+                if isinstance(tool, dict) and "function" in tool
+            }
 
             stream: AsyncStream[
                 ChatCompletionChunk
@@ -105,6 +161,10 @@ class AsyncLLM(StatelessLLMInterface):
                 stream=True,
                 temperature=self.temperature,
                 tools=available_tools,
+                stream_options=(
+                    {"include_usage": True} if self.stream_usage else NOT_GIVEN
+                ),
+                extra_body=self._extra_body(),
             )
             logger.debug(
                 f"Tool Support: {self.support_tools}, Available tools: {available_tools}"
@@ -113,6 +173,13 @@ class AsyncLLM(StatelessLLMInterface):
             chunk_count = 0
             async for chunk in stream:
                 chunk_count += 1
+                if getattr(chunk, "usage", None):
+                    self._record_usage(chunk.usage)
+                # The usage chunk (and some keep-alive chunks) have no choices
+                if len(chunk.choices) == 0:
+                    logger.debug("Chunk without choices received")
+                    continue
+
                 if self.support_tools:
                     has_tool_calls = (
                         hasattr(chunk.choices[0].delta, "tool_calls")
@@ -162,6 +229,29 @@ class AsyncLLM(StatelessLLMInterface):
                                         "arguments"
                                     ] += tool_call.function.arguments
 
+                                    # Dispatch the call as soon as its arguments are
+                                    # complete, so it runs while the model streams on
+                                    if index not in dispatched_indices:
+                                        detector = argument_detectors.setdefault(
+                                            index, StreamJSONDetector()
+                                        )
+                                        if self._is_ready_to_dispatch(
+                                            accumulated_tool_calls[index],
+                                            detector.process_chunk(
+                                                tool_call.function.arguments
+                                            ),
+                                            tool_schemas,
+                                        ):
+                                            dispatched_indices.add(index)
+                                            logger.info(
+                                                f"Tool call ready: {accumulated_tool_calls[index]}"
+                                            )
+                                            yield [
+                                                ToolCallObject.from_dict(
+                                                    accumulated_tool_calls[index]
+                                                )
+                                            ]
+
                     # If we were in a tool call but now we're not, yield the tool call result
                     if in_tool_call and not has_tool_calls:
                         in_tool_call = False
@@ -171,17 +261,19 @@ class AsyncLLM(StatelessLLMInterface):
                         # Use the from_dict method to create a ToolCallObject instance from a dictionary
                         complete_tool_calls = [
                             ToolCallObject.from_dict(tool_data)
-                            for tool_data in accumulated_tool_calls.values()
+                            for index, tool_data in accumulated_tool_calls.items()
+                            if index not in dispatched_indices
                         ]
 
-                        yield complete_tool_calls
-                        accumulated_tool_calls = {}  # Reset for potential future tool calls
+                        if complete_tool_calls:
+                            yield complete_tool_calls
+                        # Reset for potential future tool calls
+                        accumulated_tool_calls = {}
+                        argument_detectors = {}
+                        dispatched_indices = set()
 
                 # Process regular content chunks (whether or not we're in a tool call)
-                if len(chunk.choices) == 0:
-                    logger.info("Empty chunk received")
-                    continue
-                elif chunk.choices[0].delta.content is not None:
+                if chunk.choices[0].delta.content is not None:
                     # Only yield non-empty content
                     if chunk.choices[0].delta.content:
                         yield chunk.choices[0].delta.content
@@ -193,10 +285,12 @@ class AsyncLLM(StatelessLLMInterface):
                 # Create a ToolCallObject instance from a dictionary using the from_dict method.
                 complete_tool_calls = [
                     ToolCallObject.from_dict(tool_data)
-                    for tool_data in accumulated_tool_calls.values()
+                    for index, tool_data in accumulated_tool_calls.items()
+                    if index not in dispatched_indices
                 ]
 
-                yield complete_tool_calls
+                if complete_tool_calls:
+                    yield complete_tool_calls
                 
             logger.info(f"Stream completed after {chunk_count} chunks")
             if chunk_count == 0:
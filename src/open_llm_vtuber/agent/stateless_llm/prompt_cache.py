@@ -0,0 +1,89 @@
+"""Helpers for provider-side prompt caching."""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+@dataclass
+class PromptCacheStats:
+    """Running prompt cache statistics of an LLM client.
+
+    Args:
+        requests (int): Number of requests that reported token usage.
+        cache_hits (int): Number of requests that read at least one cached token.
+        prompt_tokens (int): Total prompt tokens, cached or not.
+        cached_tokens (int): Total prompt tokens read from the cache.
+        cache_write_tokens (int): Total prompt tokens written to the cache.
+    """
+
+    requests: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def record(
+        self, prompt_tokens: int, cached_tokens: int = 0, cache_write_tokens: int = 0
+    ) -> None:
+        """Record the token usage of one request."""
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+        self.cache_write_tokens += cache_write_tokens or 0
+        if cached_tokens:
+            self.cache_hits += 1
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of requests that hit the cache."""
+        return self.cache_hits / self.requests if self.requests else 0.0
+
+    @property
+    def cached_token_ratio(self) -> float:
+        """Share of prompt tokens that were read from the cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_token_ratio": round(self.cached_token_ratio, 3),
+            "cache_write_tokens": self.cache_write_tokens,
+        }
+
+
+# Stats shared by the clients of the same model and endpoint, so the
+# `/llm-metrics` route can report them across sessions
+_shared_stats: Dict[str, PromptCacheStats] = {}
+
+
+def shared_prompt_cache_stats(model: str, endpoint: str) -> PromptCacheStats:
+    """Return the stats of a model at an endpoint, creating them on first use."""
+    return _shared_stats.setdefault(f"{model}@{endpoint}", PromptCacheStats())
+
+
+def prompt_cache_summary() -> Dict[str, Dict[str, Any]]:
+    """Stats of every model that reported token usage, keyed by model@endpoint."""
+    return {
+        key: stats.to_dict() for key, stats in _shared_stats.items() if stats.requests
+    }
+
+
+def cacheable_system(system: str) -> List[Dict[str, Any]]:
+    """Wrap a system prompt into a Claude text block with a cache breakpoint."""
+    return [{"type": "text", "text": system, "cache_control": EPHEMERAL_CACHE_CONTROL}]
+
+
+def cacheable_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Return a copy of a Claude tool list with a cache breakpoint on the last tool,
+    which caches the whole tool list. The input list is not modified.
+    """
+    if not tools:
+        return tools
+    return [*tools[:-1], {**tools[-1], "cache_control": EPHEMERAL_CACHE_CONTROL}]
@@ -39,3 +39,18 @@ class StatelessLLMInterface(metaclass=abc.ABCMeta):
         - APIError: For other API-related errors
         """
         raise NotImplementedError
+
+    async def warmup(self) -> None:
+        """
+        Load the model ahead of the first request, e.g. preload it on a local
+        server. Called once in the background after the LLM is created.
+        Does nothing by default.
+        """
+        pass
+
+    async def shutdown(self) -> None:
+        """
+        Release backend resources, e.g. unload the model from a local server.
+        Called when the server shuts down. Does nothing by default.
+        """
+        pass
@@ -6,6 +6,7 @@ from .stateless_llm.stateless_llm_interface import StatelessLLMInterface
 from .stateless_llm.openai_compatible_llm import AsyncLLM as OpenAICompatibleLLM
 from .stateless_llm.ollama_llm import OllamaLLM
 from .stateless_llm.claude_llm import AsyncLLM as ClaudeLLM
+from .stateless_llm.instrumented_llm import InstrumentedLLM
 
 
 class LLMFactory:
@@ -13,12 +14,19 @@ class LLMFactory:
     def create_llm(llm_provider, **kwargs) -> Type[StatelessLLMInterface]:
         """Create an LLM based on the configuration.
 
+        The LLM is wrapped in an `InstrumentedLLM`, which records the time to
+        first token and streaming rate of every request.
+
         Args:
             llm_provider: The type of LLM to create
             **kwargs: Additional arguments
         """
         logger.info(f"Initializing LLM: {llm_provider}")
+        llm = LLMFactory._create_llm(llm_provider, **kwargs)
+        return InstrumentedLLM(llm, provider=kwargs.get("name") or llm_provider)
 
+    @staticmethod
+    def _create_llm(llm_provider, **kwargs) -> Type[StatelessLLMInterface]:
         if (
             llm_provider == "openai_compatible_llm"
             or llm_provider == "openai_llm"
@@ -34,6 +42,7 @@ class LLMFactory:
                 llm_api_key=kwargs.get("llm_api_key"),
                 organization_id=kwargs.get("organization_id"),
                 project_id=kwargs.get("project_id"),
+                stream_usage=kwargs.get("stream_usage", False),
             )
         if llm_provider == "ollama_llm":
             return OllamaLLM(
@@ -45,6 +54,7 @@ class LLMFactory:
                 temperature=kwargs.get("temperature"),
                 keep_alive=kwargs.get("keep_alive"),
                 unload_at_exit=kwargs.get("unload_at_exit"),
+                stream_usage=kwargs.get("stream_usage", False),
             )
 
         elif llm_provider == "llama_cpp_llm":
@@ -52,6 +62,34 @@ class LLMFactory:
 
             return LlamaLLM(
                 model_path=kwargs.get("model_path"),
+                cache_capacity_mb=kwargs.get("cache_capacity_mb", 0),
+            )
+        elif llm_provider == "hedged_llm":
+            from .stateless_llm.hedged_llm import HedgedLLM
+
+            endpoints = []
+            for endpoint_config in kwargs.get("endpoints") or []:
+                endpoint_config = dict(endpoint_config)
+                endpoint_provider = endpoint_config.pop("llm_provider")
+                if endpoint_provider == "hedged_llm":
+                    raise ValueError("hedged_llm endpoints cannot be hedged_llm")
+                name = endpoint_config.pop("name", None) or endpoint_provider
+                endpoints.append(
+                    (
+                        name,
+                        LLMFactory.create_llm(
+                            llm_provider=endpoint_provider,
+                            system_prompt=kwargs.get("system_prompt"),
+                            name=name,
+                            **endpoint_config,
+                        ),
+                    )
+                )
+            return HedgedLLM(
+                endpoints=endpoints,
+                hedge_after=kwargs.get("hedge_after"),
+                first_token_timeout=kwargs.get("first_token_timeout", 30.0),
+                failure_cooldown=kwargs.get("failure_cooldown", 30.0),
             )
         elif llm_provider == "claude_llm":
             return ClaudeLLM(
@@ -59,6 +97,7 @@ class LLMFactory:
                 base_url=kwargs.get("base_url"),
                 model=kwargs.get("model"),
                 llm_api_key=kwargs.get("llm_api_key"),
+                prompt_caching=kwargs.get("prompt_caching", True),
             )
         else:
             raise ValueError(f"Unsupported LLM provider: {llm_provider}")
@@ -1,67 +1,87 @@
-import os
-import re
-import json
 import uuid
+import threading
 from datetime import datetime
-from typing import Literal, List, TypedDict, Optional
+from typing import Dict, Iterator, Literal, List, Optional, Tuple
 from loguru import logger
 
+from .history_store.history_store_interface import (
+    HistoryMessage,
+    HistoryStoreInterface,
+)
+from .history_store.history_search_index import HistorySearchIndex
+from .history_store.history_store_factory import HistoryStoreFactory
+from .history_store.history_writer import HistoryWriter
+from .history_store.jsonl_history_store import JSONLHistoryStore
+
+# Where all chat histories are kept, set from the config by init_history_store
+_history_store: HistoryStoreInterface = JSONLHistoryStore()
+# Buffers stored messages while the server runs. Functions that read a history
+# flush its buffered messages first, so callers always see their own writes.
+_history_writer = HistoryWriter(_history_store)
+# Full-text index of all histories, None while search is disabled
+_search_index: Optional[HistorySearchIndex] = None
+# Message counts of the histories counted so far, buffered messages included.
+# Kept up to date by the functions below, so counting is cheap after the first time.
+_message_counts: Dict[Tuple[str, str], int] = {}
+_message_counts_lock = threading.Lock()
+
+
+def init_history_store(backend: str, search: bool = False) -> None:
+    """Select the storage backend of chat histories ("jsonl" or "sqlite")
+
+    With `search`, histories are also indexed for `search_history`. The index
+    is synced with the store in a background thread, which indexes the
+    histories that changed since they were indexed; the first time, this
+    indexes them all. Until it is done, searches miss those histories.
+    """
+    global _history_store, _search_index
+    new_store = HistoryStoreFactory.get_history_store(backend)
+    _history_writer.flush()
+    _history_store.close()
+    _history_store = new_store
+    _history_writer.store = new_store
+    with _message_counts_lock:
+        _message_counts.clear()
+    logger.info(f"Using {backend} chat history backend")
+
+    if _search_index is not None:
+        _search_index.close()
+        _search_index = None
+    if search:
+        try:
+            _search_index = HistorySearchIndex()
+        except Exception as e:
+            logger.error(f"Failed to open the chat history search index: {e}")
+            _search_index = None
+    _history_writer.search_index = _search_index
+    if _search_index is not None:
+        threading.Thread(
+            target=_search_index.sync,
+            args=(_history_store, _history_writer.write_lock),
+            name="history-search-sync",
+            daemon=True,
+        ).start()
 
-class HistoryMessage(TypedDict):
-    role: Literal["human", "ai"]
-    timestamp: str
-    content: str
-    # Optional display information for the message
-    name: Optional[str]
-    avatar: Optional[str]
-
-
-def _is_safe_filename(filename: str) -> bool:
-    """Validate filename for safety and allowed characters"""
-    if not filename or len(filename) > 255:
-        return False
-
-    # Allow alphanumeric, hyphen, underscore, and common unicode characters
-    # Block any filesystem special characters, control characters, and path separators
-    pattern = re.compile(r"^[\w\-_\u0020-\u007E\u00A0-\uFFFF]+$")
-    return bool(pattern.match(filename))
-
-
-def _sanitize_path_component(component: str) -> str:
-    """Sanitize and validate a path component"""
-    # Remove any path components, get just the basename
-    sanitized = os.path.basename(component.strip())
-
-    if not _is_safe_filename(sanitized):
-        raise ValueError(f"Invalid characters in path component: {component}")
 
-    return sanitized
+def close_history_store() -> None:
+    _history_writer.flush()
+    _history_store.close()
+    if _search_index is not None:
+        _search_index.close()
 
 
-def _ensure_conf_dir(conf_uid: str) -> str:
-    """Ensure the directory for a specific conf exists and return its path"""
-    if not conf_uid:
-        raise ValueError("conf_uid cannot be empty")
+def start_history_writer() -> None:
+    """Write stored messages from a background task of the running event loop"""
+    _history_writer.start()
 
-    safe_conf_uid = _sanitize_path_component(conf_uid)
-    base_dir = os.path.join("chat_history", safe_conf_uid)
-    os.makedirs(base_dir, exist_ok=True)
-    return base_dir
 
-
-def _get_safe_history_path(conf_uid: str, history_uid: str) -> str:
-    """Get sanitized path for history file"""
-    safe_conf_uid = _sanitize_path_component(conf_uid)
-    safe_history_uid = _sanitize_path_component(history_uid)
-    base_dir = os.path.join("chat_history", safe_conf_uid)
-    full_path = os.path.normpath(os.path.join(base_dir, f"{safe_history_uid}.json"))
-    if not full_path.startswith(base_dir):
-        raise ValueError("Invalid path: Path traversal detected")
-    return full_path
+async def stop_history_writer() -> None:
+    """Stop the background writes and write the messages still buffered"""
+    await _history_writer.stop()
 
 
 def create_new_history(conf_uid: str) -> str:
-    """Create a new history file with a unique ID and return the history_uid"""
+    """Create a new history with a unique ID and return the history_uid"""
     if not conf_uid:
         logger.warning("No conf_uid provided")
         return ""
@@ -69,24 +89,24 @@ def create_new_history(conf_uid: str) -> str:
     # Use uuid.uuid4().hex to generate a UUID without hyphens
     # New format: UUID_YYYY-MM-DD_HH-MM-SS
     history_uid = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex}"
-    conf_dir = _ensure_conf_dir(conf_uid)  # conf_uid is sanitized here
 
-    # Create history file with empty metadata
+    # Create history with empty metadata
     try:
-        filepath = os.path.join(conf_dir, f"{history_uid}.json")
-        initial_data = [
+        _history_store.create_history(
+            conf_uid,
+            history_uid,
             {
                 "role": "metadata",
                 "timestamp": datetime.now().isoformat(timespec="seconds"),
-            }
-        ]
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(initial_data, f, ensure_ascii=False, indent=2)
+            },
+        )
     except Exception as e:
-        logger.error(f"Failed to create new history file: {e}")
+        logger.error(f"Failed to create new history: {e}")
         return ""
+    with _message_counts_lock:
+        _message_counts[(conf_uid, history_uid)] = 0
 
-    logger.debug(f"Created new history file with empty metadata: {filepath}")
+    logger.debug(f"Created new history with empty metadata: {history_uid}")
     return history_uid
 
 
@@ -98,7 +118,10 @@ def store_message(
     name: str | None = None,
     avatar: str | None = None,
 ):
-    """Store a message in a specific history file
+    """Append a message to a specific history
+
+    Once the history writer is started, the message is buffered and written
+    shortly after by a background task.
 
     Args:
         conf_uid: Configuration unique identifier
@@ -115,17 +138,7 @@ def store_message(
             logger.warning("Missing history_uid")
         return
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    logger.debug(f"Storing {role} message to {filepath}")
-
-    history_data = []
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                history_data = json.load(f)
-        except Exception:
-            logger.error(f"Failed to load history file: {filepath}")
-            pass
+    logger.debug(f"Storing {role} message to history {history_uid}")
 
     now_str = datetime.now().isoformat(timespec="seconds")
     new_item = {
@@ -140,35 +153,50 @@ def store_message(
     if avatar is not None:
         new_item["avatar"] = avatar
 
-    history_data.append(new_item)
+    # Counted in the same step, so a concurrent count cannot include it twice
+    with _message_counts_lock:
+        _history_writer.append(conf_uid, history_uid, new_item)
+        if (conf_uid, history_uid) in _message_counts:
+            _message_counts[(conf_uid, history_uid)] += 1
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(history_data, f, ensure_ascii=False, indent=2)
-    logger.debug(f"Successfully stored {role} message")
 
+def count_history_messages(conf_uid: str, history_uid: str) -> int:
+    """Count the messages of a history, including the buffered ones
 
-def get_metadata(conf_uid: str, history_uid: str) -> dict:
-    """Get metadata from history file"""
+    Only the first call for a history reads it. A message stored while it is
+    being read may be missed, so the count can be too low, never too high.
+    """
     if not conf_uid or not history_uid:
-        return {}
+        return 0
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
+    key = (conf_uid, history_uid)
+    with _message_counts_lock:
+        if key in _message_counts:
+            return _message_counts[key]
+    try:
+        _history_writer.flush(conf_uid, history_uid)
+        count = _history_store.count_messages(conf_uid, history_uid)
+    except Exception as e:
+        logger.error(f"Failed to count messages of history {history_uid}: {e}")
+        return 0
+    with _message_counts_lock:
+        return _message_counts.setdefault(key, count)
+
+
+def get_metadata(conf_uid: str, history_uid: str) -> dict:
+    """Get metadata of a history"""
+    if not conf_uid or not history_uid:
         return {}
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-
-        if history_data and history_data[0]["role"] == "metadata":
-            return history_data[0]
+        return _history_store.get_metadata(conf_uid, history_uid)
     except Exception as e:
         logger.error(f"Failed to get metadata: {e}")
     return {}
 
 
 def update_metadate(conf_uid: str, history_uid: str, metadata: dict) -> bool:
-    """Set metadata in history file
+    """Set metadata of a history
 
     Updates existing metadata with new fields, preserving existing ones.
     If no metadata exists, creates new metadata entry.
@@ -176,28 +204,21 @@ def update_metadate(conf_uid: str, history_uid: str, metadata: dict) -> bool:
     if not conf_uid or not history_uid:
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
-        return False
-
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
+        _history_writer.flush(conf_uid, history_uid)
+        if not _history_store.history_exists(conf_uid, history_uid):
+            return False
 
-        if history_data and history_data[0]["role"] == "metadata":
-            # Update existing metadata while preserving other fields
-            history_data[0].update(metadata)
-        else:
+        history_metadata = _history_store.get_metadata(conf_uid, history_uid)
+        if not history_metadata:
             # Create new metadata with timestamp if none exists
-            new_metadata = {
+            history_metadata = {
                 "role": "metadata",
                 "timestamp": datetime.now().isoformat(timespec="seconds"),
             }
-            new_metadata.update(metadata)  # Add new fields
-            history_data.insert(0, new_metadata)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
+        # Update existing metadata while preserving other fields
+        history_metadata.update(metadata)
+        _history_store.set_metadata(conf_uid, history_uid, history_metadata)
 
         logger.debug(f"Updated metadata for history {history_uid}")
         return True
@@ -206,44 +227,168 @@ def update_metadate(conf_uid: str, history_uid: str, metadata: dict) -> bool:
     return False
 
 
-def get_history(conf_uid: str, history_uid: str) -> List[HistoryMessage]:
-    """Read chat history for the given conf_uid and history_uid"""
+def iter_history(conf_uid: str, history_uid: str) -> Iterator[HistoryMessage]:
+    """Stream the messages of a history without loading all of them at once"""
     if not conf_uid or not history_uid:
         if not conf_uid:
             logger.warning("Missing conf_uid")
         if not history_uid:
             logger.warning("Missing history_uid")
-        return []
+        return
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
+    try:
+        _history_writer.flush(conf_uid, history_uid)
+        if not _history_store.history_exists(conf_uid, history_uid):
+            logger.warning(f"History not found: {history_uid}")
+            return
+        yield from _history_store.iter_messages(conf_uid, history_uid)
+    except Exception as e:
+        logger.error(f"Failed to read history {history_uid}: {e}")
 
-    if not os.path.exists(filepath):
-        logger.warning(f"History file not found: {filepath}")
+
+def get_history(conf_uid: str, history_uid: str) -> List[HistoryMessage]:
+    """Read chat history for the given conf_uid and history_uid"""
+    messages = list(iter_history(conf_uid, history_uid))
+    if messages:
+        # Spares count_history_messages a second read
+        with _message_counts_lock:
+            _message_counts.setdefault((conf_uid, history_uid), len(messages))
+    return messages
+
+
+def paginate_history(
+    messages: List[HistoryMessage], limit: Optional[int], before: Optional[int] = None
+) -> dict:
+    """Cut a page for the client out of an already loaded history
+
+    Args:
+        messages: The whole history
+        limit: Number of messages in the page, or None for all of them
+        before: Index of the message following the page, None for the latest page
+
+    Returns:
+        dict: The page, see `get_history_page`
+    """
+    end = len(messages) if before is None else max(0, min(before, len(messages)))
+    start = 0 if limit is None else max(0, end - limit)
+    return _history_page(messages[start:end], start)
+
+
+def get_history_page(
+    conf_uid: str, history_uid: str, limit: int, before: Optional[int] = None
+) -> dict:
+    """Read one page of a history, for clients that load older messages on demand
+
+    Messages are identified by their index in the history. The page holds the
+    `limit` messages before index `before` (the latest ones if None), with
+    system messages left out.
+
+    Returns:
+        dict: {"messages": [...], "start": index of the first message of the
+        page, to pass as `before` for the previous page, "has_more": whether
+        there are older messages}
+    """
+    if not conf_uid or not history_uid:
+        logger.warning("Missing conf_uid or history_uid")
+        return _history_page([], 0)
+
+    try:
+        _history_writer.flush(conf_uid, history_uid)
+        if before is None:
+            before = _history_store.count_messages(conf_uid, history_uid)
+        start = max(0, before - limit)
+        messages = _history_store.get_messages(conf_uid, history_uid, start, before)
+        return _history_page(messages, start)
+    except Exception as e:
+        logger.error(f"Failed to read history page of {history_uid}: {e}")
+        return _history_page([], 0)
+
+
+def _history_page(messages: List[HistoryMessage], start: int) -> dict:
+    return {
+        "messages": [msg for msg in messages if msg["role"] != "system"],
+        "start": start,
+        "has_more": start > 0,
+    }
+
+
+def search_history(
+    conf_uid: str,
+    query: str,
+    limit: int = 20,
+    context: int = 2,
+    exclude_history_uid: Optional[str] = None,
+    match_any: bool = False,
+) -> List[dict]:
+    """Search the histories of a conf for messages containing every query term
+
+    Args:
+        conf_uid: Configuration unique identifier
+        query: Space-separated search terms
+        limit: Maximum number of matching messages
+        context: Number of messages kept on each side of a match
+        exclude_history_uid: History left out of the search, e.g. the current one
+        match_any: Find messages containing any of the terms instead, best first
+
+    Returns:
+        List[dict]: Best matches first, each with "history_uid", "index" of the
+        message in the history, "message", and "context", the surrounding
+        messages (including the match) without system messages
+    """
+    if not conf_uid or not query:
+        return []
+    if _search_index is None:
+        logger.warning("Chat history search is disabled")
         return []
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-            # Filter out metadata
-            return [msg for msg in history_data if msg["role"] != "metadata"]
-    except Exception:
+        # Buffered messages are indexed once written. Only the searched histories
+        # are flushed, which leaves out the current one during recall.
+        for history_uid in _history_writer.pending_history_uids(conf_uid):
+            if history_uid != exclude_history_uid:
+                _history_writer.flush(conf_uid, history_uid)
+        results = _search_index.search(
+            conf_uid,
+            query,
+            limit=limit,
+            exclude_history_uid=exclude_history_uid,
+            match_any=match_any,
+        )
+        for result in results:
+            start = max(0, result["index"] - context)
+            result["context"] = [
+                msg
+                for msg in _history_store.get_messages(
+                    conf_uid,
+                    result["history_uid"],
+                    start,
+                    result["index"] + context + 1,
+                )
+                if msg["role"] != "system"
+            ]
+        return results
+    except Exception as e:
+        logger.error(f"Failed to search histories: {e}")
         return []
 
 
 def delete_history(conf_uid: str, history_uid: str) -> bool:
-    """Delete a specific history file"""
+    """Delete a specific history"""
     if not conf_uid or not history_uid:
         logger.warning("Missing conf_uid or history_uid")
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
     try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            logger.debug(f"Successfully deleted history file: {filepath}")
+        _history_writer.discard(conf_uid, history_uid)
+        with _message_counts_lock:
+            _message_counts.pop((conf_uid, history_uid), None)
+        if _search_index is not None:
+            _search_index.delete_history(conf_uid, history_uid)
+        if _history_store.delete_history(conf_uid, history_uid):
+            logger.debug(f"Successfully deleted history: {history_uid}")
             return True
     except Exception as e:
-        logger.error(f"Failed to delete history file: {e}")
+        logger.error(f"Failed to delete history: {e}")
     return False
 
 
@@ -253,50 +398,33 @@ def get_history_list(conf_uid: str) -> List[dict]:
         return []
 
     histories = []
-    conf_dir = _ensure_conf_dir(conf_uid)
     empty_history_uids = []
 
     try:
-        for filename in os.listdir(conf_dir):
-            if not filename.endswith(".json"):
+        _history_writer.flush()
+        # One query for backends that index the latest messages
+        history_entries = _history_store.list_histories(conf_uid)
+        for entry in history_entries:
+            latest_message = entry["latest_message"]
+            if latest_message is None:
+                empty_history_uids.append(entry["uid"])
                 continue
 
-            history_uid = filename[:-5]
-            filepath = os.path.join(conf_dir, filename)
-
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    messages = json.load(f)
-
-                    # Filter out metadata for checking if history is empty
-                    actual_messages = [
-                        msg for msg in messages if msg["role"] != "metadata"
-                    ]
-                    if not actual_messages:
-                        empty_history_uids.append(history_uid)
-                        continue
-
-                    latest_message = actual_messages[-1]
-                    history_info = {
-                        "uid": history_uid,
-                        "latest_message": latest_message,
-                        "timestamp": (
-                            latest_message["timestamp"] if latest_message else None
-                        ),
-                    }
-                    histories.append(history_info)
-            except Exception as e:
-                logger.error(f"Error reading history file {filename}: {e}")
-                continue
+            history_info = {
+                "uid": entry["uid"],
+                "latest_message": latest_message,
+                "timestamp": latest_message.get("timestamp"),
+            }
+            histories.append(history_info)
 
         # Clean up empty histories if there are other non-empty ones
-        if len(empty_history_uids) > 0 and len(os.listdir(conf_dir)) > 1:
+        if len(empty_history_uids) > 0 and len(history_entries) > 1:
             for uid in empty_history_uids:
                 try:
-                    os.remove(os.path.join(conf_dir, f"{uid}.json"))
-                    logger.info(f"Removed empty history file: {uid}")
+                    _history_store.delete_history(conf_uid, uid)
+                    logger.info(f"Removed empty history: {uid}")
                 except Exception as e:
-                    logger.error(f"Failed to remove empty history file {uid}: {e}")
+                    logger.error(f"Failed to remove empty history {uid}: {e}")
 
         histories.sort(
             key=lambda x: x["timestamp"] if x["timestamp"] else "", reverse=True
@@ -314,25 +442,31 @@ def modify_latest_message(
     role: Literal["human", "ai", "system"],
     new_content: str,
 ) -> bool:
-    """Modify the latest message in a specific history file if it matches the given role"""
+    """Modify the latest message in a specific history if it matches the given role"""
     if not conf_uid or not history_uid:
         logger.warning("Missing conf_uid or history_uid")
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
-        logger.warning(f"History file not found: {filepath}")
-        return False
+    # The latest message is usually still buffered, and can be changed in memory
+    modified = _history_writer.modify_latest_pending(
+        conf_uid, history_uid, role, new_content
+    )
+    if modified is not None:
+        if not modified:
+            logger.warning(f"Latest message role doesn't match requested role ({role})")
+        return modified
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
+        _history_writer.flush(conf_uid, history_uid)
+        if not _history_store.history_exists(conf_uid, history_uid):
+            logger.warning(f"History not found: {history_uid}")
+            return False
 
-        if not history_data:
+        latest_message = _history_store.get_latest_message(conf_uid, history_uid)
+        if latest_message is None:
             logger.warning("History is empty")
             return False
 
-        latest_message = history_data[-1]
         if latest_message["role"] != role:
             logger.warning(
                 f"Latest message role ({latest_message['role']}) doesn't match requested role ({role})"
@@ -340,8 +474,14 @@ def modify_latest_message(
             return False
 
         latest_message["content"] = new_content
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
+        _history_store.replace_latest_message(conf_uid, history_uid, latest_message)
+        if _search_index is not None:
+            _search_index.replace_latest_message(
+                conf_uid,
+                history_uid,
+                latest_message,
+                _history_store.history_version(conf_uid, history_uid),
+            )
 
         logger.debug(f"Successfully modified latest {role} message")
         return True
@@ -354,21 +494,22 @@ def modify_latest_message(
 def rename_history_file(
     conf_uid: str, old_history_uid: str, new_history_uid: str
 ) -> bool:
-    """Rename a history file with a new history_uid"""
+    """Rename a history with a new history_uid"""
     if not conf_uid or not old_history_uid or not new_history_uid:
         logger.warning("Missing required parameters for rename")
         return False
 
-    old_filepath = _get_safe_history_path(conf_uid, old_history_uid)
-    new_filepath = _get_safe_history_path(conf_uid, new_history_uid)
-
     try:
-        if os.path.exists(old_filepath):
-            os.rename(old_filepath, new_filepath)
-            logger.info(
-                f"Renamed history file from {old_history_uid} to {new_history_uid}"
-            )
+        _history_writer.flush(conf_uid, old_history_uid)
+        if _history_store.rename_history(conf_uid, old_history_uid, new_history_uid):
+            with _message_counts_lock:
+                count = _message_counts.pop((conf_uid, old_history_uid), None)
+                if count is not None:
+                    _message_counts[(conf_uid, new_history_uid)] = count
+            if _search_index is not None:
+                _search_index.rename_history(conf_uid, old_history_uid, new_history_uid)
+            logger.info(f"Renamed history from {old_history_uid} to {new_history_uid}")
             return True
     except Exception as e:
-        logger.error(f"Failed to rename history file: {e}")
+        logger.error(f"Failed to rename history: {e}")
     return False
@@ -25,12 +25,20 @@ class BasicMemoryAgentConfig(I18nMixin, BaseModel):
         "deepseek_llm",
         "groq_llm",
         "mistral_llm",
+        "hedged_llm",
     ] = Field(..., alias="llm_provider")
 
     faster_first_response: Optional[bool] = Field(True, alias="faster_first_response")
     segment_method: Literal["regex", "pysbd"] = Field("pysbd", alias="segment_method")
     use_mcpp: Optional[bool] = Field(False, alias="use_mcpp")
     mcp_enabled_servers: Optional[list[str]] = Field(default_factory=list, alias="mcp_enabled_servers")
+    max_context_tokens: Optional[int] = Field(None, alias="max_context_tokens")
+    min_recent_messages: int = Field(4, alias="min_recent_messages")
+    summarize_after_messages: Optional[int] = Field(
+        None, alias="summarize_after_messages"
+    )
+    summary_keep_recent_messages: int = Field(10, alias="summary_keep_recent_messages")
+    recall_past_messages: Optional[int] = Field(None, alias="recall_past_messages")
     
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "llm_provider": Description(
@@ -53,6 +61,26 @@ class BasicMemoryAgentConfig(I18nMixin, BaseModel):
             en="List of enabled MCP servers (e.g., ['time', 'ddg-search'])",
             zh="启用的 MCP 服务器列表（如 ['time', 'ddg-search']）",
         ),
+        "max_context_tokens": Description(
+            en="Approximate token budget for the system prompt and chat history sent to the LLM. Older messages are left out once it is exceeded (default: None, no limit)",
+            zh="发送给大语言模型的系统提示词和聊天记录的大致 token 预算。超出后会省略较早的消息（默认：None，不限制）",
+        ),
+        "min_recent_messages": Description(
+            en="Number of most recent messages that are always sent, even when over the token budget (default: 4)",
+            zh="无论是否超出 token 预算都会发送的最近消息数量（默认：4）",
+        ),
+        "summarize_after_messages": Description(
+            en="Summarize older messages in the background once memory holds more than this many messages. The summary is saved with the chat history (default: None, disabled)",
+            zh="当记忆中的消息数超过该值时，在后台总结较早的消息。总结会与聊天记录一起保存（默认：None，禁用）",
+        ),
+        "summary_keep_recent_messages": Description(
+            en="Number of most recent messages that are never summarized (default: 10)",
+            zh="不会被总结的最近消息数量（默认：10）",
+        ),
+        "recall_past_messages": Description(
+            en="Number of related messages from earlier chat histories added to each user input, found with the chat history search (default: None, disabled)",
+            zh="通过聊天记录搜索，为每条用户输入附加的早前聊天记录中的相关消息数量（默认：None，禁用）",
+        ),
     }
 
 
@@ -31,6 +31,7 @@ class OpenAICompatibleConfig(StatelessLLMBaseConfig):
     organization_id: str | None = Field(None, alias="organization_id")
     project_id: str | None = Field(None, alias="project_id")
     temperature: float = Field(1.0, alias="temperature")
+    stream_usage: bool = Field(False, alias="stream_usage")
 
     _OPENAI_COMPATIBLE_DESCRIPTIONS: ClassVar[dict[str, Description]] = {
         "base_url": Description(en="Base URL for the API endpoint", zh="API的URL端点"),
@@ -46,6 +47,10 @@ class OpenAICompatibleConfig(StatelessLLMBaseConfig):
             en="What sampling temperature to use, between 0 and 2.",
             zh="使用的采样温度，介于 0 和 2 之间。",
         ),
+        "stream_usage": Description(
+            en="Ask the server to report token usage at the end of each stream (stream_options.include_usage) to track prompt cache hits. Enable only if the server supports it.",
+            zh="要求服务器在每次流式响应结束时报告 token 用量（stream_options.include_usage），用于统计提示词缓存命中。仅在服务器支持时启用。",
+        ),
     }
 
     DESCRIPTIONS: ClassVar[dict[str, Description]] = {
@@ -149,6 +154,7 @@ class ClaudeConfig(StatelessLLMBaseConfig):
     interrupt_method: Literal["system", "user"] = Field(
         "user", alias="interrupt_method"
     )
+    prompt_caching: bool = Field(True, alias="prompt_caching")
 
     _CLAUDE_DESCRIPTIONS: ClassVar[dict[str, Description]] = {
         "base_url": Description(
@@ -158,6 +164,10 @@ class ClaudeConfig(StatelessLLMBaseConfig):
         "model": Description(
             en="Name of the Claude model to use", zh="要使用的 Claude 模型名称"
         ),
+        "prompt_caching": Description(
+            en="Mark the system prompt and tool list as cacheable to reduce latency and cost (default: True)",
+            zh="将系统提示词和工具列表标记为可缓存，以降低延迟和费用（默认：True）",
+        ),
     }
 
     DESCRIPTIONS: ClassVar[dict[str, Description]] = {
@@ -170,6 +180,7 @@ class LlamaCppConfig(StatelessLLMBaseConfig):
     """Configuration for LlamaCpp."""
 
     model_path: str = Field(..., alias="model_path")
+    cache_capacity_mb: int = Field(0, alias="cache_capacity_mb")
     interrupt_method: Literal["system", "user"] = Field(
         "system", alias="interrupt_method"
     )
@@ -178,6 +189,10 @@ class LlamaCppConfig(StatelessLLMBaseConfig):
         "model_path": Description(
             en="Path to the GGUF model file", zh="GGUF 模型文件路径"
         ),
+        "cache_capacity_mb": Description(
+            en="Memory (MB) for saved model states, so that each conversation only evaluates its new tokens. 0 disables it (default: 0)",
+            zh="用于保存模型状态的内存（MB），使每个对话只需计算新的 token。0 表示禁用（默认：0）",
+        ),
     }
 
     DESCRIPTIONS: ClassVar[dict[str, Description]] = {
@@ -186,6 +201,39 @@ class LlamaCppConfig(StatelessLLMBaseConfig):
     }
 
 
+class HedgedLLMConfig(StatelessLLMBaseConfig):
+    """Configuration for spreading requests over several LLM endpoints."""
+
+    endpoints: list[dict] = Field(..., alias="endpoints")
+    hedge_after: float | None = Field(None, alias="hedge_after")
+    first_token_timeout: float = Field(30.0, alias="first_token_timeout")
+    failure_cooldown: float = Field(30.0, alias="failure_cooldown")
+
+    _HEDGED_DESCRIPTIONS: ClassVar[dict[str, Description]] = {
+        "endpoints": Description(
+            en="Endpoints in priority order. Each one needs `llm_provider`, takes the config of that provider from this pool, and can override its fields (e.g. `base_url`) and set a `name`",
+            zh="按优先级排列的端点。每个端点需要 `llm_provider`，使用该提供者在本配置池中的配置，并可覆盖其中的字段（如 `base_url`）及设置 `name`",
+        ),
+        "hedge_after": Description(
+            en="Seconds without a first token before the request is also sent to the next endpoint; the slower one is cancelled (default: None, no hedging)",
+            zh="在未收到首个 token 的若干秒后，将请求同时发送到下一个端点，较慢的请求会被取消（默认：None，不对冲）",
+        ),
+        "first_token_timeout": Description(
+            en="Seconds to wait for the first token before failing over to the next endpoint (default: 30)",
+            zh="等待首个 token 的秒数，超时后切换到下一个端点（默认：30）",
+        ),
+        "failure_cooldown": Description(
+            en="Seconds a failed endpoint is skipped, growing with repeated failures (default: 30)",
+            zh="失败端点被跳过的秒数，连续失败时会增加（默认：30）",
+        ),
+    }
+
+    DESCRIPTIONS: ClassVar[dict[str, Description]] = {
+        **StatelessLLMBaseConfig.DESCRIPTIONS,
+        **_HEDGED_DESCRIPTIONS,
+    }
+
+
 class StatelessLLMConfigs(I18nMixin, BaseModel):
     """Pool of LLM provider configurations.
     This class contains configurations for different LLM providers."""
@@ -202,6 +250,7 @@ class StatelessLLMConfigs(I18nMixin, BaseModel):
     claude_llm: ClaudeConfig | None = Field(None, alias="claude_llm")
     llama_cpp_llm: LlamaCppConfig | None = Field(None, alias="llama_cpp_llm")
     mistral_llm: MistralConfig | None = Field(None, alias="mistral_llm")
+    hedged_llm: HedgedLLMConfig | None = Field(None, alias="hedged_llm")
 
     DESCRIPTIONS: ClassVar[dict[str, Description]] = {
         "openai_compatible_llm": Description(
@@ -229,4 +278,8 @@ class StatelessLLMConfigs(I18nMixin, BaseModel):
         "llama_cpp_llm": Description(
             en="Configuration for local Llama.cpp", zh="本地Llama.cpp配置"
         ),
+        "hedged_llm": Description(
+            en="Configuration for hedged and failover requests across several LLM endpoints",
+            zh="跨多个 LLM 端点的对冲与故障转移请求配置",
+        ),
     }
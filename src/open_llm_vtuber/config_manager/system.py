@@ -1,6 +1,6 @@
 # config_manager/system.py
 from pydantic import Field, model_validator
-from typing import Dict, ClassVar
+from typing import Dict, ClassVar, Literal
 from .i18n import I18nMixin, Description
 
 
@@ -12,6 +12,10 @@ class SystemConfig(I18nMixin):
     port: int = Field(..., alias="port")
     config_alts_dir: str = Field(..., alias="config_alts_dir")
     tool_prompts: Dict[str, str] = Field(..., alias="tool_prompts")
+    chat_history_backend: Literal["jsonl", "sqlite"] = Field(
+        "jsonl", alias="chat_history_backend"
+    )
+    chat_history_search: bool = Field(True, alias="chat_history_search")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "conf_version": Description(en="Configuration version", zh="配置文件版本"),
@@ -24,6 +28,14 @@ class SystemConfig(I18nMixin):
             en="Tool prompts to be inserted into persona prompt",
             zh="要插入到角色提示词中的工具提示词",
         ),
+        "chat_history_backend": Description(
+            en="Storage of chat histories: 'jsonl' (one file per history) or 'sqlite' (one indexed database)",
+            zh="聊天记录的存储方式：'jsonl'（每段记录一个文件）或 'sqlite'（带索引的单个数据库）",
+        ),
+        "chat_history_search": Description(
+            en="Keep a full-text search index of chat histories (default: True)",
+            zh="为聊天记录维护全文搜索索引（默认：True）",
+        ),
     }
 
     @model_validator(mode="after")
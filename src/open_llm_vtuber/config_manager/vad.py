@@ -14,6 +14,7 @@ class SileroVADConfig(I18nMixin):
     required_hits: int = Field(..., alias="required_hits")  # 3 * (0.032) = 0.1s
     required_misses: int = Field(..., alias="required_misses")  # 24 * (0.032) = 0.8s
     smoothing_window: int = Field(..., alias="smoothing_window")  # 5
+    speculative_response: bool = Field(False, alias="speculative_response")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "orig_sr": Description(en="Original Audio Sample Rate", zh="原始音频采样率"),
@@ -35,6 +36,10 @@ class SileroVADConfig(I18nMixin):
         "smoothing_window": Description(
             en="Smoothing window size for VAD", zh="语音活动检测的平滑窗口大小"
         ),
+        "speculative_response": Description(
+            en="Start generating the response when the speaker pauses (after `required_misses`), before the end of speech is confirmed. The response is only spoken if the final transcript matches",
+            zh="在说话人停顿时（`required_misses` 之后）、确认语音结束之前就开始生成回复。只有最终识别结果一致时才会播放该回复",
+        ),
     }
 
 
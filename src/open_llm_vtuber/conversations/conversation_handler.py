@@ -12,6 +12,7 @@ from ..service_context import ServiceContext
 from .group_conversation import process_group_conversation
 from .single_conversation import process_single_conversation
 from .conversation_utils import EMOJI_LIST
+from .speculative_response import SpeculativeResponse
 from .types import GroupConversationState
 
 
@@ -27,6 +28,7 @@ async def handle_conversation_trigger(
     received_data_buffers: Dict[str, np.ndarray],
     current_conversation_tasks: Dict[str, Optional[asyncio.Task]],
     broadcast_to_group: Callable,
+    speculation: Optional[SpeculativeResponse] = None,
 ) -> None:
     """Handle triggers that start a conversation"""
     if msg_type == "ai-speak-signal":
@@ -50,6 +52,8 @@ async def handle_conversation_trigger(
 
     group = chat_group_manager.get_client_group(client_uid)
     if group and len(group.members) > 1:
+        if speculation:
+            await speculation.cancel()
         # Use group_id as task key for group conversations
         task_key = group.group_id
         if (
@@ -80,6 +84,7 @@ async def handle_conversation_trigger(
                 user_input=user_input,
                 images=images,
                 session_emoji=session_emoji,
+                speculation=speculation,
             )
         )
 
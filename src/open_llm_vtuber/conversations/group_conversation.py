@@ -21,6 +21,7 @@ from .types import (
 )
 from ..service_context import ServiceContext
 from ..chat_history_manager import store_message
+from ..agent.stateless_llm.llm_metrics import llm_trace, format_trace
 from .tts_manager import TTSTaskManager
 
 
@@ -320,23 +321,30 @@ async def process_member_response(
     """Process group member's response"""
     full_response = ""
 
-    try:
-        agent_output = context.agent_engine.chat(batch_input)
-
-        async for output in agent_output:
-            response_part = await process_agent_output(
-                output=output,
-                character_config=context.character_config,
-                live2d_model=context.live2d_model,
-                tts_engine=context.tts_engine,
-                websocket_send=current_ws_send,
-                tts_manager=tts_manager,
-                translate_engine=context.translate_engine,
-            )
-            full_response += response_part
-
-    except Exception as e:
-        logger.error(f"Error processing member response: {e}")
-        raise
+    with llm_trace() as trace:
+        try:
+            agent_output = context.agent_engine.chat(batch_input)
+
+            async for output in agent_output:
+                response_part = await process_agent_output(
+                    output=output,
+                    character_config=context.character_config,
+                    live2d_model=context.live2d_model,
+                    tts_engine=context.tts_engine,
+                    websocket_send=current_ws_send,
+                    tts_manager=tts_manager,
+                    translate_engine=context.translate_engine,
+                )
+                full_response += response_part
+
+        except Exception as e:
+            logger.error(f"Error processing member response: {e}")
+            raise
+        finally:
+            if trace:
+                logger.info(
+                    f"LLM requests of {context.character_config.character_name}'s turn:\n"
+                    f"{format_trace(trace)}"
+                )
 
     return full_response
@@ -1,4 +1,4 @@
-from typing import Union, List, Dict, Any, Optional
+from typing import AsyncIterator, Union, List, Dict, Any, Optional
 import asyncio
 import json
 from loguru import logger
@@ -14,8 +14,10 @@ from .conversation_utils import (
     EMOJI_LIST,
 )
 from .types import WebSocketSend
+from .speculative_response import SpeculativeResponse
 from .tts_manager import TTSTaskManager
 from ..chat_history_manager import store_message
+from ..agent.stateless_llm.llm_metrics import llm_trace, format_trace
 from ..service_context import ServiceContext
 
 
@@ -26,6 +28,7 @@ async def process_single_conversation(
     user_input: Union[str, np.ndarray],
     images: Optional[List[Dict[str, Any]]] = None,
     session_emoji: str = np.random.choice(EMOJI_LIST),
+    speculation: Optional[SpeculativeResponse] = None,
 ) -> str:
     """Process a single-user conversation turn
 
@@ -36,6 +39,8 @@ async def process_single_conversation(
         user_input: Text or audio input from user
         images: Optional list of image data
         session_emoji: Emoji identifier for the conversation
+        speculation: Response started on a partial transcript of the same speech,
+            used if the final transcript matches
 
     Returns:
         str: Complete response text
@@ -73,12 +78,20 @@ async def process_single_conversation(
         if images:
             logger.info(f"With {len(images)} images")
 
+        agent_output = None
+        if speculation:
+            if not images and speculation.matches(input_text):
+                agent_output = speculation.commit()
+            else:
+                await speculation.cancel()
+
         # Process agent response
         full_response = await process_agent_response(
             context=context,
             batch_input=batch_input,
             websocket_send=websocket_send,
             tts_manager=tts_manager,
+            agent_output=agent_output,
         )
 
         # Wait for any pending TTS tasks
@@ -115,6 +128,8 @@ async def process_single_conversation(
         )
         raise
     finally:
+        if speculation:
+            await speculation.cancel()
         cleanup_conversation(tts_manager, session_emoji)
 
 
@@ -123,6 +138,7 @@ async def process_agent_response(
     batch_input: Any,
     websocket_send: WebSocketSend,
     tts_manager: TTSTaskManager,
+    agent_output: Optional[AsyncIterator[Any]] = None,
 ) -> str:
     """Process agent response and generate output
 
@@ -131,47 +147,55 @@ async def process_agent_response(
         batch_input: Input data for the agent
         websocket_send: WebSocket send function
         tts_manager: TTSTaskManager for the conversation
+        agent_output: Output of an agent run that is already in progress
+            (a committed speculative response). Defaults to a new run on batch_input.
 
     Returns:
         str: The complete response text
     """
     full_response = ""
-    try:
-        agent_output = context.agent_engine.chat(batch_input)
-        async for output in agent_output:
-            # Handle tool status updates from MCP
-            if isinstance(output, dict):
-                if output.get("type") == "tool_call_status":
-                    # Send tool status to frontend
-                    tool_info = output.get("tool_info", {})
-                    await websocket_send(
-                        json.dumps({
-                            "type": "tool-call",
-                            "name": tool_info.get("name", "Unknown"),
-                            "status": output.get("status", "running"),
-                            "server": tool_info.get("server", "Unknown")
-                        })
-                    )
-                # Skip other dict outputs for now
-                continue
+    with llm_trace() as trace:
+        try:
+            if agent_output is None:
+                agent_output = context.agent_engine.chat(batch_input)
+            async for output in agent_output:
+                # Handle tool status updates from MCP
+                if isinstance(output, dict):
+                    if output.get("type") == "tool_call_status":
+                        # Send tool status to frontend
+                        tool_info = output.get("tool_info", {})
+                        await websocket_send(
+                            json.dumps({
+                                "type": "tool-call",
+                                "name": tool_info.get("name", "Unknown"),
+                                "status": output.get("status", "running"),
+                                "server": tool_info.get("server", "Unknown"),
+                                "cached": output.get("cached", False),
+                            })
+                        )
+                    # Skip other dict outputs for now
+                    continue
             
-            # Process non-dict outputs (SentenceOutput, etc.)
-            response_part = await process_agent_output(
-                output=output,
-                character_config=context.character_config,
-                live2d_model=context.live2d_model,
-                tts_engine=context.tts_engine,
-                websocket_send=websocket_send,
-                tts_manager=tts_manager,
-                translate_engine=context.translate_engine,
-            )
-            logger.debug(f"Got response_part: {response_part} (type: {type(response_part)})")
-            full_response += response_part
-
-    except Exception as e:
-        import traceback
-        logger.error(f"Error processing agent response: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        raise
+                # Process non-dict outputs (SentenceOutput, etc.)
+                response_part = await process_agent_output(
+                    output=output,
+                    character_config=context.character_config,
+                    live2d_model=context.live2d_model,
+                    tts_engine=context.tts_engine,
+                    websocket_send=websocket_send,
+                    tts_manager=tts_manager,
+                    translate_engine=context.translate_engine,
+                )
+                logger.debug(f"Got response_part: {response_part} (type: {type(response_part)})")
+                full_response += response_part
+
+        except Exception as e:
+            import traceback
+            logger.error(f"Error processing agent response: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
+        finally:
+            if trace:
+                logger.info(f"LLM requests of this turn:\n{format_trace(trace)}")
 
     return full_response
@@ -0,0 +1,128 @@
+import asyncio
+import re
+from typing import Any, AsyncIterator, Optional
+
+import numpy as np
+from loguru import logger
+
+from .conversation_utils import create_batch_input
+from ..service_context import ServiceContext
+
+# Marks the end of the speculative agent output in the queue
+_END_OF_OUTPUT = object()
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase a transcript and drop punctuation and whitespace for comparison."""
+    return re.sub(r"[\W_]+", "", text or "").lower()
+
+
+class SpeculativeResponse:
+    """
+    Starts the agent on a provisional transcript while the end of speech is
+    still being confirmed.
+
+    The partial audio is transcribed and `agent_engine.chat` is started right
+    away. Its output is buffered, nothing is spoken. When the final transcript
+    arrives, the conversation either takes over the buffered and remaining
+    output (`commit`) if the transcripts match, or cancels the speculation,
+    which also rolls the agent's memory back to where it was.
+
+    Tool calls can have side effects that cannot be rolled back, so the
+    speculative turn stops at its first tool call and only runs it once the
+    response is committed.
+    """
+
+    def __init__(self, context: ServiceContext):
+        self._context = context
+        self._agent = context.agent_engine
+        self.transcript: Optional[str] = None
+        self._checkpoint: Any = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        # Opened on commit, the agent holds tool calls until then
+        self._tool_gate = asyncio.Event()
+        self._committed = False
+
+    def start(self, audio: np.ndarray) -> bool:
+        """
+        Start transcribing the partial audio and generating a response in the
+        background.
+
+        Returns:
+            bool - False if the agent does not support speculation
+        """
+        self._checkpoint = self._agent.memory_checkpoint()
+        if self._checkpoint is None:
+            logger.debug(
+                f"{type(self._agent).__name__} cannot undo a turn, speculation disabled."
+            )
+            return False
+        self._task = asyncio.create_task(self._run(audio))
+        return True
+
+    async def _run(self, audio: np.ndarray) -> None:
+        try:
+            transcript = await self._context.asr_engine.async_transcribe_np(audio)
+            if not transcript or not transcript.strip():
+                return
+            self.transcript = transcript
+            logger.info(f"Speculating on partial transcript: {transcript}")
+
+            batch_input = create_batch_input(
+                input_text=transcript,
+                images=None,
+                from_name=self._context.character_config.human_name,
+            )
+            batch_input.metadata = {"tool_gate": self._tool_gate}
+            async for output in self._agent.chat(batch_input):
+                self._queue.put_nowait(output)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Speculative response failed: {e}")
+            self._queue.put_nowait(e)
+        finally:
+            self._queue.put_nowait(_END_OF_OUTPUT)
+
+    def matches(self, final_transcript: str) -> bool:
+        """Whether the final transcript is the one the speculation started on."""
+        if self.transcript is None:
+            return False
+        final = normalize_transcript(final_transcript)
+        return bool(final) and final == normalize_transcript(self.transcript)
+
+    async def commit(self) -> AsyncIterator[Any]:
+        """
+        Take over the speculative response: yields the buffered agent output,
+        then the rest of it as it is generated.
+        """
+        self._committed = True
+        self._tool_gate.set()
+        logger.info("Speculative response matches the final transcript, committing.")
+        try:
+            while True:
+                output = await self._queue.get()
+                if output is _END_OF_OUTPUT:
+                    return
+                if isinstance(output, Exception):
+                    raise output
+                yield output
+        finally:
+            # Interrupted: stop generating, like a regular response would
+            if self._task and not self._task.done():
+                self._task.cancel()
+
+    async def cancel(self) -> None:
+        """Stop the speculation and undo its changes to the agent's memory."""
+        if self._task is None or self._committed:
+            return
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._agent.restore_memory(self._checkpoint)
+        self._task = None
+        logger.debug("Speculative response cancelled, agent memory restored.")
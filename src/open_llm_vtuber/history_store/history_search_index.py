@@ -0,0 +1,405 @@
+"""Full-text search over all chat histories, with SQLite FTS5.
+
+The index lives in its own database next to the histories, so it works with
+every history backend. It is kept up to date by `chat_history_manager` as
+messages are written, and synced with the store in the background when the
+server starts, which picks up the histories written while search was disabled.
+
+The trigram tokenizer is used when available, so substrings match and
+languages written without spaces, like Chinese, can be searched. Queries with
+terms shorter than three characters then fall back to a scan of the text.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, List, Optional
+from loguru import logger
+
+from .history_store_interface import HistoryStoreInterface
+from .jsonl_history_store import DEFAULT_BASE_DIR
+
+DEFAULT_INDEX_NAME = "search_index.db"
+
+# Only what the human and the AI said is searchable
+INDEXED_ROLES = ("human", "ai")
+
+# Terms kept from a `match_any` query, longest first
+MAX_MATCH_ANY_TERMS = 8
+# Words too common to tell messages apart, left out of `match_any` queries
+_STOPWORDS = frozenset(
+    """
+    about after again all also and any are because been before but can could
+    did does doing don't for from had has have her here hers him his how i'm
+    into it's its just like more most not now off once only other our out over
+    own same she should some such than that the their them then there these
+    they this those through too under until very was we're were what when
+    where which while who whom why will with would you you're your yours
+    """.split()
+)
+# Attempts at indexing a history that keeps changing while it is read
+MAX_SYNC_ATTEMPTS = 3
+# Punctuation stripped from the ends of `match_any` terms
+_TERM_PUNCTUATION = ".,!?;:'\"()[]{}<>…，。！？；：、“”‘’（）《》"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_histories (
+    conf_uid TEXT NOT NULL,
+    history_uid TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    version TEXT,
+    PRIMARY KEY (conf_uid, history_uid)
+);
+CREATE TABLE IF NOT EXISTS indexed_messages (
+    id INTEGER PRIMARY KEY,
+    conf_uid TEXT NOT NULL,
+    history_uid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    timestamp TEXT,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_indexed_messages_history
+    ON indexed_messages (conf_uid, history_uid, position);
+"""
+
+# The FTS table only holds the inverted index; triggers keep it in sync with
+# the text in indexed_messages
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE message_index USING fts5(
+    content,
+    content = 'indexed_messages',
+    content_rowid = 'id',
+    tokenize = "{tokenizer}"
+);
+CREATE TRIGGER indexed_messages_insert AFTER INSERT ON indexed_messages BEGIN
+    INSERT INTO message_index (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER indexed_messages_delete AFTER DELETE ON indexed_messages BEGIN
+    INSERT INTO message_index (message_index, rowid, content)
+        VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER indexed_messages_update AFTER UPDATE OF content ON indexed_messages BEGIN
+    INSERT INTO message_index (message_index, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    INSERT INTO message_index (rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+_INSERT_MESSAGE = (
+    "INSERT INTO indexed_messages "
+    "(conf_uid, history_uid, position, role, timestamp, content) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+class HistorySearchIndex:
+    """Inverted index of the messages of all histories.
+
+    Messages are identified by their history and their index in it, as used by
+    `HistoryStoreInterface.get_messages`. The index counts the messages of each
+    history itself, so writes must reach it in the order they reach the store.
+    Each indexed history also keeps the `HistoryStoreInterface.history_version`
+    it was indexed at, which tells `sync` whether it changed since.
+    """
+
+    def __init__(
+        self, base_dir: str = DEFAULT_BASE_DIR, db_name: str = DEFAULT_INDEX_NAME
+    ):
+        os.makedirs(base_dir, exist_ok=True)
+        self.db_path = os.path.join(base_dir, db_name)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {
+            row["name"]
+            for row in self._conn.execute("PRAGMA table_info(indexed_histories)")
+        }
+        if "version" not in columns:
+            # Indexes from before versions were kept; their histories are indexed again
+            self._conn.execute("ALTER TABLE indexed_histories ADD COLUMN version TEXT")
+        self.trigram = self._create_fts_table()
+        self._closed = False
+
+    def _create_fts_table(self) -> bool:
+        """Create the FTS table. Returns whether it uses the trigram tokenizer."""
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'message_index'"
+        ).fetchone()
+        if row is not None:
+            return "trigram" in row["sql"]
+        try:
+            self._conn.executescript(_FTS_SCHEMA.format(tokenizer="trigram"))
+            return True
+        except sqlite3.OperationalError:
+            # SQLite older than 3.34
+            logger.warning(
+                "SQLite has no trigram tokenizer. Chat history search matches whole words only."
+            )
+            self._conn.executescript(_FTS_SCHEMA.format(tokenizer="unicode61"))
+            return False
+
+    def sync(
+        self,
+        store: HistoryStoreInterface,
+        write_lock: Optional[ContextManager] = None,
+    ) -> None:
+        """Bring the index in line with the store.
+
+        Histories whose version differs from the one they were indexed at are
+        indexed again, and histories no longer in the store are dropped. On an
+        empty index this indexes every history.
+
+        Meant to run in a background thread while the store is in use: a
+        history is read without locks, then indexed while holding
+        `write_lock`, the lock its writers hold while writing to the store and
+        the index, unless it changed in the meantime.
+        """
+        with self._lock:
+            indexed = {
+                (row["conf_uid"], row["history_uid"]): row["version"]
+                for row in self._conn.execute("SELECT * FROM indexed_histories")
+            }
+        write_lock = write_lock or nullcontext()
+        reindexed = 0
+        for conf_uid in store.list_conf_uids():
+            for history_uid in store.list_history_uids(conf_uid):
+                if self._closed:
+                    return
+                indexed_version = indexed.pop((conf_uid, history_uid), None)
+                try:
+                    if self._sync_history(
+                        store, conf_uid, history_uid, indexed_version, write_lock
+                    ):
+                        reindexed += 1
+                except Exception as e:
+                    logger.error(f"Failed to index history {history_uid}: {e}")
+
+        # Left over: histories deleted while the index was not updated
+        for conf_uid, history_uid in indexed:
+            if self._closed:
+                return
+            self.delete_history(conf_uid, history_uid)
+        if reindexed or indexed:
+            logger.info(
+                f"Synced chat history search index: {reindexed} histories indexed, "
+                f"{len(indexed)} removed"
+            )
+
+    def _sync_history(
+        self,
+        store: HistoryStoreInterface,
+        conf_uid: str,
+        history_uid: str,
+        indexed_version: Optional[str],
+        write_lock: ContextManager,
+    ) -> bool:
+        """Index a history again if it changed. Returns whether it did."""
+        version = store.history_version(conf_uid, history_uid)
+        if version == indexed_version:
+            return False
+        for _ in range(MAX_SYNC_ATTEMPTS):
+            messages = list(store.iter_messages(conf_uid, history_uid))
+            with write_lock, self._lock:
+                latest_version = store.history_version(conf_uid, history_uid)
+                if latest_version == version:
+                    self.delete_history(conf_uid, history_uid)
+                    self.add_messages(conf_uid, history_uid, messages, version)
+                    return True
+            version = latest_version
+        logger.warning(
+            f"History {history_uid} kept changing while it was indexed; "
+            "it is indexed again at the next start"
+        )
+        return False
+
+    def add_messages(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        messages: List[dict],
+        version: Optional[str] = None,
+    ) -> None:
+        """Index messages just appended to a history.
+
+        `version` is the version of the history with these messages in it.
+        Without it, the history is indexed again at the next `sync`.
+        """
+        with self._lock, self._conn:
+            start = self._message_count(conf_uid, history_uid)
+            self._conn.executemany(
+                _INSERT_MESSAGE,
+                [
+                    (
+                        conf_uid,
+                        history_uid,
+                        start + offset,
+                        message["role"],
+                        message.get("timestamp"),
+                        message.get("content") or "",
+                    )
+                    for offset, message in enumerate(messages)
+                    if message["role"] in INDEXED_ROLES
+                ],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_histories "
+                "(conf_uid, history_uid, message_count, version) VALUES (?, ?, ?, ?)",
+                (conf_uid, history_uid, start + len(messages), version),
+            )
+
+    def replace_latest_message(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        message: dict,
+        version: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE indexed_histories SET version = ? "
+                "WHERE conf_uid = ? AND history_uid = ?",
+                (version, conf_uid, history_uid),
+            )
+            position = self._message_count(conf_uid, history_uid) - 1
+            self._conn.execute(
+                "DELETE FROM indexed_messages "
+                "WHERE conf_uid = ? AND history_uid = ? AND position = ?",
+                (conf_uid, history_uid, position),
+            )
+            if message["role"] in INDEXED_ROLES:
+                self._conn.execute(
+                    _INSERT_MESSAGE,
+                    (
+                        conf_uid,
+                        history_uid,
+                        position,
+                        message["role"],
+                        message.get("timestamp"),
+                        message.get("content") or "",
+                    ),
+                )
+
+    def delete_history(self, conf_uid: str, history_uid: str) -> None:
+        with self._lock, self._conn:
+            for table in ("indexed_messages", "indexed_histories"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE conf_uid = ? AND history_uid = ?",
+                    (conf_uid, history_uid),
+                )
+
+    def rename_history(
+        self, conf_uid: str, old_history_uid: str, new_history_uid: str
+    ) -> None:
+        with self._lock, self._conn:
+            for table in ("indexed_messages", "indexed_histories"):
+                self._conn.execute(
+                    f"UPDATE {table} SET history_uid = ? "
+                    "WHERE conf_uid = ? AND history_uid = ?",
+                    (new_history_uid, conf_uid, old_history_uid),
+                )
+
+    def search(
+        self,
+        conf_uid: str,
+        query: str,
+        limit: int = 20,
+        exclude_history_uid: Optional[str] = None,
+        match_any: bool = False,
+    ) -> List[dict]:
+        """Find the messages of a conf that contain every term of the query.
+
+        With `match_any`, messages containing any of the terms are found, the
+        ones with more and rarer terms first. Common words and terms too short
+        for the trigram index are then ignored, and only the longest
+        `MAX_MATCH_ANY_TERMS` terms are used.
+
+        Returns:
+            List[dict]: Best matches first, each with "history_uid", "index"
+            and "message".
+        """
+        terms = query.split()
+        if match_any:
+            terms = self._match_any_terms(terms)
+        if not terms:
+            return []
+        joiner = " OR " if match_any else " AND "
+
+        if self.trigram and any(len(term) < 3 for term in terms):
+            # Too short for the trigram index; scan the indexed text instead
+            sql = (
+                "SELECT m.* FROM indexed_messages m WHERE "
+                + "("
+                + joiner.join(["m.content LIKE ? ESCAPE '\\'"] * len(terms))
+                + ")"
+            )
+            params = [
+                "%"
+                + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                + "%"
+                for term in terms
+            ]
+            order = "m.id DESC"
+        else:
+            # Quote every term, so the query syntax of FTS5 does not apply
+            sql = (
+                "SELECT m.* FROM message_index "
+                "JOIN indexed_messages m ON m.id = message_index.rowid "
+                "WHERE message_index MATCH ?"
+            )
+            params = [
+                joiner.join('"' + term.replace('"', '""') + '"' for term in terms)
+            ]
+            order = "message_index.rank"
+
+        sql += " AND m.conf_uid = ?"
+        params.append(conf_uid)
+        if exclude_history_uid:
+            sql += " AND m.history_uid != ?"
+            params.append(exclude_history_uid)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "history_uid": row["history_uid"],
+                "index": row["position"],
+                "message": {
+                    "role": row["role"],
+                    "timestamp": row["timestamp"],
+                    "content": row["content"],
+                },
+            }
+            for row in rows
+        ]
+
+    def _match_any_terms(self, terms: List[str]) -> List[str]:
+        kept = {}
+        for term in terms:
+            term = term.strip(_TERM_PUNCTUATION)
+            if term.lower() in _STOPWORDS or (self.trigram and len(term) < 3):
+                continue
+            kept.setdefault(term.lower(), term)
+        # Longer terms tend to be rarer, so they are the ones worth matching
+        return sorted(kept.values(), key=len, reverse=True)[:MAX_MATCH_ANY_TERMS]
+
+    def _message_count(self, conf_uid: str, history_uid: str) -> int:
+        row = self._conn.execute(
+            "SELECT message_count FROM indexed_histories "
+            "WHERE conf_uid = ? AND history_uid = ?",
+            (conf_uid, history_uid),
+        ).fetchone()
+        return row["message_count"] if row is not None else 0
+
+    def close(self) -> None:
+        """Close the database; a running `sync` stops at the next history."""
+        with self._lock:
+            self._closed = True
+            self._conn.close()
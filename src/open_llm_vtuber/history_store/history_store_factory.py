@@ -0,0 +1,17 @@
+from .history_store_interface import HistoryStoreInterface
+
+
+class HistoryStoreFactory:
+    @staticmethod
+    def get_history_store(backend: str, **kwargs) -> HistoryStoreInterface:
+        backend = backend.lower()
+        if backend == "jsonl":
+            from .jsonl_history_store import JSONLHistoryStore
+
+            return JSONLHistoryStore(**kwargs)
+        elif backend == "sqlite":
+            from .sqlite_history_store import SQLiteHistoryStore
+
+            return SQLiteHistoryStore(**kwargs)
+        else:
+            raise ValueError(f"Unsupported chat history backend: {backend}")
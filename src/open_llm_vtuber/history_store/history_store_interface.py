@@ -0,0 +1,130 @@
+import abc
+import itertools
+from typing import Iterator, List, Literal, Optional, TypedDict
+
+
+class HistoryMessage(TypedDict):
+    role: Literal["human", "ai"]
+    timestamp: str
+    content: str
+    # Optional display information for the message
+    name: Optional[str]
+    avatar: Optional[str]
+
+
+class HistoryStoreInterface(metaclass=abc.ABCMeta):
+    """Storage of chat histories, grouped by character config (`conf_uid`).
+
+    Arguments are validated by `chat_history_manager`, which is what the rest of
+    the code uses. Implementations may raise `ValueError` for unsafe uids.
+    """
+
+    @abc.abstractmethod
+    def create_history(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        """Create an empty history with the given metadata."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def append_message(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        """Append a message to a history, creating the history if needed."""
+        raise NotImplementedError
+
+    def append_messages(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        """Append several messages to a history at once, in order."""
+        for message in messages:
+            self.append_message(conf_uid, history_uid, message)
+
+    @abc.abstractmethod
+    def iter_messages(
+        self, conf_uid: str, history_uid: str
+    ) -> Iterator[HistoryMessage]:
+        """Yield the messages of a history in order, without loading all of them."""
+        raise NotImplementedError
+
+    def get_messages(
+        self, conf_uid: str, history_uid: str, start: int, end: int
+    ) -> List[HistoryMessage]:
+        """Return the messages with indexes in [start, end), in order."""
+        return list(
+            itertools.islice(self.iter_messages(conf_uid, history_uid), start, end)
+        )
+
+    def count_messages(self, conf_uid: str, history_uid: str) -> int:
+        return sum(1 for _ in self.iter_messages(conf_uid, history_uid))
+
+    def history_version(self, conf_uid: str, history_uid: str) -> str:
+        """A value that changes when messages are added to a history.
+
+        Used to tell which histories changed since they were indexed, so
+        implementations should return it without reading the messages.
+        """
+        return str(self.count_messages(conf_uid, history_uid))
+
+    @abc.abstractmethod
+    def history_exists(self, conf_uid: str, history_uid: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        """Return the metadata of a history, or {} if it has none."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        """Replace the metadata of an existing history."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_latest_message(
+        self, conf_uid: str, history_uid: str
+    ) -> Optional[HistoryMessage]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def replace_latest_message(
+        self, conf_uid: str, history_uid: str, message: dict
+    ) -> None:
+        """Overwrite the latest message of a non-empty history."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_history(self, conf_uid: str, history_uid: str) -> bool:
+        """Delete a history. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rename_history(
+        self, conf_uid: str, old_history_uid: str, new_history_uid: str
+    ) -> bool:
+        """Give a history a new uid. Returns False if it does not exist."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_history_uids(self, conf_uid: str) -> List[str]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_conf_uids(self) -> List[str]:
+        """List the confs that have histories."""
+        raise NotImplementedError
+
+    def list_histories(self, conf_uid: str) -> List[dict]:
+        """List the histories of a conf with their latest messages.
+
+        Returns:
+            List[dict]: {"uid": history_uid, "latest_message": message or None}
+            for each history.
+        """
+        return [
+            {
+                "uid": history_uid,
+                "latest_message": self.get_latest_message(conf_uid, history_uid),
+            }
+            for history_uid in self.list_history_uids(conf_uid)
+        ]
+
+    def close(self) -> None:
+        """Release the resources of the store."""
+        pass
@@ -0,0 +1,190 @@
+"""Background writer that takes history writes off the event loop."""
+
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from .history_search_index import HistorySearchIndex
+from .history_store_interface import HistoryStoreInterface
+
+# Seconds between two flushes of the buffered messages
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Buffered messages that trigger a flush before the interval is over
+DEFAULT_MAX_PENDING = 100
+
+
+class HistoryWriter:
+    """Buffers appended messages and writes them to the store from a thread.
+
+    While started, `append` only adds the message to an in-memory buffer, so
+    the conversation handlers never wait for the disk. A background task
+    flushes the buffer every `flush_interval` seconds, or sooner once
+    `max_pending` messages are waiting, writing the messages of each history in
+    one batch. The buffer is flushed when the writer stops.
+
+    Reads go to the store, so callers must `flush` the history they are about
+    to read to see their own writes. Before the writer is started, `append`
+    writes to the store directly.
+
+    Written messages are also added to `search_index`, if set.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStoreInterface,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.store = store
+        self.search_index: Optional[HistorySearchIndex] = None
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # (conf_uid, history_uid) -> messages not written yet
+        self._pending: Dict[Tuple[str, str], List[dict]] = {}
+        self._pending_count = 0
+        # Guards the buffer; held only briefly, never during IO
+        self._lock = threading.Lock()
+        # Serializes writes, so batches reach the store in order
+        self._flush_lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def write_lock(self) -> threading.Lock:
+        """Held while messages are written to the store and the search index."""
+        return self._flush_lock
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the flush task on the running event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.debug("History writer started")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+        logger.debug("History writer stopped")
+
+    def append(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        """Queue a message to be appended to a history."""
+        if not self.running:
+            with self._flush_lock:
+                self.store.append_message(conf_uid, history_uid, message)
+                self._index(conf_uid, history_uid, [message])
+            return
+
+        with self._lock:
+            self._pending.setdefault((conf_uid, history_uid), []).append(message)
+            self._pending_count += 1
+            full = self._pending_count >= self.max_pending
+        if full:
+            # May be called from a worker thread
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def modify_latest_pending(
+        self, conf_uid: str, history_uid: str, role: str, new_content: str
+    ) -> Optional[bool]:
+        """Change the content of the latest message if it is still buffered.
+
+        Returns:
+            Optional[bool]: None if the history has no buffered message,
+            otherwise whether the latest message had the given role.
+        """
+        with self._lock:
+            messages = self._pending.get((conf_uid, history_uid))
+            if not messages:
+                return None
+            if messages[-1]["role"] != role:
+                return False
+            messages[-1]["content"] = new_content
+            return True
+
+    def pending_history_uids(self, conf_uid: str) -> List[str]:
+        """UIDs of the histories of a conf that have buffered messages."""
+        with self._lock:
+            return [
+                history_uid
+                for pending_conf_uid, history_uid in self._pending
+                if pending_conf_uid == conf_uid
+            ]
+
+    def discard(self, conf_uid: str, history_uid: str) -> None:
+        """Drop the buffered messages of a history, e.g. before deleting it."""
+        with self._lock:
+            messages = self._pending.pop((conf_uid, history_uid), [])
+            self._pending_count -= len(messages)
+
+    def flush(
+        self, conf_uid: Optional[str] = None, history_uid: Optional[str] = None
+    ) -> None:
+        """Write the buffered messages of one history, or of all histories.
+
+        Blocking; returns once the messages are in the store, including those
+        a concurrent flush had already taken from the buffer.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if conf_uid is None:
+                    batches = self._pending
+                    self._pending = {}
+                else:
+                    key = (conf_uid, history_uid)
+                    batches = (
+                        {key: self._pending.pop(key)} if key in self._pending else {}
+                    )
+                self._pending_count -= sum(
+                    len(messages) for messages in batches.values()
+                )
+
+            for (batch_conf_uid, batch_history_uid), messages in batches.items():
+                try:
+                    self.store.append_messages(
+                        batch_conf_uid, batch_history_uid, messages
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Failed to write {len(messages)} messages to history {batch_history_uid}: {e}"
+                    )
+                    continue
+                self._index(batch_conf_uid, batch_history_uid, messages)
+
+    def _index(self, conf_uid: str, history_uid: str, messages: List[dict]) -> None:
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.add_messages(
+                conf_uid,
+                history_uid,
+                messages,
+                self.store.history_version(conf_uid, history_uid),
+            )
+        except Exception as e:
+            logger.error(f"Failed to index messages of history {history_uid}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending:
+                await asyncio.to_thread(self.flush)
@@ -0,0 +1,335 @@
+"""Chat histories as append-only JSON Lines files.
+
+Each history is `{base_dir}/{conf_uid}/{history_uid}.jsonl`, one message per
+line, with its metadata in a `{history_uid}.meta.json` sidecar. Storing a
+message appends one line instead of rewriting the whole history, and readers
+stream the file line by line.
+
+Histories in the old format (a single `{history_uid}.json` holding a JSON list
+whose first item may be the metadata) are migrated the first time they are
+accessed, or all at once with `python -m open_llm_vtuber.history_store.migrate`.
+"""
+
+import os
+import re
+import json
+from typing import Iterator, List, Optional, Tuple
+from loguru import logger
+
+from .history_store_interface import HistoryMessage, HistoryStoreInterface
+
+DEFAULT_BASE_DIR = "chat_history"
+
+MESSAGES_SUFFIX = ".jsonl"
+METADATA_SUFFIX = ".meta.json"
+LEGACY_SUFFIX = ".json"
+
+# Bytes read per step when looking for the last line of a history
+_TAIL_BLOCK_SIZE = 4096
+
+
+def _is_safe_filename(filename: str) -> bool:
+    """Validate filename for safety and allowed characters"""
+    if not filename or len(filename) > 255:
+        return False
+
+    # Allow alphanumeric, hyphen, underscore, and common unicode characters
+    # Block any filesystem special characters, control characters, and path separators
+    pattern = re.compile(r"^[\w\-_\u0020-\u007E\u00A0-\uFFFF]+$")
+    return bool(pattern.match(filename))
+
+
+def _sanitize_path_component(component: str) -> str:
+    """Sanitize and validate a path component"""
+    # Remove any path components, get just the basename
+    sanitized = os.path.basename(component.strip())
+
+    if not _is_safe_filename(sanitized):
+        raise ValueError(f"Invalid characters in path component: {component}")
+
+    return sanitized
+
+
+def _dump_line(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _write_json_atomic(filepath: str, data) -> None:
+    """Write a JSON file so that readers see either the old or the new content"""
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, filepath)
+
+
+def _find_last_line(f) -> Tuple[int, bytes]:
+    """Return the offset and content of the last non-empty line of a binary file.
+
+    Reads backwards from the end in blocks, so the cost does not depend on the
+    length of the history. Returns (0, b"") if the file has no such line.
+    """
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    # Ignore trailing newlines
+    while end > 0:
+        f.seek(end - 1)
+        if f.read(1) not in (b"\n", b"\r"):
+            break
+        end -= 1
+
+    position = end
+    tail = b""
+    while position > 0:
+        step = min(_TAIL_BLOCK_SIZE, position)
+        position -= step
+        f.seek(position)
+        tail = f.read(step) + tail
+        newline = tail.rfind(b"\n")
+        if newline != -1:
+            start = position + newline + 1
+            return start, tail[newline + 1 :]
+    return 0, tail
+
+
+def migrate_legacy_history(legacy_path: str) -> bool:
+    """Convert a `.json` history into a `.jsonl` file and its metadata sidecar.
+
+    The new files are written next to the old one under temporary names and
+    renamed into place before the old file is removed, so an interrupted
+    migration can simply be run again.
+
+    Returns:
+        bool: True if the history was migrated.
+    """
+    if not legacy_path.endswith(LEGACY_SUFFIX) or legacy_path.endswith(METADATA_SUFFIX):
+        return False
+    stem = legacy_path[: -len(LEGACY_SUFFIX)]
+    messages_path = stem + MESSAGES_SUFFIX
+    metadata_path = stem + METADATA_SUFFIX
+
+    if os.path.exists(messages_path):
+        # Migrated before, but interrupted before the old file was removed.
+        # Messages may have been appended since, so keep the new file.
+        os.remove(legacy_path)
+        return False
+
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            history_data = json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to read legacy history file {legacy_path}: {e}")
+        return False
+    if not isinstance(history_data, list):
+        logger.error(f"Legacy history file is not a list: {legacy_path}")
+        return False
+
+    metadata = None
+    if history_data and history_data[0].get("role") == "metadata":
+        metadata = history_data.pop(0)
+
+    try:
+        tmp_path = f"{messages_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for message in history_data:
+                f.write(_dump_line(message))
+        if metadata is not None:
+            _write_json_atomic(metadata_path, metadata)
+        os.replace(tmp_path, messages_path)
+        os.remove(legacy_path)
+    except Exception as e:
+        logger.error(f"Failed to migrate history file {legacy_path}: {e}")
+        return False
+
+    logger.info(f"Migrated history file {legacy_path} to {messages_path}")
+    return True
+
+
+class JSONLHistoryStore(HistoryStoreInterface):
+    """Histories as append-only `.jsonl` files with `.meta.json` sidecars."""
+
+    def __init__(self, base_dir: str = DEFAULT_BASE_DIR):
+        self.base_dir = base_dir
+
+    def _conf_dir(self, conf_uid: str, create: bool = False) -> str:
+        if not conf_uid:
+            raise ValueError("conf_uid cannot be empty")
+        conf_dir = os.path.join(self.base_dir, _sanitize_path_component(conf_uid))
+        if create:
+            os.makedirs(conf_dir, exist_ok=True)
+        return conf_dir
+
+    def _path(self, conf_uid: str, history_uid: str, suffix: str) -> str:
+        """Get sanitized path for one of the files of a history"""
+        conf_dir = self._conf_dir(conf_uid)
+        safe_history_uid = _sanitize_path_component(history_uid)
+        full_path = os.path.normpath(
+            os.path.join(conf_dir, f"{safe_history_uid}{suffix}")
+        )
+        if not full_path.startswith(os.path.normpath(conf_dir)):
+            raise ValueError("Invalid path: Path traversal detected")
+        return full_path
+
+    def _messages_path(self, conf_uid: str, history_uid: str) -> str:
+        """Path of the messages file, migrating a legacy history first"""
+        messages_path = self._path(conf_uid, history_uid, MESSAGES_SUFFIX)
+        if not os.path.exists(messages_path):
+            legacy_path = self._path(conf_uid, history_uid, LEGACY_SUFFIX)
+            if os.path.exists(legacy_path):
+                migrate_legacy_history(legacy_path)
+        return messages_path
+
+    def create_history(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        self._conf_dir(conf_uid, create=True)
+        open(self._path(conf_uid, history_uid, MESSAGES_SUFFIX), "ab").close()
+        _write_json_atomic(self._path(conf_uid, history_uid, METADATA_SUFFIX), metadata)
+
+    def append_message(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        self.append_messages(conf_uid, history_uid, [message])
+
+    def append_messages(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        self._conf_dir(conf_uid, create=True)
+        messages_path = self._messages_path(conf_uid, history_uid)
+        with open(messages_path, "ab+") as f:
+            f.seek(0, os.SEEK_END)
+            lines = b"".join(_dump_line(message) for message in messages)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # A previous write was cut short; keep its remains on their own line
+                    lines = b"\n" + lines
+            f.write(lines)
+
+    def iter_messages(
+        self, conf_uid: str, history_uid: str
+    ) -> Iterator[HistoryMessage]:
+        messages_path = self._messages_path(conf_uid, history_uid)
+        if not os.path.exists(messages_path):
+            return
+        with open(messages_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping unreadable line {line_number} of {messages_path}"
+                    )
+
+    def history_exists(self, conf_uid: str, history_uid: str) -> bool:
+        return os.path.exists(self._messages_path(conf_uid, history_uid))
+
+    def history_version(self, conf_uid: str, history_uid: str) -> str:
+        messages_path = self._messages_path(conf_uid, history_uid)
+        if not os.path.exists(messages_path):
+            return ""
+        stat = os.stat(messages_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        # Make sure the sidecar of a legacy history exists
+        self._messages_path(conf_uid, history_uid)
+        metadata_path = self._path(conf_uid, history_uid, METADATA_SUFFIX)
+        if not os.path.exists(metadata_path):
+            return {}
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        self._messages_path(conf_uid, history_uid)
+        _write_json_atomic(self._path(conf_uid, history_uid, METADATA_SUFFIX), metadata)
+
+    def get_latest_message(
+        self, conf_uid: str, history_uid: str
+    ) -> Optional[HistoryMessage]:
+        messages_path = self._messages_path(conf_uid, history_uid)
+        if not os.path.exists(messages_path):
+            return None
+        with open(messages_path, "rb") as f:
+            _, line = _find_last_line(f)
+        if not line.strip():
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            # The last write was cut short; use the last readable message
+            latest_message = None
+            for latest_message in self.iter_messages(conf_uid, history_uid):
+                pass
+            return latest_message
+
+    def replace_latest_message(
+        self, conf_uid: str, history_uid: str, message: dict
+    ) -> None:
+        messages_path = self._messages_path(conf_uid, history_uid)
+        with open(messages_path, "rb+") as f:
+            start, line = _find_last_line(f)
+            if not line.strip():
+                raise ValueError("History is empty")
+            f.seek(start)
+            f.truncate()
+            f.write(_dump_line(message))
+
+    def delete_history(self, conf_uid: str, history_uid: str) -> bool:
+        deleted = False
+        for suffix in (MESSAGES_SUFFIX, METADATA_SUFFIX, LEGACY_SUFFIX):
+            filepath = self._path(conf_uid, history_uid, suffix)
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                # The sidecar alone does not make a history
+                deleted = deleted or suffix != METADATA_SUFFIX
+        return deleted
+
+    def rename_history(
+        self, conf_uid: str, old_history_uid: str, new_history_uid: str
+    ) -> bool:
+        old_path = self._messages_path(conf_uid, old_history_uid)
+        if not os.path.exists(old_path):
+            return False
+        old_metadata_path = self._path(conf_uid, old_history_uid, METADATA_SUFFIX)
+        os.rename(old_path, self._path(conf_uid, new_history_uid, MESSAGES_SUFFIX))
+        if os.path.exists(old_metadata_path):
+            os.rename(
+                old_metadata_path,
+                self._path(conf_uid, new_history_uid, METADATA_SUFFIX),
+            )
+        return True
+
+    def list_history_uids(self, conf_uid: str) -> List[str]:
+        conf_dir = self._conf_dir(conf_uid, create=True)
+        history_uids = []
+        for filename in os.listdir(conf_dir):
+            if filename.endswith(MESSAGES_SUFFIX):
+                history_uids.append(filename[: -len(MESSAGES_SUFFIX)])
+            elif filename.endswith(LEGACY_SUFFIX) and not filename.endswith(
+                METADATA_SUFFIX
+            ):
+                history_uid = filename[: -len(LEGACY_SUFFIX)]
+                messages_path = os.path.join(conf_dir, history_uid + MESSAGES_SUFFIX)
+                if not os.path.exists(messages_path):
+                    history_uids.append(history_uid)
+        return history_uids
+
+    def list_conf_uids(self) -> List[str]:
+        if not os.path.isdir(self.base_dir):
+            return []
+        return [
+            conf_uid
+            for conf_uid in os.listdir(self.base_dir)
+            if os.path.isdir(os.path.join(self.base_dir, conf_uid))
+        ]
+
+    def list_histories(self, conf_uid: str) -> List[dict]:
+        histories = []
+        for history_uid in self.list_history_uids(conf_uid):
+            try:
+                # Only the tail of each file is read
+                latest_message = self.get_latest_message(conf_uid, history_uid)
+            except Exception as e:
+                logger.error(f"Error reading history {history_uid}: {e}")
+                continue
+            histories.append({"uid": history_uid, "latest_message": latest_message})
+        return histories
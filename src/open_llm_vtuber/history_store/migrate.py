@@ -0,0 +1,48 @@
+"""Migrate all chat histories from `.json` files to `.jsonl` files.
+
+Histories are also migrated one by one when they are first accessed, so running
+this is optional. Usage, from the project root:
+
+    python -m open_llm_vtuber.history_store.migrate [chat_history_dir]
+"""
+
+import os
+import sys
+from loguru import logger
+
+from .jsonl_history_store import (
+    DEFAULT_BASE_DIR,
+    LEGACY_SUFFIX,
+    METADATA_SUFFIX,
+    migrate_legacy_history,
+)
+
+
+def migrate_histories(base_dir: str = DEFAULT_BASE_DIR) -> int:
+    """Migrate every legacy history under `base_dir`.
+
+    Returns:
+        int: The number of histories migrated.
+    """
+    if not os.path.isdir(base_dir):
+        logger.warning(f"History directory not found: {base_dir}")
+        return 0
+
+    migrated = 0
+    for conf_uid in sorted(os.listdir(base_dir)):
+        conf_dir = os.path.join(base_dir, conf_uid)
+        if not os.path.isdir(conf_dir):
+            continue
+        for filename in sorted(os.listdir(conf_dir)):
+            if filename.endswith(LEGACY_SUFFIX) and not filename.endswith(
+                METADATA_SUFFIX
+            ):
+                if migrate_legacy_history(os.path.join(conf_dir, filename)):
+                    migrated += 1
+    return migrated
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BASE_DIR
+    count = migrate_histories(directory)
+    logger.info(f"Migrated {count} histories in {directory}")
@@ -0,0 +1,315 @@
+"""Chat histories in a single SQLite database.
+
+Messages are rows of one table, indexed by (conf_uid, history_uid, id), so the
+history list of a character is one indexed query instead of a read of every
+history. The database runs in WAL mode, so reads do not wait for writes.
+
+When the database is created, the JSONL histories found in the same directory
+are imported into it. The files are left in place.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Iterator, List, Optional
+from loguru import logger
+
+from .history_store_interface import HistoryMessage, HistoryStoreInterface
+from .jsonl_history_store import DEFAULT_BASE_DIR, JSONLHistoryStore
+
+DEFAULT_DB_NAME = "chat_history.db"
+
+# Messages fetched per query when streaming a history
+_ITER_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS histories (
+    conf_uid TEXT NOT NULL,
+    history_uid TEXT NOT NULL,
+    metadata TEXT,
+    PRIMARY KEY (conf_uid, history_uid)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conf_uid TEXT NOT NULL,
+    history_uid TEXT NOT NULL,
+    role TEXT NOT NULL,
+    timestamp TEXT,
+    content TEXT,
+    name TEXT,
+    avatar TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_history
+    ON messages (conf_uid, history_uid, id);
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp
+    ON messages (conf_uid, history_uid, timestamp);
+"""
+
+_MESSAGE_COLUMNS = "role, timestamp, content, name, avatar"
+
+
+def _row_to_message(row: sqlite3.Row) -> HistoryMessage:
+    message = {
+        "role": row["role"],
+        "timestamp": row["timestamp"],
+        "content": row["content"],
+    }
+    # Optional display information is only present when it was given
+    if row["name"] is not None:
+        message["name"] = row["name"]
+    if row["avatar"] is not None:
+        message["avatar"] = row["avatar"]
+    return message
+
+
+def _message_values(message: dict) -> tuple:
+    return (
+        message["role"],
+        message.get("timestamp"),
+        message.get("content"),
+        message.get("name"),
+        message.get("avatar"),
+    )
+
+
+class SQLiteHistoryStore(HistoryStoreInterface):
+    """Histories and their messages as rows of a SQLite database."""
+
+    def __init__(
+        self, base_dir: str = DEFAULT_BASE_DIR, db_name: str = DEFAULT_DB_NAME
+    ):
+        os.makedirs(base_dir, exist_ok=True)
+        self.base_dir = base_dir
+        self.db_path = os.path.join(base_dir, db_name)
+        is_new = not os.path.exists(self.db_path)
+
+        # One connection shared by all threads, serialized by the lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        if is_new:
+            self._import_jsonl_histories()
+
+    def _import_jsonl_histories(self) -> None:
+        """Copy the histories of the file-based store into the new database"""
+        jsonl_store = JSONLHistoryStore(self.base_dir)
+        imported = 0
+        for conf_uid in os.listdir(self.base_dir):
+            if not os.path.isdir(os.path.join(self.base_dir, conf_uid)):
+                continue
+            try:
+                for history_uid in jsonl_store.list_history_uids(conf_uid):
+                    metadata = jsonl_store.get_metadata(conf_uid, history_uid)
+                    self.create_history(conf_uid, history_uid, metadata)
+                    with self._lock, self._conn:
+                        self._conn.executemany(
+                            f"INSERT INTO messages (conf_uid, history_uid, {_MESSAGE_COLUMNS}) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (
+                                (conf_uid, history_uid, *_message_values(message))
+                                for message in jsonl_store.iter_messages(
+                                    conf_uid, history_uid
+                                )
+                            ),
+                        )
+                    imported += 1
+            except Exception as e:
+                logger.error(f"Failed to import histories of {conf_uid}: {e}")
+        if imported:
+            logger.info(f"Imported {imported} histories into {self.db_path}")
+
+    def create_history(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO histories (conf_uid, history_uid, metadata) VALUES (?, ?, ?)",
+                (conf_uid, history_uid, json.dumps(metadata, ensure_ascii=False)),
+            )
+
+    def append_message(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        self.append_messages(conf_uid, history_uid, [message])
+
+    def append_messages(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO histories (conf_uid, history_uid) VALUES (?, ?)",
+                (conf_uid, history_uid),
+            )
+            self._conn.executemany(
+                f"INSERT INTO messages (conf_uid, history_uid, {_MESSAGE_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (conf_uid, history_uid, *_message_values(message))
+                    for message in messages
+                ],
+            )
+
+    def iter_messages(
+        self, conf_uid: str, history_uid: str
+    ) -> Iterator[HistoryMessage]:
+        # Fetch in batches so the lock is not held while the caller consumes them
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, {_MESSAGE_COLUMNS} FROM messages "
+                    "WHERE conf_uid = ? AND history_uid = ? AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (conf_uid, history_uid, last_id, _ITER_BATCH_SIZE),
+                ).fetchall()
+            for row in rows:
+                yield _row_to_message(row)
+            if len(rows) < _ITER_BATCH_SIZE:
+                return
+            last_id = rows[-1]["id"]
+
+    def get_messages(
+        self, conf_uid: str, history_uid: str, start: int, end: int
+    ) -> List[HistoryMessage]:
+        if end <= start:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM messages "
+                "WHERE conf_uid = ? AND history_uid = ? ORDER BY id LIMIT ? OFFSET ?",
+                (conf_uid, history_uid, end - start, start),
+            ).fetchall()
+        return [_row_to_message(row) for row in rows]
+
+    def count_messages(self, conf_uid: str, history_uid: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            ).fetchone()
+        return row[0]
+
+    def history_version(self, conf_uid: str, history_uid: str) -> str:
+        # Ids only grow, and the latest one is read from the index
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM messages WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            ).fetchone()
+        return str(row[0] or 0)
+
+    def history_exists(self, conf_uid: str, history_uid: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM histories WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            ).fetchone()
+        return row is not None
+
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM histories WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            ).fetchone()
+        if row is None or not row["metadata"]:
+            return {}
+        return json.loads(row["metadata"])
+
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE histories SET metadata = ? WHERE conf_uid = ? AND history_uid = ?",
+                (json.dumps(metadata, ensure_ascii=False), conf_uid, history_uid),
+            )
+
+    def get_latest_message(
+        self, conf_uid: str, history_uid: str
+    ) -> Optional[HistoryMessage]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM messages "
+                "WHERE conf_uid = ? AND history_uid = ? ORDER BY id DESC LIMIT 1",
+                (conf_uid, history_uid),
+            ).fetchone()
+        return _row_to_message(row) if row is not None else None
+
+    def replace_latest_message(
+        self, conf_uid: str, history_uid: str, message: dict
+    ) -> None:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE messages SET role = ?, timestamp = ?, content = ?, name = ?, avatar = ? "
+                "WHERE id = (SELECT MAX(id) FROM messages WHERE conf_uid = ? AND history_uid = ?)",
+                (*_message_values(message), conf_uid, history_uid),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError("History is empty")
+
+    def delete_history(self, conf_uid: str, history_uid: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM messages WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM histories WHERE conf_uid = ? AND history_uid = ?",
+                (conf_uid, history_uid),
+            )
+        return cursor.rowcount > 0
+
+    def rename_history(
+        self, conf_uid: str, old_history_uid: str, new_history_uid: str
+    ) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE histories SET history_uid = ? WHERE conf_uid = ? AND history_uid = ?",
+                (new_history_uid, conf_uid, old_history_uid),
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._conn.execute(
+                "UPDATE messages SET history_uid = ? WHERE conf_uid = ? AND history_uid = ?",
+                (new_history_uid, conf_uid, old_history_uid),
+            )
+        return True
+
+    def list_history_uids(self, conf_uid: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT history_uid FROM histories WHERE conf_uid = ?", (conf_uid,)
+            ).fetchall()
+        return [row["history_uid"] for row in rows]
+
+    def list_conf_uids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT conf_uid FROM histories"
+            ).fetchall()
+        return [row["conf_uid"] for row in rows]
+
+    def list_histories(self, conf_uid: str) -> List[dict]:
+        # The latest message of each history is found through the index
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT h.history_uid, m.id, m.role, m.timestamp, m.content, m.name, m.avatar "
+                "FROM histories h LEFT JOIN messages m ON m.id = ("
+                "    SELECT MAX(id) FROM messages "
+                "    WHERE conf_uid = h.conf_uid AND history_uid = h.history_uid"
+                ") WHERE h.conf_uid = ?",
+                (conf_uid,),
+            ).fetchall()
+        return [
+            {
+                "uid": row["history_uid"],
+                "latest_message": (
+                    _row_to_message(row) if row["id"] is not None else None
+                ),
+            }
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,9 @@
+import os
+import copy
 import json
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
 import chardet
 from loguru import logger
 
@@ -14,15 +19,15 @@ class Live2dModel:
     Attributes:
         model_dict_path (str): The path to the model dictionary file.
         live2d_model_name (str): The name of the Live2D model.
-        model_info (dict): The information of the Live2D model.
-        emo_map (dict): The emotion map of the Live2D model.
+        model_info (dict): The information of the Live2D model. A copy is returned
+            on each access, so callers cannot change a shared model.
+        emo_map (Mapping): The read-only emotion map of the Live2D model.
         emo_str (str): The string representation of the emotion map of the Live2D model.
     """
 
     model_dict_path: str
     live2d_model_name: str
-    model_info: dict
-    emo_map: dict
+    emo_map: Mapping[str, int]
     emo_str: str
 
     def __init__(
@@ -32,6 +37,21 @@ class Live2dModel:
         self.live2d_model_name: str = live2d_model_name
         self.set_model(live2d_model_name)
 
+    def __setattr__(self, name, value) -> None:
+        # Instances handed out by the registry are shared between sessions,
+        # so they are frozen once constructed.
+        if getattr(self, "_frozen", False):
+            raise AttributeError(
+                f"Live2dModel '{self.live2d_model_name}' is shared and read-only. "
+                "Use model_registry.get_model() to get another model."
+            )
+        super().__setattr__(name, value)
+
+    @property
+    def model_info(self) -> dict:
+        """The information of the Live2D model, as a copy the caller may change."""
+        return copy.deepcopy(self._model_info)
+
     def set_model(self, model_name: str) -> None:
         """
         Set the model with its name and load the model information. This method will initialize the `self.model_info`, `self.emo_map`, and `self.emo_str` attributes.
@@ -44,46 +64,23 @@ class Live2dModel:
             None
         """
 
-        self.model_info: dict = self._lookup_model_info(model_name)
-        self.emo_map: dict = {
-            k.lower(): v for k, v in self.model_info["emotionMap"].items()
-        }
+        self._model_info: dict = self._lookup_model_info(model_name)
+        self.emo_map: Mapping[str, int] = MappingProxyType(
+            {k.lower(): v for k, v in self._model_info["emotionMap"].items()}
+        )
         self.emo_str: str = " ".join([f"[{key}]," for key in self.emo_map.keys()])
         # emo_str is a string of the keys in the emoMap dictionary. The keys are enclosed in square brackets.
         # example: `"[fear], [anger], [disgust], [sadness], [joy], [neutral], [surprise]"`
 
     def _load_file_content(self, file_path: str) -> str:
         """Load the content of a file with robust encoding handling."""
-        # Try common encodings first
-        encodings = ["utf-8", "utf-8-sig", "gbk", "gb2312", "ascii"]
-
-        for encoding in encodings:
-            try:
-                with open(file_path, "r", encoding=encoding) as file:
-                    return file.read()
-            except UnicodeDecodeError:
-                continue
-
-        # If all common encodings fail, try to detect encoding
-        try:
-            with open(file_path, "rb") as file:
-                raw_data = file.read()
-            detected = chardet.detect(raw_data)
-            detected_encoding = detected["encoding"]
-
-            if detected_encoding:
-                try:
-                    return raw_data.decode(detected_encoding)
-                except UnicodeDecodeError:
-                    pass
-        except Exception as e:
-            logger.error(f"Error detecting encoding for {file_path}: {e}")
-
-        raise UnicodeError(f"Failed to decode {file_path} with any encoding")
+        return load_file_content(file_path)
 
     def _lookup_model_info(self, model_name: str) -> dict:
         """
         Find the model information from the model dictionary and return the information about the matched model.
+        The model dictionary is parsed through the process-wide `model_registry`,
+        so repeated lookups do not hit the disk unless the file has changed.
 
         Parameters:
             model_name (str): The name of the live2d model.
@@ -102,40 +99,7 @@ class Live2dModel:
 
         self.live2d_model_name = model_name
 
-        try:
-            file_content = self._load_file_content(self.model_dict_path)
-            model_dict = json.loads(file_content)
-        except FileNotFoundError as file_e:
-            logger.critical(
-                f"Model dictionary file not found at {self.model_dict_path}."
-            )
-            raise file_e
-        except json.JSONDecodeError as json_e:
-            logger.critical(
-                f"Error decoding JSON from model dictionary file at {self.model_dict_path}."
-            )
-            raise json_e
-        except UnicodeError as uni_e:
-            logger.critical(
-                f"Error reading model dictionary file at {self.model_dict_path}."
-            )
-            raise uni_e
-        except Exception as e:
-            logger.critical(
-                f"Error occurred while reading model dictionary file at {self.model_dict_path}."
-            )
-            raise e
-
-        # Find the model in the model_dict
-        matched_model = next(
-            (model for model in model_dict if model["name"] == model_name), None
-        )
-
-        if matched_model is None:
-            logger.critical(f"Unable to find {model_name} in {self.model_dict_path}.")
-            raise KeyError(
-                f"{model_name} not found in model dictionary {self.model_dict_path}."
-            )
+        matched_model = model_registry.get_model_info(model_name, self.model_dict_path)
 
         # The feature: "translate model url to full url if it starts with '/' " is no longer implemented here
 
@@ -192,3 +156,157 @@ class Live2dModel:
                 target_str = target_str[:start_index] + target_str[end_index:]
                 lower_str = lower_str[:start_index] + lower_str[end_index:]
         return target_str
+
+
+def load_file_content(file_path: str) -> str:
+    """Load the content of a file with robust encoding handling."""
+    # Try common encodings first
+    encodings = ["utf-8", "utf-8-sig", "gbk", "gb2312", "ascii"]
+
+    for encoding in encodings:
+        try:
+            with open(file_path, "r", encoding=encoding) as file:
+                return file.read()
+        except UnicodeDecodeError:
+            continue
+
+    # If all common encodings fail, try to detect encoding
+    try:
+        with open(file_path, "rb") as file:
+            raw_data = file.read()
+        detected = chardet.detect(raw_data)
+        detected_encoding = detected["encoding"]
+
+        if detected_encoding:
+            try:
+                return raw_data.decode(detected_encoding)
+            except UnicodeDecodeError:
+                pass
+    except Exception as e:
+        logger.error(f"Error detecting encoding for {file_path}: {e}")
+
+    raise UnicodeError(f"Failed to decode {file_path} with any encoding")
+
+
+class Live2dModelRegistry:
+    """
+    Process-wide cache of parsed model dictionaries and shared `Live2dModel` instances.
+
+    Each model dictionary file is parsed once and indexed by model name. The file is
+    only re-read when its modification time changes, and `Live2dModel` instances are
+    shared (read-only) between every session that asks for the same model.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # model_dict_path -> (mtime, {model name: model info})
+        self._indexes: Dict[str, Tuple[float, Dict[str, dict]]] = {}
+        # (model_dict_path, model name) -> (mtime, model)
+        self._models: Dict[Tuple[str, str], Tuple[float, Live2dModel]] = {}
+
+    def _get_index(self, model_dict_path: str) -> Tuple[float, Dict[str, dict]]:
+        """
+        Return the (mtime, name index) of a model dictionary, reloading it only if the
+        file changed on disk since the last parse.
+
+        Raises:
+            FileNotFoundError, json.JSONDecodeError, UnicodeError: If the model
+            dictionary cannot be read.
+        """
+        try:
+            mtime = os.path.getmtime(model_dict_path)
+        except FileNotFoundError as file_e:
+            logger.critical(f"Model dictionary file not found at {model_dict_path}.")
+            raise file_e
+
+        with self._lock:
+            cached = self._indexes.get(model_dict_path)
+            if cached and cached[0] == mtime:
+                return cached
+
+            try:
+                model_dict = json.loads(load_file_content(model_dict_path))
+            except FileNotFoundError as file_e:
+                logger.critical(
+                    f"Model dictionary file not found at {model_dict_path}."
+                )
+                raise file_e
+            except json.JSONDecodeError as json_e:
+                logger.critical(
+                    f"Error decoding JSON from model dictionary file at {model_dict_path}."
+                )
+                raise json_e
+            except UnicodeError as uni_e:
+                logger.critical(
+                    f"Error reading model dictionary file at {model_dict_path}."
+                )
+                raise uni_e
+            except Exception as e:
+                logger.critical(
+                    f"Error occurred while reading model dictionary file at {model_dict_path}."
+                )
+                raise e
+
+            # Keep the first entry for duplicated names, same as the linear scan did
+            index: Dict[str, dict] = {}
+            for model in model_dict:
+                index.setdefault(model["name"], model)
+
+            logger.debug(f"Parsed {len(index)} models from {model_dict_path}")
+            self._indexes[model_dict_path] = (mtime, index)
+            # Models built from a stale dictionary must not be handed out again
+            self._models = {
+                key: value
+                for key, value in self._models.items()
+                if key[0] != model_dict_path
+            }
+            return mtime, index
+
+    def get_model_info(
+        self, model_name: str, model_dict_path: str = "model_dict.json"
+    ) -> dict:
+        """
+        Look up the information of a model by name. The result is a copy, so
+        changing it does not affect the cached dictionary.
+
+        Raises:
+            KeyError: If the model name is not found in the model dictionary.
+        """
+        _, index = self._get_index(model_dict_path)
+        model_info = index.get(model_name)
+        if model_info is None:
+            logger.critical(f"Unable to find {model_name} in {model_dict_path}.")
+            raise KeyError(
+                f"{model_name} not found in model dictionary {model_dict_path}."
+            )
+        return copy.deepcopy(model_info)
+
+    def get_model(
+        self, model_name: str, model_dict_path: str = "model_dict.json"
+    ) -> Live2dModel:
+        """
+        Get the shared, read-only `Live2dModel` for a model name.
+
+        Raises:
+            KeyError: If the model name is not found in the model dictionary.
+        """
+        mtime, _ = self._get_index(model_dict_path)
+        key = (model_dict_path, model_name)
+        with self._lock:
+            cached = self._models.get(key)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+            model = Live2dModel(model_name, model_dict_path)
+            model._frozen = True
+            self._models[key] = (mtime, model)
+            return model
+
+    def clear(self) -> None:
+        """Drop every cached model dictionary and model instance."""
+        with self._lock:
+            self._indexes.clear()
+            self._models.clear()
+
+
+model_registry = Live2dModelRegistry()
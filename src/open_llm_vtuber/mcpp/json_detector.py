@@ -1,16 +1,31 @@
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import re
+from typing import List, Dict, Any
 from loguru import logger
 
+# Characters that change the state outside and inside of JSON strings
+_STRUCTURAL_CHARS = re.compile(r'[{}"]')
+_STRING_CHARS = re.compile(r'["\\]')
+_NON_WHITESPACE = re.compile(r"\S")
+
 
 class StreamJSONDetector:
-    """Detector for real-time JSON detection in streaming text."""
+    """Detector for real-time JSON detection in streaming text.
+
+    The text is scanned incrementally: the brace depth and the string and escape
+    state are kept between chunks, so each character is looked at once, and a
+    top-level object is parsed the moment its closing brace arrives. Braces
+    inside JSON strings are ignored. A `{` that is not followed by `"` or `}`
+    cannot start a JSON object and is treated as plain text.
+    """
 
     def __init__(self):
-        self.buffer = ""  # Store text that has not been fully processed
-        self.potential_jsons = []  # Store possible JSON starting positions
         self.completed_jsons = []  # Store completed JSON objects
-        self.processed_ranges = []  # Store processed intervals [start, end]
+        self._parts: List[str] = []  # Text of the open object from earlier chunks
+        self._depth = 0  # Open braces of the current object
+        self._in_string = False
+        self._escaped = False  # The previous chunk ended with a backslash in a string
+        self._opened = False  # An object was opened and its first token is pending
 
     def process_chunk(self, chunk: str) -> List[Dict[str, Any]]:
         """Process a single text chunk, return a list of complete JSON objects found in this chunk.
@@ -21,104 +36,80 @@ class StreamJSONDetector:
         Returns:
             List[Dict[str, Any]]: List of complete JSON objects parsed from the current chunk
         """
-        # Add new chunk to buffer
-        old_length = len(self.buffer)
-        self.buffer += chunk
-
-        # Update potential JSON starting positions
-        self._find_potential_starts(old_length)
-
-        # Try to parse potential JSON objects
-        new_jsons = self._try_parse_jsons()
-
-        return new_jsons
-
-    def _find_potential_starts(self, start_from: int) -> None:
-        """Find new potential JSON starting positions in the buffer.
-
-        Args:
-            start_from (int): Position to start searching from
-        """
-        for i in range(start_from, len(self.buffer)):
-            if self.buffer[i] == "{" and not self._is_in_processed_range(i):
-                self.potential_jsons.append(i)
-
-    def _is_in_processed_range(self, pos: int) -> bool:
-        """Check if a specified position is within a processed range.
-
-        Args:
-            pos (int): Position to check
-
-        Returns:
-            bool: True if position is within a processed range, otherwise False
-        """
-        for start, end in self.processed_ranges:
-            if start <= pos <= end:
-                return True
-        return False
-
-    def _try_parse_jsons(self) -> List[Dict[str, Any]]:
-        """Try to parse JSON objects from the current buffer.
-
-        Returns:
-            List[Dict[str, Any]]: List of newly parsed JSON objects
-        """
         new_jsons = []
-        remaining_potential = []
-
-        # Sort by starting position, process outermost JSON first
-        self.potential_jsons.sort()
-
-        for start_idx in self.potential_jsons:
-            # Skip if this position is already within a processed range
-            if self._is_in_processed_range(start_idx):
-                continue
-
-            result, end_idx = self._extract_json(start_idx)
-            if result is not None:
-                new_jsons.append(result)
-                # Mark this range as processed
-                self.processed_ranges.append((start_idx, end_idx))
-                self.completed_jsons.append(result)
+        # Start of the open object in this chunk; 0 if it began in an earlier one
+        start = 0
+        pos = 0
+        length = len(chunk)
+
+        while pos < length:
+            if self._depth == 0:
+                pos = chunk.find("{", pos)
+                if pos == -1:
+                    break
+                start = pos
+                self._depth = 1
+                self._opened = True
+                pos += 1
+            elif self._opened:
+                match = _NON_WHITESPACE.search(chunk, pos)
+                if not match:
+                    break
+                self._opened = False
+                if match.group() not in '"}':
+                    # Plain text like "{this}", look for the next brace from here
+                    self._depth = 0
+                    self._parts = []
+                pos = match.start()
+            elif self._escaped:
+                self._escaped = False
+                pos += 1
+            elif self._in_string:
+                match = _STRING_CHARS.search(chunk, pos)
+                if not match:
+                    break
+                if match.group() == '"':
+                    self._in_string = False
+                    pos = match.end()
+                elif match.end() < length:
+                    pos = match.end() + 1
+                else:
+                    self._escaped = True
+                    break
             else:
-                # This JSON may not be complete yet, keep it
-                remaining_potential.append(start_idx)
+                match = _STRUCTURAL_CHARS.search(chunk, pos)
+                if not match:
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        json_str = "".join(self._parts) + chunk[start:pos]
+                        self._parts = []
+                        result = self._parse_json(json_str)
+                        if result is not None:
+                            new_jsons.append(result)
+                            self.completed_jsons.append(result)
+
+        if self._depth > 0:
+            self._parts.append(chunk[start:])
 
-        self.potential_jsons = remaining_potential
         return new_jsons
 
-    def _extract_json(self, start_idx: int) -> Tuple[Optional[Dict[str, Any]], int]:
-        """Try to extract a complete JSON object from the given position.
-
-        Args:
-            start_idx (int): Potential starting position of JSON
-
-        Returns:
-            Tuple[Optional[Dict[str, Any]], int]: Parsed JSON object and ending position,
-                                               or (None, -1) if incomplete
-        """
-        stack = 1
-        i = start_idx + 1
-
-        while i < len(self.buffer) and stack > 0:
-            if self.buffer[i] == "{":
-                stack += 1
-            elif self.buffer[i] == "}":
-                stack -= 1
-            i += 1
-
-        # If complete JSON is found
-        if stack == 0:
-            json_str = self.buffer[start_idx:i]
-            try:
-                json_data = json.loads(json_str)
-                return json_data, i - 1
-            except json.JSONDecodeError:
-                logger.warning(
-                    f"JSON structure found but parsing failed: {json_str[:50]}..."
-                )
-
-        return None, -1
+    def _parse_json(self, json_str: str) -> Any:
+        """Parse a complete object, or return None if it is not valid JSON."""
+        try:
+            return json.loads(json_str)
+        except json.JSONDecodeError:
+            logger.warning(
+                f"JSON structure found but parsing failed: {json_str[:50]}..."
+            )
+            return None
 
     def get_all_jsons(self) -> List[Dict[str, Any]]:
         """Get all JSON objects parsed so far.
@@ -130,10 +121,12 @@ class StreamJSONDetector:
 
     def reset(self) -> None:
         """Reset detector state, prepare to process a new stream."""
-        self.buffer = ""
-        self.potential_jsons = []
         self.completed_jsons = []
-        self.processed_ranges = []
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._opened = False
 
 
 # Usage example
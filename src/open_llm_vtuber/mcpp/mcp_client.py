@@ -1,7 +1,6 @@
 """MCP Client for Open-LLM-Vtuber."""
 import json
 import os
-import asyncio
 from contextlib import AsyncExitStack
 from typing import Dict, Any, List, Callable
 from loguru import logger
@@ -15,7 +14,6 @@ from mcp.client.stdio import stdio_client
 
 from .server_registry import ServerRegistry
 from ..message_handler import message_handler
-from .async_utils import is_nest_asyncio_applied, run_in_thread_pool
 
 DEFAULT_TIMEOUT = timedelta(seconds=120)
 
@@ -125,22 +123,8 @@ class MCPClient:
         logger.info(f"🔧 MCPC: Starting tool call '{tool_name}' on server '{server_name}'")
         logger.info(f"📥 Tool arguments: {tool_args}")
         
-        # Check if we need to run in a separate thread due to nest_asyncio
-        if is_nest_asyncio_applied():
-            logger.info("Detected nest_asyncio environment, using thread pool execution")
-            
-            async def _call_tool_async():
-                return await self._call_tool_internal(server_name, tool_name, tool_args)
-            
-            # Run in thread pool to avoid nest_asyncio conflicts
-            result = await asyncio.get_event_loop().run_in_executor(
-                None, run_in_thread_pool, _call_tool_async()
-            )
-            return result
-        else:
-            # Normal async execution
-            return await self._call_tool_internal(server_name, tool_name, tool_args)
-    
+        return await self._call_tool_internal(server_name, tool_name, tool_args)
+
     async def _call_tool_internal(
         self, server_name: str, tool_name: str, tool_args: Dict[str, Any]
     ) -> Dict[str, Any]:
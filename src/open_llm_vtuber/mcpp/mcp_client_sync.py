@@ -1,4 +1,4 @@
-"""Synchronous wrapper for MCP Client to avoid nest_asyncio conflicts."""
+"""Synchronous wrapper that runs MCP Client on its own thread."""
 import asyncio
 import json
 import os
@@ -1,4 +1,4 @@
-"""Thread-safe wrapper for MCP Client to avoid nest_asyncio conflicts."""
+"""Thread-safe wrapper that runs MCP Client on its own thread and event loop."""
 import asyncio
 import threading
 import queue
@@ -0,0 +1,537 @@
+"""Process-wide pool of MCP server processes, shared by all MCP clients."""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .tool_cache import server_config_hash
+from .types import MCPServer
+
+# Timeout of requests without a more specific timeout, in seconds
+DEFAULT_REQUEST_TIMEOUT = 10.0
+# Time a server may take to start and initialize, unless configured, in seconds.
+# Generous because `npx`/`uvx` may download the server on a cold start.
+DEFAULT_STARTUP_TIMEOUT = 60.0
+# Maximum size of a single JSON-RPC message. Tool results may carry base64 images.
+STREAM_LIMIT = 32 * 1024 * 1024
+# Time a server keeps running after its last client released it, in seconds
+DEFAULT_IDLE_TTL = 300.0
+# Delay before restarting a crashed server, doubled on every further failure
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_MAX = 60.0
+# A server that ran this long before crashing starts over with the base delay
+STABLE_UPTIME = 60.0
+# Crashes restarted in the background in a row. After that, the server is only
+# restarted when it is used again.
+MAX_AUTO_RESTARTS = 5
+
+NotificationHandler = Callable[[str, str, dict], Awaitable[None]]
+
+
+def get_startup_timeout(server: Optional[MCPServer]) -> float:
+    """Return the time a server may take to start and initialize, in seconds."""
+    if server and server.startup_timeout:
+        return server.startup_timeout.total_seconds()
+    return DEFAULT_STARTUP_TIMEOUT
+
+
+class MCPServerConnection:
+    """A running MCP server process and its in-flight requests.
+
+    A single reader task dispatches responses to the waiting requests by
+    JSON-RPC id, so concurrent requests to the same server are safe and no
+    thread is blocked on a pipe.
+    """
+
+    def __init__(
+        self,
+        server_name: str,
+        proc: asyncio.subprocess.Process,
+        on_notification: Optional[NotificationHandler] = None,
+        on_exit: Optional[Callable[["MCPServerConnection"], None]] = None,
+    ):
+        self.server_name = server_name
+        self.proc = proc
+        self.loop = asyncio.get_running_loop()
+        self.started_at = time.monotonic()
+        # Futures of the requests waiting for a response, by JSON-RPC id
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.write_lock = asyncio.Lock()
+        self.reader_task: Optional[asyncio.Task] = None
+        self.stderr_task: Optional[asyncio.Task] = None
+        # Set by `close`, so an exit we asked for is not reported as a crash
+        self.closing = False
+        self._on_notification = on_notification
+        self._on_exit = on_exit
+
+    @classmethod
+    async def start(
+        cls,
+        server: MCPServer,
+        on_notification: Optional[NotificationHandler] = None,
+        on_exit: Optional[Callable[["MCPServerConnection"], None]] = None,
+    ) -> "MCPServerConnection":
+        """Start a server process and its reader tasks."""
+        logger.info(f"Starting MCP server '{server.name}'...")
+
+        # Prepare environment
+        env = os.environ.copy()
+        if server.env:
+            env.update(server.env)
+
+        proc = await asyncio.create_subprocess_exec(
+            server.command,
+            *server.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            limit=STREAM_LIMIT,
+        )
+
+        conn = cls(server.name, proc, on_notification=on_notification, on_exit=on_exit)
+        conn.reader_task = asyncio.create_task(conn._read_messages())
+        # An undrained stderr pipe blocks the server once the pipe buffer is full
+        conn.stderr_task = asyncio.create_task(conn._drain_stderr())
+        return conn
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None and not (
+            self.reader_task and self.reader_task.done()
+        )
+
+    def fail_pending(self, error: Exception) -> None:
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+    async def initialize(self, timeout: float = DEFAULT_STARTUP_TIMEOUT) -> None:
+        """Initialize the MCP server."""
+        response = await self.request(
+            "initialize",
+            {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "open-llm-vtuber", "version": "1.0"},
+            },
+            timeout=timeout,
+        )
+        if "error" in response:
+            raise RuntimeError(f"Failed to initialize server: {response['error']}")
+
+        await self.notify("notifications/initialized")
+        logger.info(f"Server '{self.server_name}' initialized successfully")
+
+    async def _write_message(self, message: dict) -> None:
+        """Write one JSON-RPC message to the server's stdin."""
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        async with self.write_lock:
+            self.proc.stdin.write(data)
+            await self.proc.stdin.drain()
+
+    async def request(
+        self,
+        method: str,
+        params: Optional[dict] = None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    ) -> dict:
+        """Send a JSON-RPC request and wait for the response with the same id."""
+        request_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self._write_message(
+                {
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "params": params or {},
+                    "id": request_id,
+                },
+            )
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Request timed out after {timeout}s")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise RuntimeError(f"MCP server '{self.server_name}' is not running: {e}")
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: Optional[dict] = None) -> None:
+        """Send a JSON-RPC notification (a message without id)."""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._write_message(message)
+
+    async def _read_messages(self) -> None:
+        """Read messages from the server and dispatch them until it exits."""
+        error: Exception = RuntimeError(f"MCP server '{self.server_name}' exited")
+        cancelled = False
+        try:
+            while True:
+                line = await self.proc.stdout.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    # Servers sometimes print logs to stdout
+                    logger.debug(
+                        f"MCP server '{self.server_name}' printed non-JSON output: {line[:200]!r}"
+                    )
+                    continue
+                if isinstance(message, dict):
+                    await self._dispatch_message(message)
+        except asyncio.CancelledError:
+            error = RuntimeError(
+                f"Connection to MCP server '{self.server_name}' closed"
+            )
+            cancelled = True
+            raise
+        except Exception as e:
+            logger.error(f"Error reading from MCP server '{self.server_name}': {e}")
+            error = RuntimeError(
+                f"Error reading from MCP server '{self.server_name}': {e}"
+            )
+        finally:
+            self.fail_pending(error)
+            if not (self.closing or cancelled) and self._on_exit:
+                self._on_exit(self)
+
+    async def _dispatch_message(self, message: dict) -> None:
+        """Route a message to its pending request, or handle a server message."""
+        message_id = message.get("id")
+        method = message.get("method")
+
+        if method is None:
+            # A response to one of our requests
+            future = (
+                self.pending.get(str(message_id)) if message_id is not None else None
+            )
+            if future and not future.done():
+                future.set_result(message)
+            else:
+                logger.debug(
+                    f"Dropping response with unknown id from '{self.server_name}': {message_id}"
+                )
+        elif message_id is None:
+            if self._on_notification:
+                await self._on_notification(
+                    self.server_name, method, message.get("params") or {}
+                )
+        else:
+            await self._handle_server_request(message_id, method)
+
+    async def _handle_server_request(self, message_id: Any, method: str) -> None:
+        """Answer requests sent by the server. Only `ping` is supported."""
+        if method == "ping":
+            response = {"jsonrpc": "2.0", "id": message_id, "result": {}}
+        else:
+            logger.debug(f"Unsupported request from '{self.server_name}': {method}")
+            response = {
+                "jsonrpc": "2.0",
+                "id": message_id,
+                "error": {"code": -32601, "message": f"Method not found: {method}"},
+            }
+        try:
+            await self._write_message(response)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    async def _drain_stderr(self) -> None:
+        """Forward the server's stderr to the debug log."""
+        try:
+            while True:
+                line = await self.proc.stderr.readline()
+                if not line:
+                    break
+                logger.debug(
+                    f"[{self.server_name}] {line.decode('utf-8', errors='replace').rstrip()}"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """Stop the server process and its reader tasks."""
+        self.closing = True
+        same_loop = self.loop is asyncio.get_running_loop()
+        if self.proc.returncode is None:
+            try:
+                self.proc.terminate()
+            except ProcessLookupError:
+                pass
+            if same_loop:
+                try:
+                    await asyncio.wait_for(self.proc.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    self.proc.kill()
+        for task in (self.reader_task, self.stderr_task):
+            if task and not task.done() and same_loop:
+                task.cancel()
+        self.fail_pending(
+            RuntimeError(f"Connection to MCP server '{self.server_name}' closed")
+        )
+
+
+class _PoolEntry:
+    """A server config in the pool: its process, references and restart state."""
+
+    def __init__(self, server: MCPServer):
+        self.server = server
+        self.conn: Optional[MCPServerConnection] = None
+        self.refs = 0
+        # Notification handlers of the clients holding a lease
+        self.handlers: List[NotificationHandler] = []
+        self.failures = 0
+        # time.monotonic() before which the server is not restarted
+        self.restart_at = 0.0
+        self.idle_handle: Optional[asyncio.TimerHandle] = None
+        self.restart_handle: Optional[asyncio.TimerHandle] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # A lock can only be used on one event loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def cancel_timers(self) -> None:
+        for handle in (self.idle_handle, self.restart_handle):
+            if handle:
+                handle.cancel()
+        self.idle_handle = None
+        self.restart_handle = None
+
+
+class MCPServerLease:
+    """A client's reference to a pooled server. Release it when done."""
+
+    def __init__(
+        self,
+        pool: "MCPServerPool",
+        key: str,
+        handler: Optional[NotificationHandler] = None,
+    ):
+        self._pool = pool
+        self.key = key
+        self._handler = handler
+        self.released = False
+
+    async def connection(self) -> MCPServerConnection:
+        """Return the running server, starting or restarting it if needed."""
+        if self.released:
+            raise RuntimeError("MCP server lease was already released")
+        return await self._pool.get_connection(self.key)
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self._pool.release(self.key, self._handler)
+
+
+class MCPServerPool:
+    """Runs each MCP server config once per process and shares it between clients.
+
+    Servers are reference-counted by `server_config_hash`, so every agent (and
+    every config switch) with the same server config uses the same process.
+    A server nobody references is stopped after `idle_ttl` seconds, and one that
+    crashes while referenced is restarted in the background with exponential
+    backoff.
+    """
+
+    def __init__(self, idle_ttl: float = DEFAULT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._entries: Dict[str, _PoolEntry] = {}
+        self._background_tasks: set = set()
+
+    def acquire(
+        self, server: MCPServer, handler: Optional[NotificationHandler] = None
+    ) -> MCPServerLease:
+        """Take a reference to a server. It is started on first use of the lease.
+
+        Args:
+            server: Server config
+            handler: Coroutine function called with `(server_name, method,
+                params)` for the server's notifications while the lease is held
+        """
+        key = server_config_hash(server)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _PoolEntry(server)
+        entry.refs += 1
+        if entry.idle_handle:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+        if handler:
+            entry.handlers.append(handler)
+        return MCPServerLease(self, key, handler)
+
+    def release(self, key: str, handler: Optional[NotificationHandler] = None) -> None:
+        """Drop a reference taken by `acquire`; prefer `MCPServerLease.release`."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.refs = max(entry.refs - 1, 0)
+        if handler in entry.handlers:
+            entry.handlers.remove(handler)
+        if entry.refs > 0:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Nothing can be scheduled; the server is stopped by `shutdown`
+            return
+        logger.debug(
+            f"MCP server '{entry.server.name}' is unused, stopping it in {self.idle_ttl:g}s"
+        )
+        entry.idle_handle = loop.call_later(self.idle_ttl, self._stop_idle, key)
+
+    async def get_connection(self, key: str) -> MCPServerConnection:
+        entry = self._entries.get(key)
+        if entry is None:
+            raise RuntimeError("MCP server is not in the pool")
+
+        async with entry.lock:
+            conn = entry.conn
+            if conn is not None:
+                if conn.alive and conn.loop is asyncio.get_running_loop():
+                    return conn
+                # Process died, or it was started on another event loop whose
+                # pipes cannot be used from this one
+                logger.info(f"Restarting MCP server '{entry.server.name}'...")
+                entry.conn = None
+                await conn.close()
+
+            delay = entry.restart_at - time.monotonic()
+            if delay > 0:
+                raise RuntimeError(
+                    f"MCP server '{entry.server.name}' failed, retrying in {delay:.0f}s"
+                )
+
+            conn = None
+            try:
+                conn = await MCPServerConnection.start(
+                    entry.server,
+                    on_notification=lambda *args: self._dispatch_notification(
+                        entry, *args
+                    ),
+                    on_exit=lambda exited: self._on_exit(key, exited),
+                )
+                await conn.initialize(timeout=get_startup_timeout(entry.server))
+            except BaseException as e:
+                if conn is not None:
+                    await conn.close()
+                if not isinstance(e, asyncio.CancelledError):
+                    self._record_failure(entry)
+                raise
+            entry.conn = conn
+            return conn
+
+    def _record_failure(self, entry: _PoolEntry, uptime: float = 0.0) -> float:
+        """Count a failed start or a crash and return the delay before a restart."""
+        if uptime >= STABLE_UPTIME:
+            entry.failures = 0
+        entry.failures += 1
+        delay = min(
+            RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (entry.failures - 1)
+        )
+        entry.restart_at = time.monotonic() + delay
+        return delay
+
+    def _on_exit(self, key: str, conn: MCPServerConnection) -> None:
+        """Called when a server exits on its own."""
+        entry = self._entries.get(key)
+        if entry is None or entry.conn is not conn:
+            return
+        delay = self._record_failure(entry, uptime=time.monotonic() - conn.started_at)
+        logger.warning(f"MCP server '{conn.server_name}' exited unexpectedly")
+        self._schedule_restart(key, entry, delay)
+
+    def _schedule_restart(self, key: str, entry: _PoolEntry, delay: float) -> None:
+        if entry.refs == 0 or entry.failures > MAX_AUTO_RESTARTS:
+            return
+        logger.info(f"Restarting MCP server '{entry.server.name}' in {delay:g}s")
+        entry.restart_handle = asyncio.get_running_loop().call_later(
+            delay, lambda: self._spawn(self._restart(key))
+        )
+
+    async def _restart(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.restart_handle = None
+        if entry.refs == 0:
+            return
+        try:
+            await self.get_connection(key)
+        except Exception as e:
+            logger.error(f"Failed to restart MCP server '{entry.server.name}': {e}")
+            self._schedule_restart(
+                key, entry, max(entry.restart_at - time.monotonic(), 0)
+            )
+
+    def _stop_idle(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is None or entry.refs > 0:
+            return
+        del self._entries[key]
+        entry.cancel_timers()
+        if entry.conn is not None:
+            logger.info(f"Stopping idle MCP server '{entry.server.name}'")
+            self._spawn(entry.conn.close())
+
+    def _spawn(self, coro: Awaitable) -> None:
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _dispatch_notification(
+        self, entry: _PoolEntry, server_name: str, method: str, params: dict
+    ) -> None:
+        """Log a server notification and pass it to the clients holding a lease."""
+        if method == "notifications/message":
+            logger.info(
+                f"MCP server '{server_name}' [{params.get('level', 'info')}]: {params.get('data')}"
+            )
+        elif method == "notifications/tools/list_changed":
+            logger.info(f"MCP server '{server_name}' changed its tool list")
+        else:
+            logger.debug(f"Notification from MCP server '{server_name}': {method}")
+
+        for handler in list(entry.handlers):
+            await handler(server_name, method, params)
+
+    async def shutdown(self) -> None:
+        """Stop all servers, whether referenced or not."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.cancel_timers()
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(
+            *(entry.conn.close() for entry in entries if entry.conn is not None),
+            return_exceptions=True,
+        )
+        logger.info("MCP server pool shut down")
+
+
+# Shared by every MCP client of the process
+mcp_server_pool = MCPServerPool()
@@ -4,13 +4,16 @@ import shutil
 import json
 
 from pathlib import Path
+from datetime import timedelta
 from typing import Dict, Optional, Union, Any
 from loguru import logger
 
-from .types import MCPServer
+from .types import MCPServer, ResultCacheConfig
 from .utils.path import validate_file
 
 DEFAULT_CONFIG_PATH = "mcp_servers.json"
+# Result cache TTL when `result_cache` gives none, in seconds
+DEFAULT_RESULT_CACHE_TTL = 300
 
 
 class ServerRegistry:
@@ -92,15 +95,94 @@ class ServerRegistry:
                     from datetime import timedelta
                     timeout = timedelta(seconds=timeout_seconds)
             
+            startup_timeout = None
+            if isinstance(server_details.get("startup_timeout"), (int, float)):
+                from datetime import timedelta
+                startup_timeout = timedelta(seconds=server_details["startup_timeout"])
+
+            max_concurrency = server_details.get("max_concurrency", 1)
+            if not isinstance(max_concurrency, int) or max_concurrency < 1:
+                logger.warning(
+                    f"MCPSM: Invalid max_concurrency for '{server_name}'. Using 1."
+                )
+                max_concurrency = 1
+
+            result_cache = self._parse_result_cache(
+                server_name, server_details.get("result_cache")
+            )
+
             self.servers[server_name] = MCPServer(
                 name=server_name,
                 command=command,
                 args=server_details["args"],
                 env=server_details.get("env", None),
                 timeout=timeout,
+                max_concurrency=max_concurrency,
+                startup_timeout=startup_timeout,
+                result_cache=result_cache,
             )
             logger.debug(f"MCPSM: Loaded server: '{server_name}'.")
 
+    def _parse_result_cache(
+        self, server_name: str, cache_details: Any
+    ) -> Optional[ResultCacheConfig]:
+        """Parse the `result_cache` of a server.
+
+        Format: {"ttl": 600, "max_entries": 128, "ignore_args": [...],
+        "normalize_strings": true, "tools": {"tool_name": {"ttl": 60}, ...}}.
+        Without "tools", every tool of the server is cached. With it (a dict, or
+        a list of tool names), only the listed tools are, each with the server
+        settings updated by its own. A tool set to false is not cached.
+        """
+        if not cache_details:
+            return None
+        if cache_details is True:
+            cache_details = {}
+        if not isinstance(cache_details, dict):
+            logger.warning(
+                f"MCPSM: Invalid result_cache for '{server_name}'. Result cache disabled."
+            )
+            return None
+
+        def parse(details: Dict[str, Any], base: Dict[str, Any]) -> ResultCacheConfig:
+            settings = {**base, **details}
+            ttl = settings.get("ttl", DEFAULT_RESULT_CACHE_TTL)
+            if not isinstance(ttl, (int, float)) or ttl <= 0:
+                logger.warning(
+                    f"MCPSM: Invalid result_cache ttl for '{server_name}'. "
+                    f"Using {DEFAULT_RESULT_CACHE_TTL}s."
+                )
+                ttl = DEFAULT_RESULT_CACHE_TTL
+            max_entries = settings.get("max_entries", 128)
+            if not isinstance(max_entries, int) or max_entries < 1:
+                logger.warning(
+                    f"MCPSM: Invalid result_cache max_entries for '{server_name}'. Using 128."
+                )
+                max_entries = 128
+            return ResultCacheConfig(
+                ttl=timedelta(seconds=ttl),
+                max_entries=max_entries,
+                ignore_args=list(settings.get("ignore_args", [])),
+                normalize_strings=bool(settings.get("normalize_strings", False)),
+            )
+
+        base = {key: value for key, value in cache_details.items() if key != "tools"}
+        config = parse({}, base)
+        tools_details = cache_details.get("tools")
+        if isinstance(tools_details, list):
+            tools_details = {tool_name: {} for tool_name in tools_details}
+        if isinstance(tools_details, dict):
+            config.tools = {}
+            for tool_name, details in tools_details.items():
+                if details is False or details is None:
+                    # Listed to document that the tool must not be cached
+                    config.tools[tool_name] = None
+                else:
+                    config.tools[tool_name] = parse(
+                        details if isinstance(details, dict) else {}, base
+                    )
+        return config
+
     def remove_server(self, server_name: str) -> None:
         """Remove a server from the available servers."""
         try:
@@ -1,168 +1,216 @@
-"""Direct subprocess MCP client that bypasses SDK issues with nest_asyncio."""
+"""MCP client that talks JSON-RPC to the server subprocesses directly."""
 import asyncio
-import json
-import os
-import subprocess
 from typing import Dict, Any, List, Optional, Callable
 from loguru import logger
-from datetime import timedelta
-import uuid
 
 from .server_registry import ServerRegistry
+from .server_pool import (
+    DEFAULT_REQUEST_TIMEOUT,
+    MCPServerConnection,
+    MCPServerLease,
+    MCPServerPool,
+    get_startup_timeout,
+    mcp_server_pool,
+)
+from .tool_cache import ToolSchemaCache
 
 
 class SubprocessMCPClient:
-    """MCP Client that directly manages subprocess communication."""
-    
-    def __init__(self, server_registry: ServerRegistry, send_text: Callable = None, client_uid: str = None):
-        """Initialize the subprocess MCP client."""
+    """MCP Client that talks to MCP server subprocesses over stdio.
+
+    The processes belong to a `MCPServerPool` (the process-wide one by default),
+    so clients with the same server config share one process. The client holds a
+    lease on each server it used; `release` or `aclose` returns them.
+    """
+
+    def __init__(
+        self,
+        server_registry: ServerRegistry,
+        send_text: Callable = None,
+        client_uid: str = None,
+        tool_cache: Optional[ToolSchemaCache] = None,
+        server_pool: Optional[MCPServerPool] = None,
+    ):
+        """Initialize the subprocess MCP client.
+
+        With a `tool_cache`, listed tools are stored on disk, and tools served from
+        the cache are checked against the server once it is started.
+        """
         self.server_registry = server_registry
+        self._tool_cache = tool_cache
+        self._server_pool = server_pool or mcp_server_pool
+        # Servers whose tools came from the cache and were not checked yet
+        self._unverified_cached_servers: set = set()
+        self._background_tasks: set = set()
         self._send_text = send_text
         self._client_uid = client_uid
-        self._processes: Dict[str, subprocess.Popen] = {}
-        self._initialized_servers: set = set()
+        self._leases: Dict[str, MCPServerLease] = {}
+        # Callbacks for server notifications, by method
+        self._notification_handlers: Dict[str, List[Callable[[str, dict], Any]]] = {}
         logger.info("SubprocessMCPClient: Initialized")
-    
-    async def _ensure_server_running(self, server_name: str) -> subprocess.Popen:
-        """Ensure server is running and return the process."""
-        if server_name in self._processes:
-            proc = self._processes[server_name]
-            if proc.poll() is None:  # Still running
-                return proc
-            else:
-                # Process died, remove it
-                del self._processes[server_name]
-                self._initialized_servers.discard(server_name)
-        
-        logger.info(f"Starting MCP server '{server_name}'...")
-        server = self.server_registry.get_server(server_name)
-        if not server:
-            raise ValueError(f"Server '{server_name}' not found")
-        
-        # Prepare environment
-        env = os.environ.copy()
-        if server.env:
-            env.update(server.env)
-        
-        # Start subprocess
-        cmd = [server.command] + server.args
-        proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=env,
-            text=True,
-            bufsize=1  # Line buffered
-        )
-        
-        self._processes[server_name] = proc
-        
-        # Initialize if needed
-        if server_name not in self._initialized_servers:
-            await self._initialize_server(server_name, proc)
-            self._initialized_servers.add(server_name)
-        
-        return proc
-    
-    async def _initialize_server(self, server_name: str, proc: subprocess.Popen):
-        """Initialize the MCP server."""
-        # Send initialize request
-        request = {
-            "jsonrpc": "2.0",
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "open-llm-vtuber",
-                    "version": "1.0"
-                }
-            },
-            "id": str(uuid.uuid4())
-        }
-        
-        response = await self._send_request(proc, request)
-        if "error" in response:
-            raise RuntimeError(f"Failed to initialize server: {response['error']}")
-        
-        logger.info(f"Server '{server_name}' initialized successfully")
-    
-    async def _send_request(self, proc: subprocess.Popen, request: dict, timeout: float = 10.0) -> dict:
-        """Send a JSON-RPC request and get response."""
-        # Send request
-        request_str = json.dumps(request) + "\n"
-        proc.stdin.write(request_str)
-        proc.stdin.flush()
-        
-        # Read response with timeout
-        try:
-            # Use asyncio to read with timeout
-            response_line = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, proc.stdout.readline),
-                timeout=timeout
-            )
-            
-            if not response_line:
-                raise RuntimeError("No response from server")
-            
-            return json.loads(response_line)
-        except asyncio.TimeoutError:
-            raise TimeoutError(f"Request timed out after {timeout}s")
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Invalid JSON response: {e}")
-    
+
+    def add_notification_handler(
+        self, method: str, handler: Callable[[str, dict], Any]
+    ) -> None:
+        """Call `handler(server_name, params)` when a server sends a notification.
+
+        Args:
+            method: Notification method, e.g. "notifications/tools/list_changed"
+            handler: Plain function or coroutine function
+        """
+        self._notification_handlers.setdefault(method, []).append(handler)
+
+    async def _ensure_server_running(self, server_name: str) -> MCPServerConnection:
+        """Ensure server is running and return its connection."""
+        lease = self._leases.get(server_name)
+        if lease is None:
+            server = self.server_registry.get_server(server_name)
+            if not server:
+                raise ValueError(f"Server '{server_name}' not found")
+            lease = self._server_pool.acquire(server, self._handle_notification)
+            self._leases[server_name] = lease
+
+        conn = await lease.connection()
+        if server_name in self._unverified_cached_servers:
+            # Check the cached tools now that the server runs anyway
+            self._unverified_cached_servers.discard(server_name)
+            task = asyncio.create_task(self._revalidate_cached_tools(server_name))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return conn
+
+    def _startup_timeout(self, server_name: str) -> float:
+        """Return the time a server may take to start and initialize, in seconds."""
+        return get_startup_timeout(self.server_registry.get_server(server_name))
+
+    async def _handle_notification(self, server_name: str, method: str, params: dict) -> None:
+        """Call the handlers registered for a server notification."""
+        for handler in self._notification_handlers.get(method, []):
+            try:
+                result = handler(server_name, params)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error in MCP notification handler for '{method}': {e}")
+
     async def list_tools(self, server_name: str) -> List[Dict[str, Any]]:
         """List tools from a server."""
-        proc = await self._ensure_server_running(server_name)
-        
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "params": {},
-            "id": str(uuid.uuid4())
-        }
-        
-        response = await self._send_request(proc, request)
-        
+        tools = await self._request_tools(server_name)
+        await self._store_tools(server_name, tools)
+        return tools
+
+    async def _request_tools(self, server_name: str) -> List[Dict[str, Any]]:
+        conn = await self._ensure_server_running(server_name)
+
+        response = await conn.request("tools/list")
+
         if "error" in response:
             raise RuntimeError(f"Error listing tools: {response['error']}")
-        
+
         # Convert to expected format
-        tools = response.get("result", {}).get("tools", [])
-        return tools
-    
+        return response.get("result", {}).get("tools", [])
+
+    async def _store_tools(self, server_name: str, tools: List[Dict[str, Any]]) -> bool:
+        """Write the tools of a server to the tool cache, return whether they changed."""
+        server = self.server_registry.get_server(server_name)
+        if not self._tool_cache or not server:
+            return False
+        return await asyncio.to_thread(self._tool_cache.set, server, tools)
+
+    def get_cached_tools(self, server_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the cached tools of servers, without starting them.
+
+        The cached tools of a server are checked (and the cache updated) when the
+        server is started for the first time.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Tools by server name, only for the
+            servers with a valid cache entry.
+        """
+        if not self._tool_cache:
+            return {}
+        tools_by_server = {}
+        for server_name in server_names:
+            server = self.server_registry.get_server(server_name)
+            tools = self._tool_cache.get(server) if server else None
+            if tools is not None:
+                tools_by_server[server_name] = tools
+                self._unverified_cached_servers.add(server_name)
+        return tools_by_server
+
+    async def _revalidate_cached_tools(self, server_name: str) -> None:
+        try:
+            tools = await self._request_tools(server_name)
+            if await self._store_tools(server_name, tools):
+                logger.warning(
+                    f"MCP server '{server_name}' changed its tools since they were cached. "
+                    "The new tools are used after the next restart or config switch."
+                )
+        except Exception as e:
+            logger.warning(f"Failed to check cached tools of MCP server '{server_name}': {e}")
+
+    async def list_tools_from_servers(
+        self, server_names: List[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Start servers and list their tools concurrently.
+
+        Each server gets its own startup timeout, so a slow or broken server only
+        removes its own tools instead of delaying the others.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Tools by server name, in the order of
+            `server_names`, without the servers that failed.
+        """
+
+        async def list_server_tools(server_name: str) -> List[Dict[str, Any]]:
+            timeout = self._startup_timeout(server_name) + DEFAULT_REQUEST_TIMEOUT
+            try:
+                return await asyncio.wait_for(self.list_tools(server_name), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Server did not start within {timeout:g}s")
+
+        results = await asyncio.gather(
+            *(list_server_tools(name) for name in server_names),
+            return_exceptions=True,
+        )
+
+        tools_by_server = {}
+        for server_name, result in zip(server_names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to load tools from MCP server {server_name}: {result}")
+                continue
+            logger.info(f"Loaded {len(result)} tools from MCP server: {server_name}")
+            tools_by_server[server_name] = result
+        return tools_by_server
+
     async def call_tool(self, server_name: str, tool_name: str, tool_args: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool on a server."""
         logger.info(f"Calling tool '{tool_name}' on server '{server_name}'")
-        proc = await self._ensure_server_running(server_name)
-        
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": tool_args
-            },
-            "id": str(uuid.uuid4())
-        }
-        
+        conn = await self._ensure_server_running(server_name)
+
         # Get timeout from server config
         server = self.server_registry.get_server(server_name)
         timeout = server.timeout.total_seconds() if server and server.timeout else 120.0
-        
-        response = await self._send_request(proc, request, timeout=timeout)
-        
+
+        response = await conn.request(
+            "tools/call",
+            {
+                "name": tool_name,
+                "arguments": tool_args
+            },
+            timeout=timeout,
+        )
+
         if "error" in response:
             return {
                 "metadata": {},
                 "content_items": [{"type": "error", "text": str(response["error"])}]
             }
-        
+
         # Extract content from response
         result = response.get("result", {})
         content = result.get("content", [])
-        
+
         # Convert to expected format
         content_items = []
         for item in content:
@@ -170,33 +218,37 @@ class SubprocessMCPClient:
                 content_items.append(item)
             elif isinstance(item, str):
                 content_items.append({"type": "text", "text": item})
-        
+
         if not content_items and isinstance(result, str):
             content_items.append({"type": "text", "text": result})
-        
+
         return {
             "metadata": result.get("metadata", {}),
             "content_items": content_items
         }
-    
+
+    def release(self) -> None:
+        """Return the leases on all servers to the pool.
+
+        The pool stops a server once no client uses it for a while.
+        """
+        for task in list(self._background_tasks):
+            task.cancel()
+        leases = list(self._leases.values())
+        self._leases.clear()
+        for lease in leases:
+            lease.release()
+        if leases:
+            logger.info(f"SubprocessMCPClient released {len(leases)} MCP servers")
+
     async def aclose(self):
-        """Close all server connections."""
-        logger.info("Closing SubprocessMCPClient...")
-        for server_name, proc in self._processes.items():
-            if proc.poll() is None:
-                proc.terminate()
-                try:
-                    proc.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-        self._processes.clear()
-        self._initialized_servers.clear()
-        logger.info("SubprocessMCPClient closed")
-    
+        """Release all server connections."""
+        self.release()
+
     async def __aenter__(self):
         """Async context manager entry."""
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
-        await self.aclose()
\ No newline at end of file
+        await self.aclose()
@@ -0,0 +1,84 @@
+"""Persistent cache of the tool schemas reported by MCP servers."""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from .types import MCPServer
+
+# Not under `cache/`, which the server empties on every exit
+DEFAULT_CACHE_PATH = os.path.join("mcp_cache", "mcp_tool_schemas.json")
+
+
+def server_config_hash(server: MCPServer) -> str:
+    """Hash the parts of a server config that determine which tools it offers."""
+    config = {
+        "command": server.command,
+        "args": server.args,
+        "env": server.env or {},
+    }
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class ToolSchemaCache:
+    """Tool lists of MCP servers, stored on disk and keyed by server config.
+
+    An entry is only used while the server's command, args and env are unchanged,
+    so editing a server in `mcp_servers.json` invalidates its cached tools.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_PATH):
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self._path.exists():
+            return {}
+        try:
+            entries = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable MCP tool cache '{self._path}': {e}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self) -> None:
+        # Write to a temporary file first, so a crash cannot leave a torn cache
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(self._entries, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        os.replace(tmp_path, self._path)
+
+    def get(self, server: MCPServer) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached tools of a server, or None if its config changed."""
+        with self._lock:
+            entry = self._entries.get(server.name)
+        if not entry or entry.get("config_hash") != server_config_hash(server):
+            return None
+        return entry.get("tools")
+
+    def set(self, server: MCPServer, tools: List[Dict[str, Any]]) -> bool:
+        """Store the tools of a server.
+
+        Returns:
+            bool: Whether the stored tools changed.
+        """
+        entry = {"config_hash": server_config_hash(server), "tools": tools}
+        with self._lock:
+            if self._entries.get(server.name) == entry:
+                return False
+            self._entries[server.name] = entry
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Failed to write MCP tool cache '{self._path}': {e}")
+        return True
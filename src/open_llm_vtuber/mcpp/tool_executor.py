@@ -1,4 +1,5 @@
 import json
+import asyncio
 import datetime
 from loguru import logger
 from typing import (
@@ -6,15 +7,21 @@ from typing import (
     Any,
     List,
     Literal,
+    Optional,
     Union,
     AsyncIterator,
 )
 import sys
 
-from .types import ToolCallObject
+from .types import MCPServer, ToolCallObject
 from .mcp_client import MCPClient
 from .tool_manager import ToolManager
 from .subprocess_mcp_client import SubprocessMCPClient
+from .server_registry import ServerRegistry
+from .tool_result_cache import ToolResultCache, tool_result_cache
+
+# Timeout of a tool call for servers without a configured timeout, in seconds
+DEFAULT_TOOL_TIMEOUT = 120.0
 
 
 class ToolExecutor:
@@ -22,9 +29,16 @@ class ToolExecutor:
         self,
         mcp_client: Union[MCPClient, SubprocessMCPClient],
         tool_manager: ToolManager,
+        server_registry: Optional[ServerRegistry] = None,
+        result_cache: Optional[ToolResultCache] = None,
     ):
         self._mcp_client = mcp_client
         self._tool_manager = tool_manager
+        # Provides the per-server concurrency limits, timeouts and cache settings
+        self._server_registry = server_registry
+        self._server_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Shared by all sessions, so a result is reused across them
+        self._result_cache = result_cache or tool_result_cache
 
     def parse_tool_call(self, call: Union[Dict[str, Any], ToolCallObject]) -> tuple:
         """Parse tool call from different formats.
@@ -150,140 +164,302 @@ class ToolExecutor:
                 logger.warning(f"Skipping invalid tool structure in prompt mode JSON")
         return parsed_tools
 
-    async def execute_tools(
+    def _timestamp(self) -> str:
+        return datetime.datetime.now(datetime.timezone.utc).isoformat() + "Z"
+
+    def _get_server(self, server_name: str) -> Optional[MCPServer]:
+        if not self._server_registry:
+            return None
+        return self._server_registry.get_server(server_name)
+
+    def _get_server_semaphore(self, server_name: str) -> asyncio.Semaphore:
+        """Return the semaphore limiting concurrent calls to a server."""
+        semaphore = self._server_semaphores.get(server_name)
+        if semaphore is None:
+            server = self._get_server(server_name)
+            limit = server.max_concurrency if server else 1
+            semaphore = asyncio.Semaphore(max(1, limit))
+            self._server_semaphores[server_name] = semaphore
+        return semaphore
+
+    def _get_tool_timeout(self, server_name: str) -> float:
+        """Return the timeout of a single call to a server's tool, in seconds."""
+        server = self._get_server(server_name)
+        if server and server.timeout:
+            return server.timeout.total_seconds()
+        return DEFAULT_TOOL_TIMEOUT
+
+    def _get_cached_result(
+        self, server_name: str, tool_name: str, tool_id: str, tool_input: Any
+    ) -> tuple[bool, str, Dict[str, Any], List[Dict[str, Any]]] | None:
+        """Return the cached result of an identical earlier call, if any."""
+        server = self._get_server(server_name)
+        if not server or not server.result_cache:
+            return None
+        result = self._result_cache.get(server, tool_name, tool_input or {})
+        if result is not None:
+            logger.info(f"Using cached result of tool '{tool_name}' (ID: {tool_id})")
+        return result
+
+    async def run_tool_with_limits(
+        self, tool_name: str, tool_id: str, tool_input: Any
+    ) -> tuple[tuple[bool, str, Dict[str, Any], List[Dict[str, Any]]], bool]:
+        """Run a single tool within its server's concurrency limit and timeout.
+
+        Returns:
+            tuple: ((is_error, text_content, metadata, content_items), cached),
+            where cached tells whether the result came from the result cache.
+        """
+        tool_info = self._tool_manager.get_tool(tool_name)
+        server_name = tool_info.related_server if tool_info else None
+        if not server_name:
+            # Let run_single_tool report the configuration error
+            return await self.run_single_tool(tool_name, tool_id, tool_input), False
+
+        # Cache hits neither wait for a free slot on the server nor time out
+        cached_result = self._get_cached_result(server_name, tool_name, tool_id, tool_input)
+        if cached_result is not None:
+            return cached_result, True
+
+        timeout = self._get_tool_timeout(server_name)
+        async with self._get_server_semaphore(server_name):
+            # An identical call may have finished while this one was waiting
+            cached_result = self._get_cached_result(
+                server_name, tool_name, tool_id, tool_input
+            )
+            if cached_result is not None:
+                return cached_result, True
+            try:
+                result = await asyncio.wait_for(
+                    self.run_single_tool(tool_name, tool_id, tool_input),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Tool '{tool_name}' timed out after {timeout}s")
+                text_content = f"Error: Tool '{tool_name}' timed out after {timeout:g}s."
+                result = True, text_content, {}, [{"type": "error", "text": text_content}]
+            return result, False
+
+    def _format_execution_result(
         self,
-        tool_calls: Union[List[Dict[str, Any]], List[ToolCallObject]],
         caller_mode: Literal["Claude", "OpenAI", "Prompt"],
-    ) -> AsyncIterator[Dict[str, Any]]:
-        """Execute tools and yield status updates."""
-        tool_results_for_llm = []
+        tool_name: str,
+        tool_id: str,
+        execution_result: tuple[bool, str, Dict[str, Any], List[Dict[str, Any]]],
+        cached: bool = False,
+    ) -> tuple[Dict[str, Any], Dict[str, Any] | None]:
+        """Build the status update and the LLM-formatted result of a finished tool.
 
-        logger.info(f"Executing {len(tool_calls)} tool(s) for {caller_mode} caller.")
-        for call in tool_calls:
-            (
-                tool_name,
-                tool_id,
-                tool_input,
-                is_error,
-                result_content,
-                parse_error,
-            ) = self.parse_tool_call(call)
-            
-            logger.info(f"Executing tool: {call}")
-            
-            if parse_error:
-                logger.warning(
-                    f"Skipping tool call due to parsing error: {result_content}"
+        Returns:
+            tuple: (status_update, formatted_result)
+        """
+        is_error, text_content, metadata, content_items = execution_result
+
+        # Determine content for status update and LLM result format
+        status_content = text_content # Default to text content
+        llm_formatted_content = text_content # Default to text content for LLM
+
+        if content_items:
+            image_items = [item for item in content_items if item.get('type') == 'image']
+            if image_items:
+                num_images = len(image_items)
+                status_content = f"{text_content}\n[Tool returned {num_images} image(s)]".strip()
+
+                if caller_mode == "Claude":
+                    # Format for Claude: list of blocks
+                    claude_blocks = []
+                    if text_content:
+                        claude_blocks.append({"type": "text", "text": text_content})
+                    for item in content_items:
+                         if item.get('type') == 'image' and 'data' in item and 'mimeType' in item:
+                             claude_blocks.append({
+                                 "type": "image",
+                                 "source": {
+                                     "type": "base64",
+                                     "media_type": item['mimeType'],
+                                     "data": item['data'],
+                                 }
+                             })
+                         # Add other non-text types here
+                    llm_formatted_content = claude_blocks if claude_blocks else "" # Use blocks or empty string
+                elif caller_mode in ["OpenAI", "Prompt"]:
+                    llm_formatted_content = status_content
+
+        status_update = {
+            "type": "tool_call_status",
+            "tool_id": tool_id,
+            "tool_name": tool_name,
+            "status": "error" if is_error else "completed",
+            "content": status_content if not is_error else f"Error: {text_content}", # Use descriptive content or error message
+            "timestamp": self._timestamp(),
+        }
+        if cached:
+            status_update["cached"] = True
+
+        # For stagehand_navigate tool, include browser view links if available
+        if tool_name == "stagehand_navigate" and not is_error:
+            live_view_data = metadata.get("liveViewData", {})
+            if live_view_data:
+                logger.info(
+                    f"Found live view data for stagehand_navigate: {live_view_data}"
                 )
-                status_update = {
-                    "type": "tool_call_status",
-                    "tool_id": tool_id
-                    or f"parse_error_{datetime.datetime.now(datetime.timezone.utc).isoformat()}",
-                    "tool_name": tool_name or "Unknown Tool",
-                    "status": "error",
-                    "content": result_content,
-                    "timestamp": datetime.datetime.now(
-                        datetime.timezone.utc
-                    ).isoformat()
-                    + "Z",
-                }
-                yield status_update
-                # Even on parse error, we might need to format a result for the LLM
-                # Use dummy values or the error message
-                formatted_result = self.format_tool_result(
-                     caller_mode,
-                     tool_id or f"parse_error_{datetime.datetime.now(datetime.timezone.utc).isoformat()}",
-                     result_content,
-                     True # is_error
-                 )
-                if formatted_result:
-                    tool_results_for_llm.append(formatted_result)
-                continue # Skip execution logic for this call
-
-            # Yield 'running' status before execution
-            yield {
-                "type": "tool_call_status",
-                "tool_id": tool_id,
-                "tool_name": tool_name,
-                "status": "running",
-                "content": f"Input: {json.dumps(tool_input)}",
-                "timestamp": datetime.datetime.now(
-                    datetime.timezone.utc
-                ).isoformat()
-                + "Z",
-            }
+                status_update["browser_view"] = live_view_data
 
-            # Execute the tool
-            (
-                is_error,
-                text_content,
-                metadata,
-                content_items,
-            ) = await self.run_single_tool(tool_name, tool_id, tool_input)
-
-            # Determine content for status update and LLM result format
-            status_content = text_content # Default to text content
-            llm_formatted_content = text_content # Default to text content for LLM
-
-            has_image = False
-            if content_items:
-                image_items = [item for item in content_items if item.get('type') == 'image']
-                if image_items:
-                    has_image = True
-                    num_images = len(image_items)
-                    status_content = f"{text_content}\n[Tool returned {num_images} image(s)]".strip()
-
-                    if caller_mode == "Claude":
-                        # Format for Claude: list of blocks
-                        claude_blocks = []
-                        if text_content:
-                            claude_blocks.append({"type": "text", "text": text_content})
-                        for item in content_items:
-                             if item.get('type') == 'image' and 'data' in item and 'mimeType' in item:
-                                 claude_blocks.append({
-                                     "type": "image",
-                                     "source": {
-                                         "type": "base64",
-                                         "media_type": item['mimeType'],
-                                         "data": item['data'],
-                                     }
-                                 })
-                             # Add other non-text types here
-                        llm_formatted_content = claude_blocks if claude_blocks else "" # Use blocks or empty string
-                    elif caller_mode in ["OpenAI", "Prompt"]:
-                        llm_formatted_content = status_content
-
-            # Prepare and yield tool call status update
+        formatted_result = self.format_tool_result(
+            caller_mode, tool_id, llm_formatted_content, is_error
+        )
+        return status_update, formatted_result
+
+    def _start_tool_call(
+        self,
+        call: Union[Dict[str, Any], ToolCallObject],
+        caller_mode: Literal["Claude", "OpenAI", "Prompt"],
+    ) -> tuple[Dict[str, Any], asyncio.Task | None, Dict[str, Any] | None]:
+        """Parse a tool call and start running it.
+
+        Returns:
+            tuple: (status_update, task, formatted_result). The task is None if the
+            call could not be parsed, in which case formatted_result is the error
+            result for the LLM.
+        """
+        (
+            tool_name,
+            tool_id,
+            tool_input,
+            is_error,
+            result_content,
+            parse_error,
+        ) = self.parse_tool_call(call)
+
+        logger.info(f"Executing tool: {call}")
+
+        if parse_error:
+            logger.warning(f"Skipping tool call due to parsing error: {result_content}")
+            tool_id = tool_id or f"parse_error_{self._timestamp()}"
             status_update = {
                 "type": "tool_call_status",
                 "tool_id": tool_id,
-                "tool_name": tool_name,
-                "status": "error" if is_error else "completed",
-                "content": status_content if not is_error else f"Error: {text_content}", # Use descriptive content or error message
-                "timestamp": datetime.datetime.now(
-                    datetime.timezone.utc
-                ).isoformat()
-                + "Z",
+                "tool_name": tool_name or "Unknown Tool",
+                "status": "error",
+                "content": result_content,
+                "timestamp": self._timestamp(),
             }
+            # Even on parse error, the LLM needs a result for the call
+            return (
+                status_update,
+                None,
+                self.format_tool_result(caller_mode, tool_id, result_content, True),
+            )
 
-            # For stagehand_navigate tool, include browser view links if available
-            if tool_name == "stagehand_navigate" and not is_error:
-                live_view_data = metadata.get("liveViewData", {})
-                if live_view_data:
-                    logger.info(
-                        f"Found live view data for stagehand_navigate: {live_view_data}"
-                    )
-                    status_update["browser_view"] = live_view_data
+        status_update = {
+            "type": "tool_call_status",
+            "tool_id": tool_id,
+            "tool_name": tool_name,
+            "status": "running",
+            "content": f"Input: {json.dumps(tool_input)}",
+            "timestamp": self._timestamp(),
+        }
+        task = asyncio.create_task(
+            self.run_tool_with_limits(tool_name, tool_id, tool_input)
+        )
+        return status_update, task, None
 
-            yield status_update
+    async def execute_tools(
+        self,
+        tool_calls: Union[
+            List[Dict[str, Any]],
+            List[ToolCallObject],
+            AsyncIterator[Union[Dict[str, Any], ToolCallObject]],
+        ],
+        caller_mode: Literal["Claude", "OpenAI", "Prompt"],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Execute tools concurrently and yield status updates.
 
-            # Format result for LLM and add to list
-            formatted_result = self.format_tool_result(
-                caller_mode, tool_id, llm_formatted_content, is_error
-            )
-            if formatted_result:
-                tool_results_for_llm.append(formatted_result)
+        All calls are started at once, limited per server by the server's
+        `max_concurrency`, and each call is bounded by the server's timeout.
+        A status update is yielded as each call finishes, and the final results
+        keep the order of `tool_calls`.
 
+        `tool_calls` may also be an async iterator, e.g. of calls still being
+        streamed by the LLM: each call is started as soon as it arrives.
+        """
+        # Results for the LLM, by position of the tool call
+        results: Dict[int, Dict[str, Any] | None] = {}
+        running: Dict[asyncio.Task, tuple[int, str, str]] = {}
+        call_count = 0
+        next_call: asyncio.Future | None = None
+
+        if isinstance(tool_calls, list):
+            logger.info(f"Executing {len(tool_calls)} tool(s) for {caller_mode} caller.")
+            pending_calls = list(tool_calls)
+        else:
+            logger.info(f"Executing streamed tool calls for {caller_mode} caller.")
+            pending_calls = []
+            call_stream = tool_calls.__aiter__()
+            next_call = asyncio.ensure_future(call_stream.__anext__())
+
+        try:
+            while True:
+                for call in pending_calls:
+                    status_update, task, results[call_count] = self._start_tool_call(
+                        call, caller_mode
+                    )
+                    if task is not None:
+                        running[task] = (
+                            call_count,
+                            status_update["tool_name"],
+                            status_update["tool_id"],
+                        )
+                    call_count += 1
+                    yield status_update
+                pending_calls = []
+
+                waiting = set(running)
+                if next_call is not None:
+                    waiting.add(next_call)
+                if not waiting:
+                    break
+
+                # Report each tool as soon as it finishes, start new calls as they arrive
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if next_call in done:
+                    try:
+                        pending_calls.append(next_call.result())
+                        next_call = asyncio.ensure_future(call_stream.__anext__())
+                    except StopAsyncIteration:
+                        next_call = None
+                for task in done:
+                    if task not in running:
+                        continue
+                    index, tool_name, tool_id = running.pop(task)
+                    cached = False
+                    try:
+                        execution_result, cached = task.result()
+                    except Exception as e:
+                        logger.exception(
+                            f"Unexpected error executing tool '{tool_name}': {e}"
+                        )
+                        text_content = f"Unexpected error executing tool '{tool_name}': {e}"
+                        execution_result = (
+                            True,
+                            text_content,
+                            {},
+                            [{"type": "error", "text": text_content}],
+                        )
+                    status_update, results[index] = self._format_execution_result(
+                        caller_mode, tool_name, tool_id, execution_result, cached
+                    )
+                    yield status_update
+        finally:
+            # Interrupted: do not leave tool calls running in the background
+            for task in running:
+                task.cancel()
+            if next_call is not None:
+                next_call.cancel()
+
+        tool_results_for_llm = [
+            results[index] for index in sorted(results) if results[index] is not None
+        ]
         logger.info(
             f"Finished executing tools with {len(tool_results_for_llm)} results."
         )
@@ -343,6 +519,14 @@ class ToolExecutor:
 
                 if not is_error:
                     logger.info(f"Tool '{tool_name}' executed successfully.")
+                    server = self._get_server(tool_info.related_server)
+                    if server:
+                        self._result_cache.set(
+                            server,
+                            tool_name,
+                            tool_input,
+                            (is_error, text_content, metadata, content_items),
+                        )
                     if content_items:
                         logger.info(f"Content items from tool '{tool_name}':")
                         for item in content_items:
@@ -365,3 +549,87 @@ class ToolExecutor:
                 is_error = True
 
         return is_error, text_content, metadata, content_items
+
+
+# Marks the end of the tool calls and of the status updates in the queues
+_END_OF_CALLS = object()
+
+
+class ToolCallDispatcher:
+    """Executes tool calls while the LLM is still streaming its response.
+
+    Calls are submitted as the LLM yields them and start running right away
+    through `ToolExecutor.execute_tools`. Once the stream has ended, `finish`
+    yields the remaining status updates and the final results, like
+    `execute_tools` does.
+    """
+
+    def __init__(
+        self,
+        tool_executor: ToolExecutor,
+        caller_mode: Literal["Claude", "OpenAI", "Prompt"],
+    ):
+        self._calls: asyncio.Queue = asyncio.Queue()
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._finished = False
+        self._task = asyncio.create_task(self._run(tool_executor, caller_mode))
+
+    async def _call_stream(self) -> AsyncIterator[Union[Dict[str, Any], ToolCallObject]]:
+        while True:
+            call = await self._calls.get()
+            if call is _END_OF_CALLS:
+                return
+            yield call
+
+    async def _run(
+        self,
+        tool_executor: ToolExecutor,
+        caller_mode: Literal["Claude", "OpenAI", "Prompt"],
+    ) -> None:
+        try:
+            async for update in tool_executor.execute_tools(
+                self._call_stream(), caller_mode
+            ):
+                self._updates.put_nowait(update)
+        finally:
+            self._updates.put_nowait(_END_OF_CALLS)
+
+    def submit(self, tool_calls: List[Union[Dict[str, Any], ToolCallObject]]) -> None:
+        """Start executing tool calls."""
+        for call in tool_calls:
+            self._calls.put_nowait(call)
+
+    def drain_updates(self) -> List[Dict[str, Any]]:
+        """Return the status updates produced so far, without waiting."""
+        updates = []
+        while not self._finished and not self._updates.empty():
+            update = self._updates.get_nowait()
+            if update is _END_OF_CALLS:
+                self._finished = True
+            else:
+                updates.append(update)
+        return updates
+
+    async def finish(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the remaining status updates and the final results.
+
+        Call it once all tool calls are submitted.
+        """
+        self._calls.put_nowait(_END_OF_CALLS)
+        while not self._finished:
+            update = await self._updates.get()
+            if update is _END_OF_CALLS:
+                self._finished = True
+            else:
+                yield update
+        # Raise the error that ended the execution, if any
+        await self._task
+
+    async def cancel(self) -> None:
+        """Stop the tool calls that are still running."""
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
@@ -0,0 +1,102 @@
+"""In-memory TTL cache of MCP tool results, shared by all sessions."""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .tool_cache import server_config_hash
+from .types import MCPServer, ResultCacheConfig
+
+# (is_error, text_content, metadata, content_items), as returned by ToolExecutor
+ToolResult = Tuple[bool, str, Dict[str, Any], list]
+
+
+def canonicalize_args(args: Any, config: ResultCacheConfig) -> str:
+    """Turn tool arguments into a cache key.
+
+    Keys are sorted, the arguments in `config.ignore_args` are dropped, and with
+    `config.normalize_strings` strings are stripped, lowercased and have their
+    whitespace collapsed, so "  Weather in Paris" and "weather in paris" hit
+    the same entry.
+    """
+
+    def normalize(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        if isinstance(value, str) and config.normalize_strings:
+            return " ".join(value.split()).lower()
+        return value
+
+    if isinstance(args, dict):
+        args = {
+            key: value for key, value in args.items() if key not in config.ignore_args
+        }
+    return json.dumps(normalize(args), sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ToolResultCache:
+    """Successful tool results by server, tool and canonical arguments.
+
+    Each server has its own LRU of at most `max_entries` results, and entries
+    expire after the TTL configured for their tool. Servers are identified by
+    their config hash, so an edited server does not serve stale results.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # server config hash -> cache key -> (expires_at, result)
+        self._entries: Dict[str, OrderedDict] = {}
+
+    def get(self, server: MCPServer, tool_name: str, args: Any) -> Optional[ToolResult]:
+        """Return a fresh cached result, or None on a miss or for uncached tools."""
+        config = (
+            server.result_cache.for_tool(tool_name) if server.result_cache else None
+        )
+        if config is None:
+            return None
+        key = (tool_name, canonicalize_args(args, config))
+        with self._lock:
+            entries = self._entries.get(server_config_hash(server))
+            entry = entries.get(key) if entries is not None else None
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+        # Callers may modify the result, e.g. the metadata
+        return copy.deepcopy(result)
+
+    def set(
+        self, server: MCPServer, tool_name: str, args: Any, result: ToolResult
+    ) -> None:
+        """Store a successful result, if the tool is cached."""
+        config = (
+            server.result_cache.for_tool(tool_name) if server.result_cache else None
+        )
+        if config is None or result[0]:
+            return
+        key = (tool_name, canonicalize_args(args, config))
+        expires_at = time.monotonic() + config.ttl.total_seconds()
+        with self._lock:
+            entries = self._entries.setdefault(
+                server_config_hash(server), OrderedDict()
+            )
+            entries[key] = (expires_at, copy.deepcopy(result))
+            entries.move_to_end(key)
+            while len(entries) > server.result_cache.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the tool executors of all sessions
+tool_result_cache = ToolResultCache()
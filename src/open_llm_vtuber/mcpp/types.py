@@ -4,6 +4,31 @@ from typing import Dict, List, Optional, Any
 from pathlib import Path
 
 
+@dataclass
+class ResultCacheConfig:
+    """Class representing the result cache settings of a MCP Server's tools
+
+    Args:
+        ttl (timedelta): Time a tool result is reused for.
+        max_entries (int, optional): Maximum number of results cached for the server. Defaults to 128.
+        ignore_args (List[str], optional): Arguments left out of the cache key, e.g. a request id. Defaults to an empty list.
+        normalize_strings (bool, optional): Compare string arguments ignoring case and extra whitespace. Defaults to False.
+        tools (Optional[Dict[str, Optional[ResultCacheConfig]]], optional): Settings of individual tools, None to not cache a tool. Defaults to None (all tools use the server settings).
+    """
+
+    ttl: timedelta
+    max_entries: int = 128
+    ignore_args: List[str] = field(default_factory=list)
+    normalize_strings: bool = False
+    tools: Optional[Dict[str, Optional["ResultCacheConfig"]]] = None
+
+    def for_tool(self, tool_name: str) -> Optional["ResultCacheConfig"]:
+        """Return the settings of a tool, or None if its results are not cached."""
+        if self.tools is None:
+            return self
+        return self.tools.get(tool_name)
+
+
 @dataclass
 class MCPServer:
     """Class representing a MCP Server
@@ -14,6 +39,9 @@ class MCPServer:
         args (List[str], optional): Arguments for the command. Defaults to an empty list.
         env (Optional[Dict[str, str]], optional): Environment variables for the command. Defaults to None.
         timeout (Optional[timedelta], optional): Timeout for the command. Defaults to 10 seconds.
+        max_concurrency (int, optional): Maximum number of tool calls run on the server at the same time. Defaults to 1.
+        startup_timeout (Optional[timedelta], optional): Time the server may take to start and initialize. Defaults to None (60 seconds).
+        result_cache (Optional[ResultCacheConfig], optional): Reuse the results of repeated tool calls. Defaults to None (disabled).
     """
 
     name: str
@@ -22,6 +50,9 @@ class MCPServer:
     env: Optional[Dict[str, str]] = None
     timeout: Optional[timedelta] = timedelta(seconds=30)
     description: str = "No description available."
+    max_concurrency: int = 1
+    startup_timeout: Optional[timedelta] = None
+    result_cache: Optional[ResultCacheConfig] = None
 
 
 @dataclass
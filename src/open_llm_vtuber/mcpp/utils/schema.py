@@ -0,0 +1,66 @@
+"""Schema utilities."""
+
+from typing import Any, Dict, List
+
+# JSON schema types and the Python types of the values json.loads returns for them
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def validate_arguments(arguments: Any, schema: Dict[str, Any]) -> List[str]:
+    """Check tool arguments against the tool's input schema.
+
+    Only the parts of JSON schema that tool schemas commonly use are checked:
+    the top-level object, required properties, and the type and enum of each
+    property. Anything else is accepted.
+
+    Args:
+        arguments (Any): The parsed arguments.
+        schema (Dict[str, Any]): The input schema of the tool.
+
+    Returns:
+        List[str]: The problems found, empty if the arguments are valid.
+    """
+    if not isinstance(arguments, dict):
+        return [f"Arguments must be an object, got {type(arguments).__name__}"]
+
+    errors = []
+    for name in schema.get("required", []):
+        if name not in arguments:
+            errors.append(f"Missing required argument '{name}'")
+
+    properties = schema.get("properties", {})
+    for name, value in arguments.items():
+        property_schema = properties.get(name)
+        if property_schema is None:
+            if schema.get("additionalProperties") is False:
+                errors.append(f"Unknown argument '{name}'")
+            continue
+        if not _matches_type(value, property_schema.get("type")):
+            errors.append(
+                f"Argument '{name}' must be of type {property_schema.get('type')}"
+            )
+        elif "enum" in property_schema and value not in property_schema["enum"]:
+            errors.append(f"Argument '{name}' must be one of {property_schema['enum']}")
+    return errors
+
+
+def _matches_type(value: Any, schema_type: Any) -> bool:
+    if schema_type is None:
+        return True
+    if isinstance(schema_type, list):
+        return any(_matches_type(value, single_type) for single_type in schema_type)
+    python_type = _JSON_TYPES.get(schema_type)
+    if python_type is None:
+        return True
+    # bool is a subclass of int, but not a JSON number
+    if isinstance(value, bool) and schema_type in ("integer", "number"):
+        return False
+    return isinstance(value, python_type)
@@ -7,6 +7,8 @@ from starlette.websockets import WebSocketDisconnect
 from loguru import logger
 from .service_context import ServiceContext
 from .websocket_handler import WebSocketHandler
+from .agent.stateless_llm.llm_metrics import llm_metrics
+from .agent.stateless_llm.prompt_cache import prompt_cache_summary
 
 
 def init_client_ws_route(default_context_cache: ServiceContext) -> APIRouter:
@@ -65,6 +67,15 @@ def init_webtool_routes(default_context_cache: ServiceContext) -> APIRouter:
         """Redirect /web_tool to /web_tool/index.html"""
         return Response(status_code=302, headers={"Location": "/web-tool/index.html"})
 
+    @router.get("/llm-metrics")
+    async def get_llm_metrics(limit: int = 20):
+        """Return time-to-first-token, streaming rate and prompt cache hits of LLM requests"""
+        return {
+            "summary": llm_metrics.summary(),
+            "prompt_cache": prompt_cache_summary(),
+            "recent": [metrics.to_dict() for metrics in llm_metrics.recent(limit)],
+        }
+
     @router.post("/asr")
     async def transcribe_audio(file: UploadFile = File(...)):
         """
@@ -1,13 +1,24 @@
 import os
+import time
+import asyncio
 import shutil
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import Response
+from loguru import logger
 
 from .routes import init_client_ws_route, init_webtool_routes
 from .service_context import ServiceContext
+from .mcpp.server_pool import mcp_server_pool
+from .chat_history_manager import (
+    init_history_store,
+    close_history_store,
+    start_history_writer,
+    stop_history_writer,
+)
 from .config_manager.utils import Config
 
 
@@ -29,7 +40,37 @@ class AvatarStaticFiles(StaticFiles):
 
 class WebSocketServer:
     def __init__(self, config: Config):
-        self.app = FastAPI()
+        start_time = time.monotonic()
+
+        init_history_store(
+            config.system_config.chat_history_backend,
+            search=config.system_config.chat_history_search,
+        )
+        default_context_cache = ServiceContext()
+
+        @asynccontextmanager
+        async def lifespan(app: FastAPI):
+            # Load configurations and initialize the default context cache on the
+            # server's event loop, so MCP servers started here can be used by it.
+            # The LLM is preloaded in the background while the other engines load.
+            start_history_writer()
+            await default_context_cache.load_from_config(config)
+
+            async def report_ready():
+                await default_context_cache.wait_until_ready()
+                logger.info(
+                    f"All models are ready ({time.monotonic() - start_time:.1f} seconds since start)."
+                )
+
+            ready_task = asyncio.create_task(report_ready())
+            yield
+            ready_task.cancel()
+            await default_context_cache.close()
+            await mcp_server_pool.shutdown()
+            await stop_history_writer()
+            close_history_store()
+
+        self.app = FastAPI(lifespan=lifespan)
 
         # Add CORS
         self.app.add_middleware(
@@ -40,10 +81,6 @@ class WebSocketServer:
             allow_headers=["*"],
         )
 
-        # Load configurations and initialize the default context cache
-        default_context_cache = ServiceContext()
-        default_context_cache.load_from_config(config)
-
         # Include routes
         self.app.include_router(
             init_client_ws_route(default_context_cache=default_context_cache),
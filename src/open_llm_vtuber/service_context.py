@@ -1,11 +1,13 @@
 import os
 import json
+import time
+import asyncio
 
 from loguru import logger
 from fastapi import WebSocket
 
 from prompts import prompt_loader
-from .live2d_model import Live2dModel
+from .live2d_model import Live2dModel, model_registry
 from .asr.asr_interface import ASRInterface
 from .tts.tts_interface import TTSInterface
 from .vad.vad_interface import VADInterface
@@ -54,6 +56,16 @@ class ServiceContext:
 
         self.history_uid: str = ""  # Add history_uid field
 
+        # preloads the agent's LLM while the other engines are initialized
+        self._warmup_task: asyncio.Task | None = None
+        # MCP client created by init_agent; its servers are shared through the
+        # process-wide server pool and released when the agent is replaced
+        self._mcp_client = None
+        # Whether agent_engine was created by this context. Contexts loaded with
+        # `load_cache` hold a session of another context's agent, which shares
+        # its LLM, so they must not shut it down.
+        self._owns_agent = False
+
     def __str__(self):
         return (
             f"ServiceContext:\n"
@@ -103,10 +115,11 @@ class ServiceContext:
         self.vad_engine = vad_engine
         self.agent_engine = agent_engine
         self.translate_engine = translate_engine
+        self._owns_agent = False
 
         logger.debug(f"Loaded service context with cache: {character_config}")
 
-    def load_from_config(self, config: Config) -> None:
+    async def load_from_config(self, config: Config) -> None:
         """
         Load the ServiceContext with the config.
         Reinitialize the instances if the config is different.
@@ -128,20 +141,27 @@ class ServiceContext:
         # init live2d from character config
         self.init_live2d(config.character_config.live2d_model_name)
 
+        # init agent from character config. It goes first so that its LLM
+        # can be preloaded in the background while asr, tts and vad load.
+        previous_agent = self.agent_engine
+        await self.init_agent(
+            config.character_config.agent_config,
+            config.character_config.persona_prompt,
+        )
+        if self.agent_engine is not previous_agent:
+            self._start_warmup()
+
+        # Loading models blocks, so asr, tts and vad are built on a worker
+        # thread and other clients are served meanwhile
+
         # init asr from character config
-        self.init_asr(config.character_config.asr_config)
+        await asyncio.to_thread(self.init_asr, config.character_config.asr_config)
 
         # init tts from character config
-        self.init_tts(config.character_config.tts_config)
+        await asyncio.to_thread(self.init_tts, config.character_config.tts_config)
 
         # init vad from character config
-        self.init_vad(config.character_config.vad_config)
-
-        # init agent from character config
-        self.init_agent(
-            config.character_config.agent_config,
-            config.character_config.persona_prompt,
-        )
+        await asyncio.to_thread(self.init_vad, config.character_config.vad_config)
 
         self.init_translate(
             config.character_config.tts_preprocessor_config.translator_config
@@ -155,7 +175,7 @@ class ServiceContext:
     def init_live2d(self, live2d_model_name: str) -> None:
         logger.info(f"Initializing Live2D: {live2d_model_name}")
         try:
-            self.live2d_model = Live2dModel(live2d_model_name)
+            self.live2d_model = model_registry.get_model(live2d_model_name)
             self.character_config.live2d_model_name = live2d_model_name
         except Exception as e:
             logger.critical(f"Error initializing Live2D: {e}")
@@ -197,7 +217,7 @@ class ServiceContext:
         else:
             logger.info("VAD already initialized with the same config.")
 
-    def init_agent(self, agent_config: AgentConfig, persona_prompt: str) -> None:
+    async def init_agent(self, agent_config: AgentConfig, persona_prompt: str) -> None:
         """Initialize or update the LLM engine based on agent configuration."""
         logger.info(f"Initializing Agent: {agent_config.conversation_agent_choice}")
 
@@ -225,6 +245,7 @@ class ServiceContext:
                 from .mcpp.tool_manager import ToolManager
                 from .mcpp.tool_adapter import ToolAdapter
                 from .mcpp.tool_executor import ToolExecutor
+                from .mcpp.tool_cache import ToolSchemaCache
                 
                 logger.info("Initializing MCP components...")
                 
@@ -235,55 +256,54 @@ class ServiceContext:
                 # Load tools from enabled servers
                 enabled_servers = basic_memory_settings.mcp_enabled_servers or []
                 if enabled_servers:
-                    import asyncio
-                    
-                    # Handle async loading of tools
-                    all_tools = []
-                    import nest_asyncio
-                    nest_asyncio.apply()
-                    
-                    # Always use SubprocessMCPClient when nest_asyncio is needed
-                    logger.info("Using SubprocessMCPClient for compatibility with nest_asyncio")
-                    mcp_client = SubprocessMCPClient(server_registry)
+                    mcp_client = SubprocessMCPClient(
+                        server_registry, tool_cache=ToolSchemaCache()
+                    )
                     
                     async def load_tools_async():
                         tools = []
-                        for server_name in enabled_servers:
-                            try:
-                                # List tools from each server (server starts automatically on first access)
-                                server_tools = await mcp_client.list_tools(server_name)
-                                logger.info(f"Loaded {len(server_tools)} tools from MCP server: {server_name}")
+                        # Use cached tools where possible: those servers start on first use
+                        cached_tools = mcp_client.get_cached_tools(enabled_servers)
+                        if cached_tools:
+                            logger.info(
+                                f"Using cached tools of MCP servers: {list(cached_tools)}"
+                            )
+                        # Start the other servers and list their tools concurrently
+                        loaded_tools = await mcp_client.list_tools_from_servers(
+                            [name for name in enabled_servers if name not in cached_tools]
+                        )
+                        tools_by_server = {
+                            name: cached_tools.get(name, loaded_tools.get(name))
+                            for name in enabled_servers
+                            if name in cached_tools or name in loaded_tools
+                        }
+                        for server_name, server_tools in tools_by_server.items():
+                            # Add server name to each tool for grouping
+                            for tool in server_tools:
+                                # Handle both dict and object formats
+                                if isinstance(tool, dict):
+                                    name = tool.get('name', '')
+                                    description = tool.get('description', '')
+                                    input_schema = tool.get('inputSchema', {})
+                                else:
+                                    name = tool.name
+                                    description = tool.description
+                                    input_schema = tool.inputSchema if hasattr(tool, 'inputSchema') else {}
                                 
-                                # Add server name to each tool for grouping
-                                for tool in server_tools:
-                                    # Handle both dict and object formats
-                                    if isinstance(tool, dict):
-                                        name = tool.get('name', '')
-                                        description = tool.get('description', '')
-                                        input_schema = tool.get('inputSchema', {})
-                                    else:
-                                        name = tool.name
-                                        description = tool.description
-                                        input_schema = tool.inputSchema if hasattr(tool, 'inputSchema') else {}
-                                    
-                                    # Override description for exec tool to be clearer
-                                    if name == "exec" and server_name == "MacOS-Control":
-                                        description = "Execute a shell command on the user's Mac computer. Can be used to open applications like Safari, control the system, and perform various tasks."
-                                    
-                                    tool_dict = {
-                                        "name": name,
-                                        "description": description,
-                                        "server_name": server_name,
-                                        "input_schema": input_schema
-                                    }
-                                    tools.append(tool_dict)
-                                    
-                            except Exception as e:
-                                logger.error(f"Failed to load tools from MCP server {server_name}: {e}")
+                                # Override description for exec tool to be clearer
+                                if name == "exec" and server_name == "MacOS-Control":
+                                    description = "Execute a shell command on the user's Mac computer. Can be used to open applications like Safari, control the system, and perform various tasks."
+                                
+                                tool_dict = {
+                                    "name": name,
+                                    "description": description,
+                                    "server_name": server_name,
+                                    "input_schema": input_schema
+                                }
+                                tools.append(tool_dict)
                         return tools
                     
-                    loop = asyncio.new_event_loop()
-                    all_tools = loop.run_until_complete(load_tools_async())
+                    all_tools = await load_tools_async()
                     
                     logger.info(f"Total tools loaded from MCP servers: {len(all_tools)}")
                     
@@ -316,7 +336,9 @@ class ServiceContext:
                     )
                     
                     # Initialize tool executor with correct parameters
-                    tool_executor = ToolExecutor(mcp_client, tool_manager)
+                    tool_executor = ToolExecutor(
+                        mcp_client, tool_manager, server_registry=server_registry
+                    )
                     
                     # Generate MCP prompt string
                     mcp_prompt_string = self._generate_mcp_prompt_string(all_tools)
@@ -329,6 +351,7 @@ class ServiceContext:
                 else:
                     logger.warning("MCP is enabled but no servers are configured")
 
+        previous_agent = self.agent_engine
         try:
             self.agent_engine = AgentFactory.create_agent(
                 conversation_agent_choice=agent_config.conversation_agent_choice,
@@ -345,6 +368,20 @@ class ServiceContext:
             logger.debug(f"Agent choice: {agent_config.conversation_agent_choice}")
             logger.debug(f"System prompt: {system_prompt}")
 
+            # The old agent is replaced, give its MCP servers back to the pool
+            self.release_mcp_client()
+            if mcp_components:
+                self._mcp_client = mcp_client
+
+            # Release its LLM too, unless it is a session sharing another context's LLM
+            self._cancel_warmup()
+            if self._owns_agent and previous_agent is not None:
+                try:
+                    await previous_agent.shutdown()
+                except Exception as e:
+                    logger.error(f"Failed to shut down the previous agent: {e}")
+            self._owns_agent = True
+
             # Save the current configuration
             self.character_config.agent_config = agent_config
             self.system_prompt = system_prompt
@@ -380,6 +417,52 @@ class ServiceContext:
         else:
             logger.info("Translation already initialized with the same config.")
 
+    def _start_warmup(self) -> None:
+        """Warm up the agent (e.g. preload the LLM) in a background task."""
+        self._cancel_warmup()
+        self._warmup_task = asyncio.create_task(self._warmup(self.agent_engine))
+
+    @staticmethod
+    async def _warmup(agent: AgentInterface) -> None:
+        start_time = time.monotonic()
+        try:
+            await agent.warmup()
+        except Exception as e:
+            logger.error(f"Failed to warm up agent: {e}")
+            return
+        logger.info(f"Agent warmed up in {time.monotonic() - start_time:.1f} seconds.")
+
+    def _cancel_warmup(self) -> None:
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+
+    async def wait_until_ready(self) -> None:
+        """Wait for the background warmup started by `load_from_config` to finish."""
+        if self._warmup_task:
+            try:
+                await asyncio.shield(self._warmup_task)
+            except asyncio.CancelledError:
+                # Only the warmup was cancelled, e.g. by a config switch
+                if not self._warmup_task.cancelled():
+                    raise
+
+    def release_mcp_client(self) -> None:
+        """Release the MCP servers used by the agent this context created.
+
+        Contexts loaded with `load_cache` share the agent of another context and
+        own no MCP client, so this is a no-op for them until they switch config.
+        """
+        if self._mcp_client is not None:
+            self._mcp_client.release()
+            self._mcp_client = None
+
+    async def close(self) -> None:
+        """Release the engines owned by this context, e.g. unload the LLM."""
+        self._cancel_warmup()
+        self.release_mcp_client()
+        if self.agent_engine and self._owns_agent:
+            await self.agent_engine.shutdown()
+
     # ==== utils
 
     def construct_system_prompt(self, persona_prompt: str) -> str:
@@ -499,7 +582,7 @@ class ServiceContext:
                     "character_config": new_character_config_data,
                 }
                 new_config = validate_config(new_config)
-                self.load_from_config(new_config)
+                await self.load_from_config(new_config)
                 logger.debug(f"New config: {self}")
                 logger.debug(
                     f"New character config: {self.character_config.model_dump()}"
@@ -8,7 +8,7 @@ from loguru import logger
 from pydantic import BaseModel
 from silero_vad import load_silero_vad
 
-from .vad_interface import VADInterface
+from .vad_interface import VADInterface, PARTIAL_SPEECH_PREFIX
 
 
 class SileroVADConfig(BaseModel):
@@ -19,6 +19,7 @@ class SileroVADConfig(BaseModel):
     required_hits: int = 3  # 3 * (0.032) = 0.1s
     required_misses: int = 24  # 24 * (0.032) = 0.8s
     smoothing_window: int = 5
+    emit_partial: bool = False
 
 
 class VADEngine(VADInterface):
@@ -31,6 +32,7 @@ class VADEngine(VADInterface):
         required_hits: int = 3,
         required_misses: int = 24,
         smoothing_window: int = 5,
+        emit_partial: bool = False,
     ):
         self.config = SileroVADConfig(
             orig_sr=orig_sr,
@@ -40,6 +42,7 @@ class VADEngine(VADInterface):
             required_hits=required_hits,
             required_misses=required_misses,
             smoothing_window=smoothing_window,
+            emit_partial=emit_partial,
         )
         self.model = self.load_vad_model()
         self.state = StateMachine(self.config)
@@ -90,6 +93,7 @@ class StateMachine:
         self.required_hits = config.required_hits
         self.required_misses = config.required_misses
         self.smoothing_window = config.smoothing_window
+        self.emit_partial = config.emit_partial
 
         self.probs = []
         self.dbs = []
@@ -159,6 +163,11 @@ class StateMachine:
                 if self.miss_count >= self.required_misses:
                     self.state = State.INACTIVE
                     self.miss_count = 0
+                    # The speaker paused: share the utterance so far, the final
+                    # audio follows after another `required_misses` of silence
+                    if self.emit_partial and len(self.probs) > 30:
+                        pre_bytes = b"".join(self.pre_buffer)
+                        yield [], [], PARTIAL_SPEECH_PREFIX + pre_bytes + self.bytes
 
         elif self.state == State.INACTIVE:
             self.update(chunk_bytes, smoothed_prob, smoothed_db)
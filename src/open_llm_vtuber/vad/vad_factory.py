@@ -16,4 +16,5 @@ class VADFactory:
                 kwargs.get("required_hits"),
                 kwargs.get("required_misses"),
                 kwargs.get("smoothing_window"),
+                kwargs.get("speculative_response", False),
             )
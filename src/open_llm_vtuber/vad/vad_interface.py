@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
 
+# Prefix of the audio of an utterance whose end is not confirmed yet. Emitted
+# (if enabled) once the speaker pauses, ahead of the final audio of the utterance.
+PARTIAL_SPEECH_PREFIX = b"<|PARTIAL|>"
+
 
 class VADInterface(ABC):
     @abstractmethod
@@ -7,6 +11,7 @@ class VADInterface(ABC):
         """
         Detect if there is voice activity in the audio data.
         :param audio_data: Input audio data
-        :return: Returns a sequence of audio bytes containing human voice if voice activity is detected
+        :return: Returns a sequence of audio bytes containing human voice if voice activity is detected.
+            Audio starting with PARTIAL_SPEECH_PREFIX is a provisional copy of the utterance so far.
         """
         pass
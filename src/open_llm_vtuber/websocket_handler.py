@@ -18,8 +18,11 @@ from .utils.stream_audio import prepare_audio_payload
 from .chat_history_manager import (
     create_new_history,
     get_history,
+    get_history_page,
     delete_history,
     get_history_list,
+    paginate_history,
+    search_history,
 )
 from .config_manager.utils import scan_config_alts_directory, scan_bg_directory
 from .conversations.conversation_handler import (
@@ -27,6 +30,13 @@ from .conversations.conversation_handler import (
     handle_group_interrupt,
     handle_individual_interrupt,
 )
+from .conversations.speculative_response import SpeculativeResponse
+from .vad.vad_interface import PARTIAL_SPEECH_PREFIX
+
+# Messages per "fetch-history-page" response when the client gives no limit
+DEFAULT_HISTORY_PAGE_SIZE = 50
+# Matches per "search-history" response when the client gives no limit
+DEFAULT_HISTORY_SEARCH_RESULTS = 20
 
 
 class MessageType(Enum):
@@ -36,6 +46,8 @@ class MessageType(Enum):
     HISTORY = [
         "fetch-history-list",
         "fetch-and-set-history",
+        "fetch-history-page",
+        "search-history",
         "create-new-history",
         "delete-history",
     ]
@@ -54,6 +66,9 @@ class WSMessage(TypedDict, total=False):
     audio: Optional[List[float]]
     images: Optional[List[str]]
     history_uid: Optional[str]
+    limit: Optional[int]
+    before: Optional[int]
+    query: Optional[str]
     file: Optional[str]
     display_text: Optional[dict]
 
@@ -69,6 +84,7 @@ class WebSocketHandler:
         self.current_conversation_tasks: Dict[str, Optional[asyncio.Task]] = {}
         self.default_context_cache = default_context_cache
         self.received_data_buffers: Dict[str, np.ndarray] = {}
+        self.speculative_responses: Dict[str, SpeculativeResponse] = {}
 
         # Message handlers mapping
         self._message_handlers = self._init_message_handlers()
@@ -81,6 +97,8 @@ class WebSocketHandler:
             "request-group-info": self._handle_group_info,
             "fetch-history-list": self._handle_history_list_request,
             "fetch-and-set-history": self._handle_fetch_history,
+            "fetch-history-page": self._handle_fetch_history_page,
+            "search-history": self._handle_search_history,
             "create-new-history": self._handle_create_history,
             "delete-history": self._handle_delete_history,
             "interrupt-signal": self._handle_interrupt,
@@ -172,7 +190,11 @@ class WebSocketHandler:
         await websocket.send_text(json.dumps({"type": "control", "text": "start-mic"}))
 
     async def _init_service_context(self) -> ServiceContext:
-        """Initialize service context for a new session by cloning the default context"""
+        """
+        Initialize service context for a new session by cloning the default context.
+        Engines are shared by reference, except the agent, which gets a new session
+        so that memory and interrupt state are not shared between clients.
+        """
         session_service_context = ServiceContext()
         session_service_context.load_cache(
             config=self.default_context_cache.config.model_copy(deep=True),
@@ -186,7 +208,7 @@ class WebSocketHandler:
             asr_engine=self.default_context_cache.asr_engine,
             tts_engine=self.default_context_cache.tts_engine,
             vad_engine=self.default_context_cache.vad_engine,
-            agent_engine=self.default_context_cache.agent_engine,
+            agent_engine=self.default_context_cache.agent_engine.new_session(),
             translate_engine=self.default_context_cache.translate_engine,
         )
         return session_service_context
@@ -269,6 +291,7 @@ class WebSocketHandler:
 
     async def handle_disconnect(self, client_uid: str) -> None:
         """Handle client disconnection"""
+        await self._cancel_speculation(client_uid)
         group = self.chat_group_manager.get_client_group(client_uid)
         if group:
             await handle_group_interrupt(
@@ -289,7 +312,13 @@ class WebSocketHandler:
 
         # Clean up other client data
         self.client_connections.pop(client_uid, None)
-        self.client_contexts.pop(client_uid, None)
+        context = self.client_contexts.pop(client_uid, None)
+        if context:
+            # Releases its MCP servers, and its LLM if it switched config
+            try:
+                await context.close()
+            except Exception as e:
+                logger.error(f"Failed to close the context of {client_uid}: {e}")
         self.received_data_buffers.pop(client_uid, None)
         if client_uid in self.current_conversation_tasks:
             task = self.current_conversation_tasks[client_uid]
@@ -340,6 +369,7 @@ class WebSocketHandler:
         self, websocket: WebSocket, client_uid: str, data: WSMessage
     ) -> None:
         """Handle conversation interruption"""
+        await self._cancel_speculation(client_uid)
         heard_response = data.get("text", "")
         context = self.client_contexts[client_uid]
         group = self.chat_group_manager.get_client_group(client_uid)
@@ -366,7 +396,10 @@ class WebSocketHandler:
     ) -> None:
         """Handle request for chat history list"""
         context = self.client_contexts[client_uid]
-        histories = get_history_list(context.character_config.conf_uid)
+        # Flushes the buffered messages and reads every history, off the event loop
+        histories = await asyncio.to_thread(
+            get_history_list, context.character_config.conf_uid
+        )
         await websocket.send_text(
             json.dumps({"type": "history-list", "histories": histories})
         )
@@ -374,42 +407,92 @@ class WebSocketHandler:
     async def _handle_fetch_history(
         self, websocket: WebSocket, client_uid: str, data: dict
     ):
-        """Handle fetching and setting specific chat history"""
+        """
+        Handle fetching and setting specific chat history
+
+        With `limit`, only the latest `limit` messages are sent; the client
+        fetches older ones with "fetch-history-page". The history is read once,
+        off the event loop, for both the agent memory and the client.
+        """
         history_uid = data.get("history_uid")
         if not history_uid:
             return
 
+        await self._cancel_speculation(client_uid)
         context = self.client_contexts[client_uid]
         # Update history_uid in service context
         context.history_uid = history_uid
+        messages = await asyncio.to_thread(
+            get_history, context.character_config.conf_uid, history_uid
+        )
         context.agent_engine.set_memory_from_history(
             conf_uid=context.character_config.conf_uid,
             history_uid=history_uid,
+            messages=messages,
         )
 
-        messages = [
-            msg
-            for msg in get_history(
-                context.character_config.conf_uid,
-                history_uid,
-            )
-            if msg["role"] != "system"
-        ]
+        page = paginate_history(messages, data.get("limit"))
+        await websocket.send_text(
+            json.dumps({"type": "history-data", "history_uid": history_uid, **page})
+        )
+
+    async def _handle_fetch_history_page(
+        self, websocket: WebSocket, client_uid: str, data: WSMessage
+    ) -> None:
+        """Handle fetching older messages of a history without loading it"""
+        history_uid = data.get("history_uid")
+        if not history_uid:
+            return
+
+        context = self.client_contexts[client_uid]
+        page = await asyncio.to_thread(
+            get_history_page,
+            context.character_config.conf_uid,
+            history_uid,
+            data.get("limit") or DEFAULT_HISTORY_PAGE_SIZE,
+            data.get("before"),
+        )
+        await websocket.send_text(
+            json.dumps({"type": "history-page", "history_uid": history_uid, **page})
+        )
+
+    async def _handle_search_history(
+        self, websocket: WebSocket, client_uid: str, data: WSMessage
+    ) -> None:
+        """Handle full-text search over the histories of the current character"""
+        query = (data.get("query") or "").strip()
+        if not query:
+            return
+
+        context = self.client_contexts[client_uid]
+        results = await asyncio.to_thread(
+            search_history,
+            context.character_config.conf_uid,
+            query,
+            data.get("limit") or DEFAULT_HISTORY_SEARCH_RESULTS,
+        )
         await websocket.send_text(
-            json.dumps({"type": "history-data", "messages": messages})
+            json.dumps(
+                {"type": "history-search-results", "query": query, "results": results}
+            )
         )
 
     async def _handle_create_history(
         self, websocket: WebSocket, client_uid: str, data: WSMessage
     ) -> None:
         """Handle creation of new chat history"""
+        await self._cancel_speculation(client_uid)
         context = self.client_contexts[client_uid]
-        history_uid = create_new_history(context.character_config.conf_uid)
+        history_uid = await asyncio.to_thread(
+            create_new_history, context.character_config.conf_uid
+        )
         if history_uid:
             context.history_uid = history_uid
+            # A new history has no messages, so there is nothing to read
             context.agent_engine.set_memory_from_history(
                 conf_uid=context.character_config.conf_uid,
                 history_uid=history_uid,
+                messages=[],
             )
             await websocket.send_text(
                 json.dumps(
@@ -429,7 +512,8 @@ class WebSocketHandler:
             return
 
         context = self.client_contexts[client_uid]
-        success = delete_history(
+        success = await asyncio.to_thread(
+            delete_history,
             context.character_config.conf_uid,
             history_uid,
         )
@@ -465,11 +549,20 @@ class WebSocketHandler:
         if chunk:
             for audio_bytes in context.vad_engine.detect_speech(chunk):
                 if audio_bytes == b"<|PAUSE|>":
+                    await self._cancel_speculation(client_uid)
                     await websocket.send_text(
                         json.dumps({"type": "control", "text": "interrupt"})
                     )
                 elif audio_bytes == b"<|RESUME|>":
                     pass
+                elif audio_bytes.startswith(PARTIAL_SPEECH_PREFIX):
+                    # The speaker paused: start the response on what was said so far
+                    await self._start_speculation(
+                        client_uid,
+                        np.frombuffer(
+                            audio_bytes[len(PARTIAL_SPEECH_PREFIX) :], dtype=np.int16
+                        ).astype(np.float32),
+                    )
                 elif len(audio_bytes) > 1024:
                     # Detected audio activity (voice)
                     self.received_data_buffers[client_uid] = np.append(
@@ -480,10 +573,32 @@ class WebSocketHandler:
                         json.dumps({"type": "control", "text": "mic-audio-end"})
                     )
 
+    async def _start_speculation(self, client_uid: str, audio: np.ndarray) -> None:
+        """Start a speculative response on the partial audio of an utterance"""
+        await self._cancel_speculation(client_uid)
+        task = self.current_conversation_tasks.get(client_uid)
+        group = self.chat_group_manager.get_client_group(client_uid)
+        if (task and not task.done()) or (group and len(group.members) > 1):
+            # Only speculate when the agent is idle and talks to this client alone
+            return
+        speculation = SpeculativeResponse(self.client_contexts[client_uid])
+        if speculation.start(audio):
+            self.speculative_responses[client_uid] = speculation
+
+    async def _cancel_speculation(self, client_uid: str) -> None:
+        """Cancel the speculative response of a client, if any"""
+        speculation = self.speculative_responses.pop(client_uid, None)
+        if speculation:
+            await speculation.cancel()
+
     async def _handle_conversation_trigger(
         self, websocket: WebSocket, client_uid: str, data: WSMessage
     ) -> None:
         """Handle triggers that start a conversation"""
+        speculation = self.speculative_responses.pop(client_uid, None)
+        if speculation and data.get("type") != "mic-audio-end":
+            await speculation.cancel()
+            speculation = None
         await handle_conversation_trigger(
             msg_type=data.get("type", ""),
             data=data,
@@ -496,6 +611,7 @@ class WebSocketHandler:
             received_data_buffers=self.received_data_buffers,
             current_conversation_tasks=self.current_conversation_tasks,
             broadcast_to_group=self.broadcast_to_group,
+            speculation=speculation,
         )
 
     async def _handle_fetch_configs(
@@ -514,6 +630,7 @@ class WebSocketHandler:
         """Handle switching to a different configuration"""
         config_file_name = data.get("file")
         if config_file_name:
+            await self._cancel_speculation(client_uid)
             context = self.client_contexts[client_uid]
             await context.handle_config_switch(websocket, config_file_name)
 